@@ -0,0 +1,86 @@
+"""
+Run many scripts in one event loop and measure how long the loop is held up.
+
+Each script gets its own `AsyncInterpreter` and computes a Fibonacci number while
+printing. Every callback the event loop runs is timed: the longest one is the
+longest time any other coroutine of the loop had to wait for a single script.
+With many sessions alive, the longest turns are Python's full garbage collections,
+which happen to start in one of them.
+The scripts are run once with `eval_string_async`, all at the same time, and
+once with the blocking `eval_string` from inside the loop for comparison.
+
+Usage:
+    python benchmarks/bench_async.py [scripts] [n]
+"""
+import asyncio
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.async_eval import AsyncInterpreter  # noqa: E402
+
+SCRIPT = """
+(define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+(display-string "start ")
+(define result (fib {n}))
+(display-string "done")
+result
+"""
+
+
+def time_callbacks(turns: list[float]):
+    # Every step of every task runs in a `Handle`, the unit the loop cannot interrupt.
+    # Returns the original method, to restore it.
+    run = asyncio.events.Handle._run
+
+    def timed_run(handle):
+        start = time.perf_counter()
+        run(handle)
+        turns.append(time.perf_counter() - start)
+
+    asyncio.events.Handle._run = timed_run
+    return run
+
+
+async def run(scripts: int, n: int, blocking: bool) -> tuple[float, list[float]]:
+    source = SCRIPT.format(n=n)
+    interpreters = [AsyncInterpreter(output=io.StringIO()) for _ in range(scripts)]
+
+    turns = []
+    run_callback = time_callbacks(turns)
+    try:
+        start = time.perf_counter()
+        if blocking:
+            results = []
+            for interpreter in interpreters:
+                results.append(interpreter.eval_string(source))
+                await asyncio.sleep(0)
+        else:
+            results = await asyncio.gather(*(interpreter.eval_string_async(source) for interpreter in interpreters))
+        elapsed = time.perf_counter() - start
+    finally:
+        asyncio.events.Handle._run = run_callback
+
+    assert len(set(results)) == 1, results
+    return elapsed, turns
+
+
+def report(name: str, scripts: int, elapsed: float, turns: list[float]):
+    turns = sorted(turns)
+    print(f"{name:<10} {scripts} scripts in {elapsed:7.2f} s  {scripts / elapsed:6.0f} scripts/s  "
+          f"loop held median {turns[len(turns) // 2] * 1000:6.2f} ms  max {turns[-1] * 1000:7.2f} ms")
+
+
+def main():
+    scripts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    report("async", scripts, *asyncio.run(run(scripts, n, blocking=False)))
+    report("blocking", scripts, *asyncio.run(run(scripts, n, blocking=True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare the conformance runner with running `main.py` once per input file.
+
+A corpus of small input files is generated in a temporary directory, like
+graded project tests: definitions, list operations, errors and `read`. The
+expected transcripts are taken from `main.py` for a sample of the files, which
+is also timed as the serial baseline, and from `run_transcript` for the rest.
+The whole corpus is then checked by a `ConformanceRunner`, which must pass it.
+
+Usage:
+    python benchmarks/bench_conformance.py [files] [workers] [sample]
+"""
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.conformance import WORKERS, ConformanceRunner, find_cases, run_transcript  # noqa: E402
+
+
+def case_source(n: int) -> str:
+    lines = [
+        str(n % 4 + 1),
+        "(define (fib k) (if (< k 2) k (+ (fib (- k 1)) (fib (- k 2)))))",
+        f"(define xs '({n} {n + 1} . ({n + 2} \"s{n}\")))",
+        "(cons (car xs) (cdr (cdr xs)))",
+        f"(fib {n % 12})",
+        "(car 'a)",
+        "(begin (display-string \"Please enter: \") (read))",
+        f"(item {n})",
+        f"(define (f x) (list x {n}.5 (quote sym)))",
+        "(f xs)",
+        "(undefined-symbol)",
+        "(exit)",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else WORKERS
+    sample = min(files, int(sys.argv[3]) if len(sys.argv) > 3 else 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = Path(directory)
+        for n in range(files):
+            (corpus / f"case{n:05d}.in").write_text(case_source(n))
+
+        start = time.perf_counter()
+        for n in range(sample):
+            with open(corpus / f"case{n:05d}.in", "rb") as stdin:
+                transcript = subprocess.run([sys.executable, str(ROOT / "main.py")], stdin=stdin,
+                                            capture_output=True, check=True).stdout
+            (corpus / f"case{n:05d}.out").write_bytes(transcript)
+        serial = (time.perf_counter() - start) / sample
+
+        for n in range(sample, files):
+            (corpus / f"case{n:05d}.out").write_text(run_transcript(case_source(n)))
+
+        report = ConformanceRunner(workers).run(find_cases([directory]))
+
+    assert report.failed == 0, [result for result in report.results if not result.ok][:5]
+    print(f"main.py  {serial * 1000:8.1f} ms/file  (mean of {sample} files, {serial * files:.1f} s for all)")
+    print(f"runner   {report.elapsed / files * 1000:8.1f} ms/file  ({report})")
+    print(f"speedup  {serial * files / report.elapsed:8.1f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Measure what the resource governor costs per evaluation.
+
+The same program is evaluated without a governor and with each kind of budget,
+all set high enough never to be exceeded, and the best of several runs is
+reported with its slowdown relative to no governor.
+
+Usage:
+    python benchmarks/bench_governor.py [n] [runs]
+"""
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.governor import Governor  # noqa: E402
+from src.interpreter import Interpreter  # noqa: E402
+
+FIB = "(define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))"
+
+MODES = [
+    ("no governor", None),
+    ("steps", {"max_steps": 10 ** 12}),
+    ("timeout", {"timeout": 3600.0}),
+    ("steps+timeout", {"max_steps": 10 ** 12, "timeout": 3600.0}),
+    ("memory", {"max_memory": 2 ** 40}),
+]
+
+
+def measure(limits: dict | None, n: int, runs: int) -> float:
+    interpreter = Interpreter(output=io.StringIO(), governor=Governor(**limits) if limits is not None else None)
+    interpreter.eval_string(FIB)
+    program = interpreter.compile(f"(fib {n})")
+
+    best = float("inf")
+    for _ in range(runs):
+        start = time.process_time()
+        program.run()
+        best = min(best, time.process_time() - start)
+
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 18
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    baseline = None
+    for name, limits in MODES:
+        elapsed = measure(limits, n, runs)
+        baseline = baseline if baseline is not None else elapsed
+        print(f"{name:<14} (fib {n})  {elapsed * 1000:9.1f} ms  {(elapsed / baseline - 1) * 100:+6.1f} %")
+
+
+if __name__ == "__main__":
+    main()
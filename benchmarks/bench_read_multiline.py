@@ -0,0 +1,93 @@
+"""
+Time reading one S-expression spread over many lines through an `InputPort`.
+
+The form is a list with one element per line, with strings and comments holding
+parentheses in between. Reading it through the port is compared with lexing and
+parsing the whole file at once, which is the least it can cost. The port must
+take about as long: re-parsing the form for every new line made it quadratic.
+
+Usage:
+    python benchmarks/bench_read_multiline.py [lines]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.lexer import Lexer  # noqa: E402
+from src.parser import Parser  # noqa: E402
+from src.ports import InputPort  # noqa: E402
+
+
+def form_source(lines: int) -> str:
+    elements = []
+    for i in range(lines):
+        if i % 10 == 3:
+            elements.append(f'  "({i}"  ; a string and a comment ) with parentheses')
+        elif i % 10 == 7:
+            elements.append(f"  (cons {i} '({i} . x))")
+        else:
+            elements.append(f"  {i}")
+
+    return "(list\n" + "\n".join(elements) + ")\n(done)\n"
+
+
+def length(node) -> int:
+    count = 0
+    while node.__class__.__name__ == "ConsNode":
+        count += 1
+        node = node.cdr
+
+    return count
+
+
+def port_read(path: str):
+    port = InputPort(path)
+    try:
+        return port.read(), port.read()
+    finally:
+        port.close()
+
+
+def whole_file(path: str):
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+
+    lexer = Lexer()
+    parser = Parser()
+    lexer.reset(source)
+    parser.reset(lexer)
+    return parser.parse(), parser.parse()
+
+
+def measure(name: str, func, path: str, lines: int) -> float:
+    start = time.perf_counter()
+    form, following = func(path)
+    elapsed = time.perf_counter() - start
+
+    assert length(form) == lines + 1, length(form)  # `list` and one element per line
+    assert following.car.value == "done", following
+    print(f"{name:<12} {lines:>8} lines  {elapsed:8.3f} s")
+    return elapsed
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    with tempfile.NamedTemporaryFile("w", suffix=".ss", delete=False) as f:
+        f.write(form_source(lines))
+        path = f.name
+
+    try:
+        whole_time = measure("whole file", whole_file, path, lines)
+        port_time = measure("input port", port_read, path, lines)
+        print(f"port / whole file {port_time / whole_time:.2f}x")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
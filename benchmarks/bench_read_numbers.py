@@ -0,0 +1,73 @@
+"""
+Compare loading a file of numbers through the Lexer/Parser with `read-numbers`.
+
+Usage:
+    python benchmarks/bench_read_numbers.py [count]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.bulk_loader import read_numbers
+from src.lexer import Lexer
+from src.parser import Parser
+
+
+def token_path(path: str) -> list:
+    # What evaluating the numbers as source code costs: one Token and one AtomNode each
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+
+    lexer = Lexer()
+    parser = Parser()
+    lexer.reset(source)
+    parser.reset(lexer)
+
+    atoms = []
+    while parser.current.type != "EOF":
+        atoms.append(parser.parse())
+
+    return atoms
+
+
+def measure(name: str, func, path: str):
+    start = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - start
+    del result
+
+    # Memory is measured in a second run, tracemalloc would distort the timing
+    tracemalloc.start()
+    result = func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<14} {len(result):>10} numbers  {elapsed:8.3f} s  peak {peak / 2 ** 20:9.1f} MiB")
+    return elapsed, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = random.Random(0)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        for i in range(count):
+            f.write(f"{rng.randint(-10 ** 6, 10 ** 6)}{' ' if i % 10 != 9 else chr(10)}")
+        path = f.name
+
+    try:
+        token_time, token_peak = measure("token path", token_path, path)
+        bulk_time, bulk_peak = measure("read-numbers", read_numbers, path)
+        print(f"speed-up {token_time / bulk_time:.1f}x, memory {token_peak / max(bulk_peak, 1):.1f}x less")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
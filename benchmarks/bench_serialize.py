@@ -0,0 +1,63 @@
+"""
+Compare parsing S-expressions from source text with decoding their binary serialization.
+
+Usage:
+    python benchmarks/bench_serialize.py [count]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.parser import parse_program
+from src.serialize import serialize_many, deserialize_many
+
+
+def random_form(rng: random.Random, depth: int = 0) -> str:
+    if depth > 3 or rng.random() < 0.3:
+        return rng.choice([
+            str(rng.randint(-10 ** 6, 10 ** 6)),
+            f"{rng.uniform(-100, 100):.3f}",
+            rng.choice(["car", "cdr", "lambda", "define", "x", "y", "acc"]),
+            f'"s{rng.randint(0, 50)}"',
+            "#t", "nil",
+        ])
+
+    elements = [random_form(rng, depth + 1) for _ in range(rng.randint(1, 5))]
+    form = f"({' '.join(elements)})"
+    return f"'{form}" if rng.random() < 0.1 else form
+
+
+def best_of(func, arg, runs: int = 3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = random.Random(0)
+    source = "\n".join(random_form(rng) for _ in range(count))
+
+    forms = parse_program(source)
+    data = serialize_many(forms)
+    assert deserialize_many(data) == forms
+
+    parse_time = best_of(parse_program, source)
+    encode_time = best_of(serialize_many, forms)
+    decode_time = best_of(deserialize_many, data)
+
+    print(f"source  {len(source.encode('utf-8')):>10} bytes  parse        {parse_time:8.3f} s")
+    print(f"binary  {len(data):>10} bytes  encode       {encode_time:8.3f} s")
+    print(f"{'':<24}decode       {decode_time:8.3f} s")
+    print(f"decoding is {parse_time / decode_time:.1f}x faster than parsing")
+
+
+if __name__ == "__main__":
+    main()
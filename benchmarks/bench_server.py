@@ -0,0 +1,100 @@
+"""
+Load generator for the multi-session server.
+
+Opens many concurrent sessions, each defining a function and then sending
+expressions one at a time and waiting for the result, and reports sessions
+per second and the p50/p99 latency of a single expression. Without --port a
+server is started as a subprocess on a free port.
+
+Usage:
+    python benchmarks/bench_server.py [--sessions N] [--concurrency C] [--expressions K]
+                                      [--host HOST --port PORT]
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PROMPT = b"\n> "
+
+
+async def read_response(reader: asyncio.StreamReader) -> bytes:
+    return await reader.readuntil(PROMPT)
+
+
+async def run_session(host: str, port: int, expressions: int, latencies: list[float]):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await read_response(reader)  # welcome and first prompt
+
+        writer.write(b"(define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))\n")
+        await read_response(reader)
+
+        for i in range(expressions):
+            start = time.perf_counter()
+            writer.write(f"(list (fib {i % 8}) (quote x) \"s\")\n".encode())
+            await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+
+        writer.write(b"(exit)\n")
+        await reader.read()  # farewell, then the server closes the connection
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host: str, port: int, sessions: int, concurrency: int, expressions: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await run_session(host, port, expressions, latencies)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{sessions} sessions ({concurrency} concurrent, {expressions} expressions each) in {elapsed:.2f} s")
+    print(f"{sessions / elapsed:.1f} sessions/s, {len(latencies) / elapsed:.0f} expressions/s")
+    print(f"expression latency p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms")
+
+
+def start_server() -> tuple[subprocess.Popen, int]:
+    process = subprocess.Popen([sys.executable, "-m", "src.server", "--port", "0"],
+                               cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    banner = process.stdout.readline()  # "OurScheme server listening on host:port"
+    return process, int(banner.rsplit(":", 1)[1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--sessions", type=int, default=200)
+    arg_parser.add_argument("--concurrency", type=int, default=50)
+    arg_parser.add_argument("--expressions", type=int, default=20)
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=None, help="use a running server instead of starting one")
+    args = arg_parser.parse_args()
+
+    process = None
+    port = args.port
+    if port is None:
+        process, port = start_server()
+
+    try:
+        asyncio.run(run_load(args.host, port, args.sessions, args.concurrency, args.expressions))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure interpreter startup, from process launch to the first prompt.
+
+Each run starts `python -X importtime main.py`, answers the test-number line and
+waits for the first prompt. The median over all runs is checked against a budget,
+and the slowest imports of the last run are listed.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--budget SECONDS]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PROMPT = b"\n> "
+
+
+def time_to_prompt() -> tuple[float, str]:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-X", "importtime", str(ROOT / "main.py")],
+        cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    process.stdin.write(b"1\n")
+    process.stdin.flush()
+
+    output = b""
+    while PROMPT not in output:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            raise RuntimeError("interpreter exited before the first prompt")
+        output += chunk
+
+    elapsed = time.perf_counter() - start
+
+    _, import_log = process.communicate(b"(exit)\n")
+    return elapsed, import_log.decode()
+
+
+def slowest_imports(import_log: str, count: int) -> list[tuple[int, str]]:
+    # Lines look like "import time:  self [us] | cumulative | package"
+    imports = []
+    for line in import_log.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            imports.append((int(fields[1]), fields[2].rstrip()))
+
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--runs", type=int, default=10)
+    arg_parser.add_argument("--budget", type=float, default=0.06,
+                            help="maximum median time to the first prompt in seconds")
+    args = arg_parser.parse_args()
+
+    times = []
+    import_log = ""
+    for _ in range(args.runs):
+        elapsed, import_log = time_to_prompt()
+        times.append(elapsed)
+
+    print("slowest imports (cumulative):")
+    for cumulative, name in slowest_imports(import_log, 10):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    median = statistics.median(times)
+    print(f"time to first prompt: median {median * 1000:.1f} ms, "
+          f"min {min(times) * 1000:.1f} ms over {args.runs} runs (budget {args.budget * 1000:.0f} ms)")
+
+    if median > args.budget:
+        print("over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Pass a message through a chain of many cooperative tasks.
+
+Every task receives a number from the channel before it, adds one and sends it
+to the channel after it. All tasks are spawned first and run until each waits
+for its channel, then one message travels down the whole chain, resuming every
+task once. Reports the time of each phase and the memory a waiting task takes.
+
+Usage:
+    python benchmarks/bench_tasks.py [tasks]
+"""
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.interpreter import Interpreter  # noqa: E402
+
+DEFINITIONS = """
+(define head (make-channel))
+(define tail head)
+(define (relay in out) (channel-send! out (+ 1 (channel-recv in))))
+(define (add-relays k)
+  (if (= k 0)
+      tail
+      (let ((out (make-channel)))
+        (spawn relay tail out)
+        (set! tail out)
+        (add-relays (- k 1)))))
+"""
+
+BATCH = 50  # relays spawned per call of add-relays, which recurses once per relay
+
+
+def spawn_and_park(interpreter: Interpreter, tasks: int) -> tuple[float, float]:
+    add_batch = interpreter.compile(f"(add-relays {BATCH})")
+
+    start = time.perf_counter()
+    for _ in range(tasks // BATCH):
+        add_batch.run()
+    spawned = time.perf_counter()
+
+    interpreter.eval_string("(yield)")  # every task runs until it waits for its channel
+    return spawned - start, time.perf_counter() - spawned
+
+
+def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    tasks -= tasks % BATCH
+
+    interpreter = Interpreter(output=io.StringIO())
+    interpreter.eval_string(DEFINITIONS)
+    spawn_time, park_time = spawn_and_park(interpreter, tasks)
+
+    start = time.perf_counter()
+    result = interpreter.eval_string("(channel-send! head 0) (channel-recv tail)")
+    pass_time = time.perf_counter() - start
+    assert result == tasks, result
+
+    # Memory is measured in a second, smaller run, tracemalloc would distort the timing
+    sample = max(BATCH, tasks // 10 - tasks // 10 % BATCH)
+    interpreter = Interpreter(output=io.StringIO())
+    interpreter.eval_string(DEFINITIONS)
+    tracemalloc.start()
+    spawn_and_park(interpreter, sample)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{tasks} tasks, message arrived as {result}")
+    print(f"spawn  {spawn_time:8.3f} s  {spawn_time / tasks * 1e6:8.1f} us/task")
+    print(f"park   {park_time:8.3f} s  {park_time / tasks * 1e6:8.1f} us/task")
+    print(f"pass   {pass_time:8.3f} s  {pass_time / tasks * 1e6:8.1f} us/message")
+    print(f"memory {memory / sample:8.0f} bytes/waiting task")
+
+
+if __name__ == "__main__":
+    main()
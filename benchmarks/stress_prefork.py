@@ -0,0 +1,80 @@
+"""
+Stress test for the isolation of requests on a prefork server.
+
+The server preloads a counter and a helper which changes it. Every request runs
+the same script, which defines, assigns the preloaded counter with `set!` and
+redefines a preloaded name. A single worker serves all requests, so anything a
+request leaves behind would show up in the next one. Every transcript must be
+identical to the first.
+
+Usage:
+    python benchmarks/stress_prefork.py [--requests N] [--workers W]
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.prefork import send_script  # noqa: E402
+
+PRELOAD = """
+(define counter 0)
+(define (bump) (set! counter (+ counter 1)) counter)
+(define greeting "preloaded")
+"""
+
+SCRIPT = """(set! counter (+ counter 1))
+counter
+(bump)
+(define greeting "changed")
+greeting
+(define local 7)
+(exit)
+"""
+
+
+def start_server(preload: str, workers: int) -> tuple[subprocess.Popen, int]:
+    process = subprocess.Popen([sys.executable, "-m", "src.prefork", "--preload", preload, "--port", "0",
+                                "--workers", str(workers)], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    banner = process.stdout.readline()  # "OurScheme prefork server listening on host:port"
+    return process, int(banner.rsplit(":", 1)[1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--requests", type=int, default=200)
+    arg_parser.add_argument("--workers", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".ss", delete=False) as file:
+        file.write(PRELOAD)
+
+    process, port = start_server(file.name, args.workers)
+    try:
+        start = time.perf_counter()
+        first = send_script(SCRIPT, port=port)
+        differing = 0
+        for _ in range(args.requests - 1):
+            transcript = send_script(SCRIPT, port=port)
+            if transcript != first:
+                differing += 1
+                if differing == 1:
+                    print(f"transcript differs from the first one:\n{transcript}\n-- first --\n{first}")
+
+        elapsed = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+        Path(file.name).unlink()
+
+    print(f"{args.requests} requests in {elapsed:.2f} s, {differing} with a different transcript")
+    sys.exit(1 if differing else 0)
+
+
+if __name__ == "__main__":
+    main()
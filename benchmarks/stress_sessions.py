@@ -0,0 +1,86 @@
+"""
+Stress test for sessions evaluating on many threads at once.
+
+Every session runs a script which depends on its own session number and touches
+all the per-session state: definitions, `verbose`, print limits, console input
+through `(read)`, output captured by `with-output-to-string`, and futures. The
+sessions share only the read-only builtins. Each transcript is compared to the
+transcript of the same script run alone, and any difference is reported.
+
+Usage:
+    python benchmarks/stress_sessions.py [--sessions N] [--threads T] [--rounds R]
+"""
+import argparse
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.repl import repl  # noqa: E402
+
+
+def session_script(n: int) -> list[str]:
+    lines = [
+        f"(define id {n})",
+        "(define (fib k) (if (< k 2) k (+ (fib (- k 1)) (fib (- k 2)))))",
+        "(verbose nil)" if n % 2 else "(verbose #t)",
+        f"(define x (* id {n + 1}))",
+        "(verbose?)",
+        f"(set-print-limits! {n % 4 + 1} nil)",
+        "(list id (list id (list id (list id (list id)))))",
+        "(read)",
+        f"(quote (session {n} input))",
+        f'(with-output-to-string (lambda () (display-string "out-{n}")))',
+        f"(define f (future (+ (fib {n % 10 + 5}) id)))",
+        "(touch f)",
+        "(list x (fib 12))",
+    ]
+    lines += [f"(+ id {i})" for i in range(20)]
+    lines.append("(exit)")
+    return lines
+
+
+def run_session(n: int) -> str:
+    lines = iter(session_script(n))
+
+    def reader() -> str:
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError
+
+    transcript = io.StringIO()
+    repl(reader=reader, stream=transcript)
+    return transcript.getvalue()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--sessions", type=int, default=100)
+    arg_parser.add_argument("--threads", type=int, default=32)
+    arg_parser.add_argument("--rounds", type=int, default=2)
+    args = arg_parser.parse_args()
+
+    sys.setswitchinterval(1e-4)  # switch threads often, so more interleavings are exercised
+    expected = [run_session(n) for n in range(args.sessions)]
+
+    failures = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        for _ in range(args.rounds):
+            for n, transcript in enumerate(executor.map(run_session, range(args.sessions))):
+                if transcript != expected[n]:
+                    failures += 1
+                    print(f"session {n} differs:\n{transcript}\n--- expected ---\n{expected[n]}")
+
+    elapsed = time.perf_counter() - start
+    total = args.sessions * args.rounds
+    print(f"{total} sessions on {args.threads} threads in {elapsed:.2f} s, {failures} interfered")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,24 @@
+import argparse
+
+from src.governor import Governor, add_limit_arguments, limits_from_args
 from src.repl import repl
 
 
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description="OurScheme interpreter")
+    arg_parser.add_argument("--print-depth", type=int, default=None,
+                            help="maximum nesting depth of printed lists")
+    arg_parser.add_argument("--print-length", type=int, default=None,
+                            help="maximum number of printed elements per list")
+    arg_parser.add_argument("--image", default=None,
+                            help="image file written by save-image to restore at startup")
+    add_limit_arguments(arg_parser)
+    return arg_parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    limits = limits_from_args(args)
     n = input()
-    repl()
+    repl(print_depth=args.print_depth, print_length=args.print_length, image=args.image,
+         governor=Governor(**limits) if limits is not None else None)
@@ -26,6 +26,10 @@ class ConsNode(ASTNode):
     def __repr__(self):
         return f"{self.__class__.__name__}({repr(self.car)}, {repr(self.cdr)})"
 
+    def __reduce__(self):
+        from src.serialize import reduce_node  # not at the top, src.serialize imports this module
+        return reduce_node(self)
+
     def __iter__(self):
         curr = self
         while isinstance(curr, ConsNode):
@@ -43,6 +47,10 @@ class QuoteNode(ASTNode):
     def __repr__(self):
         return f"{self.__class__.__name__}({repr(self.value)})"
 
+    def __reduce__(self):
+        from src.serialize import reduce_node  # not at the top, src.serialize imports this module
+        return reduce_node(self)
+
 
 __all__ = [
     "ASTNode",
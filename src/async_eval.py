@@ -0,0 +1,385 @@
+# Evaluation on an asyncio event loop, for embedding OurScheme in asyncio services.
+#
+# `Evaluator.evaluate` runs a whole form before it returns, which stalls the event
+# loop for as long. `evaluate_async` runs the generator evaluator of
+# `src.scheduler` instead, and gives the event loop a turn:
+#   - every `reductions` reductions (the scheduler's quantum)
+#   - in `yield` and while waiting for a channel
+#   - in the I/O primitives of `_ASYNC_PRIMITIVES`. Console input and output go
+#     through an asyncio StreamReader/StreamWriter, and file ports are read and
+#     written on the default executor's threads.
+# So thousands of sessions can share one event loop and one thread.
+#
+# Tasks spawned by an async evaluation become asyncio tasks of their own. Code
+# which the generator evaluator leaves to the ordinary evaluator (see
+# `src.scheduler`) still runs without giving way. In there, the I/O primitives block,
+# and waiting for a channel which is empty raises DeadlockError, since the event
+# loop cannot be run from inside.
+
+import asyncio
+from contextlib import ExitStack
+from functools import partial
+
+from src.ast_nodes import *
+from src.environment import Environment
+from src.errors import DeadlockError, NoReturnValue
+from src.interpreter import Interpreter, Program, to_python
+from src.parser import parse_program
+from src.primitive import (prim_read, prim_read_line, prim_display_string, prim_newline, prim_write, prim_write_string,
+                           prim_open_input_file, prim_open_output_file, prim_close_port, prim_open_binary_input_file,
+                           prim_open_binary_output_file, prim_read_bytevector, prim_read_bytevector_into,
+                           prim_write_bytevector, parse_console_input)
+from src.scheduler import YIELD, QUANTUM, Channel, Task, Scheduler, apply_steps, evaluate_steps
+
+
+class _WriterStream:
+    # The text stream an `OutputBuffer` flushes into, over an asyncio StreamWriter.
+    # Writing never blocks, the scheduler's `drain` waits for the data to be sent.
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+
+    def write(self, text: str):
+        self.writer.write(text.encode("utf-8"))
+
+    def flush(self):
+        pass
+
+
+def _line_reader(reader: asyncio.StreamReader):
+    async def read_line() -> str:
+        line = await reader.readline()
+        if not line:
+            raise EOFError
+
+        return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    return read_line
+
+
+async def _in_thread(primitive, args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+    # File I/O blocks, so it runs on the default executor while the loop goes on
+    return await asyncio.get_running_loop().run_in_executor(None, primitive, args, env, evaluator)
+
+
+async def _drained(primitive, args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+    result = primitive(args, env, evaluator)
+    await evaluator.context.scheduler.drain()
+    return result
+
+
+async def _read(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+    if args:
+        return await _in_thread(prim_read, args, env, evaluator)
+
+    scheduler = evaluator.context.scheduler
+    parsing = parse_console_input(evaluator)
+    try:
+        next(parsing)
+        while True:
+            await scheduler.drain()
+            parsing.send(await scheduler.read_line(evaluator))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _read_line(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+    if args:
+        return await _in_thread(prim_read_line, args, env, evaluator)
+
+    scheduler = evaluator.context.scheduler
+    evaluator.context.output.flush()
+    await scheduler.drain()
+    try:
+        return AtomNode("STRING", await scheduler.read_line(evaluator))
+    except EOFError:
+        return AtomNode("EOF", "#<eof>")
+
+
+async def _write_string(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+    if len(args) == 2:
+        return await _in_thread(prim_write_string, args, env, evaluator)
+
+    return await _drained(prim_write_string, args, env, evaluator)
+
+
+# Primitives which await their I/O when called by an async evaluation, name -> coroutine function
+_ASYNC_PRIMITIVES = {
+    "read": _read,
+    "read-line": _read_line,
+    "display-string": partial(_drained, prim_display_string),
+    "newline": partial(_drained, prim_newline),
+    "write": partial(_drained, prim_write),
+    "write-string": _write_string,
+    "open-input-file": partial(_in_thread, prim_open_input_file),
+    "open-output-file": partial(_in_thread, prim_open_output_file),
+    "close-port": partial(_in_thread, prim_close_port),
+    "open-binary-input-file": partial(_in_thread, prim_open_binary_input_file),
+    "open-binary-output-file": partial(_in_thread, prim_open_binary_output_file),
+    "read-bytevector": partial(_in_thread, prim_read_bytevector),
+    "read-bytevector!": partial(_in_thread, prim_read_bytevector_into),
+    "write-bytevector": partial(_in_thread, prim_write_bytevector)
+}
+
+
+def _awaiting(async_primitive):
+    # The step of `evaluate_steps` for a primitive with an async version: the
+    # coroutine is yielded to `AsyncScheduler.drive`, which awaits it
+    def steps(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+        return (yield async_primitive(args, env, evaluator))
+
+    return steps
+
+
+class AsyncScheduler(Scheduler):
+    """
+    The tasks and console I/O of a session evaluated on an asyncio event loop.
+
+    `drive` runs a generator of `evaluate_steps` to its end and awaits what it
+    yields. Each spawned task is driven by an asyncio task of its own, and governed
+    by a copy of the spawning context's governor, counting from the spawn. An error
+    which ends a spawned task is kept in the task and handed to `on_task_error`,
+    rather than raised from whatever form is evaluated at the time. When every evaluation of the session waits for a channel,
+    the one which started waiting last raises DeadlockError.
+    """
+
+    suspending = Scheduler.suspending | {name: _awaiting(func) for name, func in _ASYNC_PRIMITIVES.items()}
+
+    def __init__(self, reader: asyncio.StreamReader | None = None, writer: asyncio.StreamWriter | None = None,
+                 reductions: int = QUANTUM, on_task_error=None):
+        """
+        Args:
+            reader: Console input of `read` and `read-line`, the session's blocking reader if `None`.
+            writer: The stream the session's output is written to, whose buffer is drained after writes.
+            reductions: Reductions evaluated before the event loop gets a turn.
+            on_task_error: Called as `on_task_error(task, error)` when a spawned task fails. If `None`,
+                           the failure goes to the event loop's exception handler.
+        """
+        super().__init__()
+        self.quantum = reductions
+        self._read_line = _line_reader(reader) if reader is not None else None
+        self._writer = writer
+        self.on_task_error = on_task_error
+        self._runners = set()
+        self._driving = 0  # evaluations being driven, the spawned tasks and the caller's
+        self._blocked = 0  # those of them waiting for a channel
+
+    async def read_line(self, evaluator: "Evaluator") -> str:
+        """The next line of console input, raising EOFError at the end."""
+        if self._read_line is None:
+            return evaluator.context.reader()
+
+        return await self._read_line()
+
+    async def drain(self):
+        """Wait until the output written so far may be sent without growing the writer's buffer further."""
+        if self._writer is not None:
+            await self._writer.drain()
+
+    async def drive(self, steps, context: "EvalContext | None" = None, governor=None):
+        """
+        Run a generator of `evaluate_steps` and return its value, awaiting its requests.
+
+        If a `context` is given, `governor` is its governor while `steps` runs, so
+        that evaluations sharing the context between awaits step their own governors.
+        """
+        self._driving += 1
+        try:
+            inbox = None
+            while True:
+                self.budget = self.quantum
+                if context is not None:
+                    outer, context.governor = context.governor, governor
+
+                try:
+                    request = steps.send(inbox)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    if context is not None:
+                        context.governor = outer
+
+                if request is YIELD:
+                    await asyncio.sleep(0)
+                    inbox = None
+                elif isinstance(request, Channel):
+                    inbox = await self._receive(request)
+                else:
+                    inbox = await request
+        finally:
+            self._driving -= 1
+
+    async def _receive(self, channel: Channel) -> ASTNode:
+        if channel.items:
+            return channel.items.popleft()
+
+        if self._blocked + 1 == self._driving:
+            raise DeadlockError("channel-recv")
+
+        waiter = asyncio.get_running_loop().create_future()
+
+        def deliver(value: ASTNode) -> bool:
+            if waiter.done():  # cancelled, the value goes to the next receiver
+                return False
+
+            self._blocked -= 1
+            waiter.set_result(value)
+            return True
+
+        self._blocked += 1
+        channel.receivers.append(deliver)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if not waiter.done() or waiter.cancelled():
+                self._blocked -= 1
+            else:
+                channel.items.appendleft(waiter.result())  # delivered but never taken
+
+            raise
+
+    def spawn(self, func, args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> Task:
+        task = Task(apply_steps(evaluator, func, args, env), self)
+        # The spawning form's governor is stopped when the form ends, the task outlives it
+        governor = evaluator.context.governor
+        if governor is not None:
+            governor = governor.copy()
+            governor.start()
+
+        self._driving += 1  # already, so a receive before the task starts is no deadlock
+        runner = asyncio.get_running_loop().create_task(self._run_task(task, evaluator.context, governor))
+        self._runners.add(runner)
+        runner.add_done_callback(self._runners.discard)
+        if governor is not None:
+            runner.add_done_callback(lambda _runner: governor.stop())  # also when cancelled before it ran
+        return task
+
+    async def _run_task(self, task: Task, context: "EvalContext", governor):
+        self._driving -= 1  # `drive` counts it from here on
+        try:
+            with ExitStack() as stack:
+                if governor is not None:
+                    stack.push(governor)  # only stopped here, it was started by `spawn`
+
+                await self.drive(task.steps, context, governor)
+        except Exception as e:
+            task.error = e
+            if self.on_task_error is not None:
+                self.on_task_error(task, e)
+            else:
+                asyncio.get_running_loop().call_exception_handler(
+                    {"message": f"spawned task {task!r} failed", "exception": e})
+        finally:
+            task.done = True
+            task.steps = None
+
+    def run_round(self):
+        # Reached from code which cannot suspend, which cannot give the event loop a turn either
+        pass
+
+    def run_until(self, condition, operator: str):
+        if not condition():
+            raise DeadlockError(operator)
+
+    def cancel(self):
+        """Cancel the spawned tasks which have not finished."""
+        for runner in list(self._runners):
+            runner.cancel()
+
+
+async def evaluate_async(evaluator: "Evaluator", ast: ASTNode, env: Environment, level: str = "toplevel"):
+    """
+    Evaluate `ast` like `Evaluator.evaluate`, giving the event loop a turn now and then.
+
+    The session's scheduler becomes an `AsyncScheduler` unless it is one already.
+
+    Raises:
+        OurSchemeError: An error of the evaluation. Errors of the tasks it spawns are
+                        reported by the scheduler's `on_task_error`.
+    """
+    context = evaluator.context
+    if not isinstance(context.scheduler, AsyncScheduler):
+        context.scheduler = AsyncScheduler()
+
+    return await context.scheduler.drive(evaluate_steps(evaluator, ast, env, level))
+
+
+class AsyncInterpreter(Interpreter):
+    """
+    An `Interpreter` whose programs can be evaluated on an asyncio event loop.
+
+    `run_async` and `eval_string_async` evaluate like `run` and `eval_string`, but
+    without holding up the other coroutines of the loop. The blocking methods of
+    `Interpreter` still work, as long as the program spawns no tasks.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader | None = None, writer: asyncio.StreamWriter | None = None,
+                 output=None, output_threshold: int = 8192, governor=None, reductions: int = QUANTUM,
+                 on_task_error=None):
+        """
+        Args:
+            reader: Console input of `read` and `read-line`, none if `None`.
+            writer: Where everything the program prints is written to.
+            output: Text stream receiving the output instead, if there is no `writer`.
+            output_threshold (int): Number of buffered characters which triggers a write.
+            governor: Budgets applied to the evaluation of each top-level form.
+            reductions: Reductions evaluated before the event loop gets a turn.
+            on_task_error: Called as `on_task_error(task, error)` when a spawned task fails,
+                           the event loop's exception handler reports it if `None`.
+        """
+        super().__init__(_WriterStream(writer) if writer is not None else output, output_threshold, governor)
+        context = self.evaluator.context
+        context.reader = _no_console_input
+        context.scheduler = AsyncScheduler(reader, writer, reductions, on_task_error)
+
+    async def _evaluate_async(self, forms: list[ASTNode]):
+        env = self.global_env
+        governor = self.evaluator.context.governor
+
+        result = None
+        for form in forms:
+            if governor is None:
+                result = await evaluate_async(self.evaluator, form, env)
+            else:
+                with governor:
+                    result = await evaluate_async(self.evaluator, form, env)
+
+            if result is None:
+                raise NoReturnValue(form)
+
+        return result
+
+    async def _flush(self):
+        context = self.evaluator.context
+        context.output.flush()
+        await context.scheduler.drain()
+
+    async def run_async(self, program: Program):
+        """Evaluate a compiled program, returning the Python value of its last form."""
+        try:
+            return to_python(await self._evaluate_async(program.forms))
+        finally:
+            await self._flush()
+
+    async def eval_string_async(self, source: str):
+        """Parse and evaluate `source`, returning the Python value of its last form."""
+        try:
+            return to_python(await self._evaluate_async(parse_program(source, self.lexer, self.parser)))
+        finally:
+            await self._flush()
+
+    def close(self):
+        """Cancel the tasks the programs spawned which are still running."""
+        self.evaluator.context.scheduler.cancel()
+
+
+def _no_console_input() -> str:
+    # The blocking reader of an async session, for console input read by code which cannot await
+    raise EOFError
+
+
+__all__ = [
+    "AsyncScheduler",
+    "AsyncInterpreter",
+    "evaluate_async"
+]
@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 from src.primitive import *
 from src.primitive import prim_read
 from src.special_forms import *
@@ -5,7 +7,8 @@ from src.function_object import DummySymbolReference
 
 # `quote`, `define`, `and`, `or` are special forms, others are just normal procedures.
 # distinction between special forms and procedures are how arguments evaluates and how the construct behaves
-built_in_funcs = {
+# The table is read-only, it is shared by every session and thread.
+built_in_funcs = MappingProxyType({
     # 1. Constructors
     "cons": prim_cons,
     "list": prim_list,
@@ -90,4 +93,85 @@ built_in_funcs = {
     "read": prim_read,
     "eval": prim_eval,
     "set!": special_set,
-}
+
+    # String builders
+    "make-string-builder": prim_make_string_builder,
+    "builder-append!": prim_builder_append,
+    "builder->string": prim_builder_to_string,
+    "with-output-to-string": prim_with_output_to_string,
+
+    # Printing
+    "set-print-limits!": prim_set_print_limits,
+
+    # Promises and streams
+    "delay": special_delay,  # special form
+    "force": prim_force,
+    "cons-stream": special_cons_stream,  # special form
+    "stream-car": prim_stream_car,
+    "stream-cdr": prim_stream_cdr,
+    "stream-map": prim_stream_map,
+    "stream-filter": prim_stream_filter,
+    "stream-take": prim_stream_take,
+
+    # Parallel map
+    "pmap": prim_pmap,
+    "pfor-each": prim_pfor_each,
+
+    # Futures
+    "future": special_future,  # special form
+    "touch": prim_touch,
+    "future?": prim_is_future,
+
+    # Tasks and channels
+    "spawn": prim_spawn,
+    "yield": prim_yield,
+    "make-channel": prim_make_channel,
+    "channel-send!": prim_channel_send,
+    "channel-recv": prim_channel_recv,
+
+    # Forked environments
+    "with-forked-environment": special_with_forked_environment,  # special form
+
+    # File ports
+    "open-input-file": prim_open_input_file,
+    "open-output-file": prim_open_output_file,
+    "close-port": prim_close_port,
+    "read-line": prim_read_line,
+    "write-string": prim_write_string,
+    "eof-object?": prim_is_eof_object,
+
+    # Indexed data files
+    "open-data-file": prim_open_data_file,
+    "data-file-count": prim_data_file_count,
+    "data-file-ref": prim_data_file_ref,
+
+    # Numeric vectors
+    "read-numbers": prim_read_numbers,
+    "vector?": prim_is_vector,
+    "vector-length": prim_vector_length,
+    "vector-ref": prim_vector_ref,
+    "vector->list": prim_vector_to_list,
+
+    # Bytevectors
+    "make-bytevector": prim_make_bytevector,
+    "bytevector?": prim_is_bytevector,
+    "bytevector-length": prim_bytevector_length,
+    "bytevector-u8-ref": prim_bytevector_u8_ref,
+    "bytevector-u8-set!": prim_bytevector_u8_set,
+    "bytevector-copy": prim_bytevector_copy,
+    "bytevector-slice": prim_bytevector_slice,
+    "open-binary-input-file": prim_open_binary_input_file,
+    "open-binary-output-file": prim_open_binary_output_file,
+    "read-bytevector": prim_read_bytevector,
+    "read-bytevector!": prim_read_bytevector_into,
+    "write-bytevector": prim_write_bytevector,
+
+    # Serialization
+    "serialize": prim_serialize,
+    "deserialize": prim_deserialize,
+
+    # Modules
+    "load": prim_load,
+    "require": prim_require,
+    "save-image": prim_save_image,
+})
@@ -0,0 +1,52 @@
+import mmap
+import os
+import warnings
+
+# Bytes which can only appear in a file of floats (decimal point, exponent, nan, inf)
+_FLOAT_MARKERS = (b".", b"e", b"E", b"n", b"N", b"i", b"I")
+
+
+def read_numbers(path: str) -> "np.ndarray":
+    """
+    Load a file of whitespace- or comma-separated numbers into a NumPy array.
+
+    The numbers are parsed by NumPy's native text reader instead of the `Lexer`,
+    so no `Token` or `AtomNode` is created per number. As in the `Lexer`, a file
+    containing only integers gives an int64 array, anything else a float64 array.
+
+    Args:
+        path (str): Path of the data file.
+
+    Returns:
+        np.ndarray: One-dimensional array of all numbers in file order.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file contains something which is not a number.
+    """
+    import numpy as np  # deferred, importing NumPy costs more than starting the interpreter
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return np.empty(0, dtype=np.int64)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # mmap.find scans in C without copying the file into Python memory
+            is_float = any(data.find(marker) != -1 for marker in _FLOAT_MARKERS)
+            dtype = np.float64 if is_float else np.int64
+
+            with warnings.catch_warnings():
+                # Older NumPy only warns about trailing data which cannot be parsed
+                warnings.simplefilter("error", DeprecationWarning)
+                try:
+                    if data.find(b",") == -1:
+                        return np.fromfile(f, dtype=dtype, sep=" ")
+
+                    return np.fromstring(data[:].replace(b",", b" "), dtype=dtype, sep=" ")
+                except DeprecationWarning as e:
+                    raise ValueError(str(e)) from e
+
+
+__all__ = [
+    "read_numbers"
+]
@@ -0,0 +1,487 @@
+# Batch evaluation over several machines: a coordinator hands independent tasks
+# to worker processes over TCP and collects their results.
+#
+# Every message is a frame: a 4-byte big-endian payload length, a 1-byte frame kind,
+# and the payload. The coordinator opens one connection per worker and job, sends an
+# optional IMAGE frame (an image of the bindings map tasks may use, see
+# `dump_environment_image`), and then one TASK frame at a time, each answered by a
+# RESULT frame. Tasks and results are S-expressions in the binary encoding of
+# `src.serialize`:
+#   TASK    (id script form ...)      forms evaluated in a fresh global environment
+#           (id map func element ...) func applied to every element
+#   RESULT  (id status value output error), status is `ok` or `error`
+#
+# A task whose connection fails or times out is put back into the queue and run by
+# another worker, up to `retries` times. Errors raised by the evaluated code are not
+# retried, they are reported in the task's result.
+
+import argparse
+import io
+import os
+import queue
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from src.ast_nodes import *
+from src.builtins_registry import built_in_funcs
+from src.context import EvalContext
+from src.environment import Environment
+from src.errors import OurSchemeError, NoReturnValue, SchemeExitException
+from src.evaluator import Evaluator
+from src.image import dump_environment_image, restore_image
+from src.output import OutputBuffer
+from src.serialize import SerializationError, serialize_many, deserialize_many
+
+FRAME_IMAGE = 1
+FRAME_TASK = 2
+FRAME_RESULT = 3
+
+_HEADER = struct.Struct(">IB")  # payload length, frame kind
+
+
+class ClusterError(RuntimeError):
+    """A task of `Coordinator.map` failed, or no worker could run it."""
+
+
+def _send_frame(sock: socket.socket, kind: int, payload: bytes):
+    sock.sendall(_HEADER.pack(len(payload), kind) + payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("connection closed")
+
+        received += count
+
+    return data
+
+
+def _recv_frame(sock: socket.socket) -> tuple[int, bytearray]:
+    size, kind = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return kind, _recv_exactly(sock, size)
+
+
+def _to_list(values: list[ASTNode]) -> ASTNode:
+    result = AtomNode("BOOLEAN", "nil")
+    for value in reversed(values):
+        result = ConsNode(value, result)
+
+    return result
+
+
+def _parse_address(address: str) -> tuple[str, int]:
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def _no_console_input() -> str:
+    raise EOFError  # tasks have no console, `read-line` sees the end of input
+
+
+class ClusterWorker:
+    """
+    Runs the tasks a `Coordinator` sends, with the standard `Evaluator`.
+
+    A worker serves one connection at a time. Script tasks run in a fresh global
+    environment each, map tasks in the environment restored from the connection's
+    image. What a task prints is captured and sent back with its result.
+    """
+
+    def __init__(self):
+        self._listener = None
+
+    def listen(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Open the listening socket and return its address as `host:port`."""
+        self._listener = socket.create_server((host, port))
+        return "%s:%d" % self._listener.getsockname()[:2]
+
+    def _run_task(self, payload: bytearray, map_env: Environment) -> bytes:
+        task_id, kind, *nodes = deserialize_many(payload, built_in_funcs)
+        env = Environment(built_in_funcs) if kind.value == "script" else map_env
+
+        text = io.StringIO()
+        evaluator = Evaluator(EvalContext(env, verbose=False, output=OutputBuffer(text), reader=_no_console_input))
+        value = AtomNode("VOID", "")
+        status, error = "ok", ""
+        try:
+            if kind.value == "script":
+                for form in nodes:
+                    value = evaluator.evaluate(form, env, "toplevel")
+                    if value is None:
+                        raise NoReturnValue(form)
+            else:
+                func, *elements = nodes
+                value = _to_list([evaluator.apply_procedure(func, [element], env) for element in elements])
+
+        except SchemeExitException:
+            pass  # `(exit)` ends the script
+
+        except OurSchemeError as e:
+            status, error = "error", str(e)
+
+        except Exception as e:  # e.g. recursion too deep, reported rather than killing the worker
+            status, error = "error", f"{type(e).__name__}: {e}"
+
+        finally:
+            evaluator.context.output.flush()
+
+        result = [task_id, AtomNode("SYMBOL", status), value, AtomNode("STRING", text.getvalue()),
+                  AtomNode("STRING", error)]
+        try:
+            return serialize_many(result)
+        except SerializationError as e:  # e.g. a result holding a port
+            result[1:3] = [AtomNode("SYMBOL", "error"), AtomNode("VOID", "")]
+            result[4] = AtomNode("STRING", f"result cannot be sent: {e}")
+            return serialize_many(result)
+
+    def _serve_connection(self, conn: socket.socket):
+        map_env = Environment(built_in_funcs)
+        with conn:
+            while True:
+                try:
+                    kind, payload = _recv_frame(conn)
+                except ConnectionError:
+                    return  # the coordinator is done with this worker
+
+                if kind == FRAME_IMAGE:
+                    map_env = Environment(built_in_funcs)
+                    restore_image(payload, map_env, {})
+                elif kind == FRAME_TASK:
+                    _send_frame(conn, FRAME_RESULT, self._run_task(payload, map_env))
+                else:
+                    return  # not a coordinator
+
+    def serve_forever(self):
+        while True:
+            conn, _ = self._listener.accept()
+            try:
+                self._serve_connection(conn)
+            except (OSError, SerializationError):
+                pass  # a broken connection or a garbled frame only ends that connection
+
+
+class TaskResult:
+    """The outcome of one task run by a `Coordinator`."""
+
+    def __init__(self, value: ASTNode | None, output: str, error: str | None, worker: str | None, attempts: int):
+        self.value = value  # the value of the last form, or the list of mapped values
+        self.output = output
+        self.error = error  # the error message, `None` if the task succeeded
+        self.worker = worker  # address of the worker which ran it last
+        self.attempts = attempts
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        return f"TaskResult(ok={self.ok}, worker={self.worker}, attempts={self.attempts})"
+
+
+class ClusterReport:
+    """Throughput of one job run by a `Coordinator`."""
+
+    def __init__(self, tasks: int, failed: int, retries: int, elapsed: float, per_worker: dict[str, int]):
+        self.tasks = tasks
+        self.failed = failed
+        self.retries = retries
+        self.elapsed = elapsed
+        self.per_worker = per_worker  # worker address -> tasks it completed
+
+    @property
+    def tasks_per_second(self) -> float:
+        return self.tasks / self.elapsed if self.elapsed > 0 else float("inf")
+
+    def __str__(self):
+        lines = [f"{self.tasks} tasks in {self.elapsed:.2f} s, {self.tasks_per_second:.1f} tasks/s, "
+                 f"{self.failed} failed, {self.retries} retried"]
+        for worker, count in sorted(self.per_worker.items()):
+            lines.append(f"  {worker}: {count} tasks")
+
+        return "\n".join(lines)
+
+
+class _Job:
+    # Shared state of the worker threads of one `Coordinator._run` call
+    def __init__(self, messages: list[bytes], image: bytes | None, workers: int):
+        self.messages = messages
+        self.image = image
+        self.pending = queue.Queue()
+        for index in range(len(messages)):
+            self.pending.put(index)
+
+        self.results = [None] * len(messages)
+        self.attempts = [0] * len(messages)
+        self.retries = 0
+        self.per_worker = {}
+        self.lock = threading.Lock()
+        self.remaining = len(messages)
+        self.alive = workers
+        self.done = threading.Event()
+        if not messages:
+            self.done.set()
+
+    def finish(self, index: int, result: TaskResult):
+        with self.lock:
+            self.results[index] = result
+            if result.ok and result.worker is not None:
+                self.per_worker[result.worker] = self.per_worker.get(result.worker, 0) + 1
+
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.done.set()
+
+
+class Coordinator:
+    """
+    Splits jobs into independent tasks and runs them on a set of `ClusterWorker`s.
+
+    Each worker is driven by a thread of its own which takes the next task from a
+    shared queue, so faster workers run more tasks. A worker whose connection fails
+    is reconnected once, and dropped from the job if that fails too.
+    """
+
+    def __init__(self, workers: list[str], retries: int = 2, task_timeout: float | None = None,
+                 connect_timeout: float = 5.0, output=None):
+        """
+        Args:
+            workers: Worker addresses as `host:port`.
+            retries: How often a task is run again after its connection failed.
+            task_timeout: Seconds to wait for a result before giving up on the worker, `None` waits forever.
+            connect_timeout: Seconds to wait for a worker to accept a connection.
+            output: Text stream receiving what map tasks print, `None` means `sys.stdout`.
+        """
+        self.workers = [_parse_address(address) for address in workers]
+        self.retries = retries
+        self.task_timeout = task_timeout
+        self.connect_timeout = connect_timeout
+        self.output = output
+        self.last_report = None
+
+    def _connect(self, address: tuple[str, int], job: _Job) -> socket.socket:
+        conn = socket.create_connection(address, timeout=self.connect_timeout)
+        conn.settimeout(self.task_timeout)
+        if job.image is not None:
+            _send_frame(conn, FRAME_IMAGE, job.image)
+
+        return conn
+
+    def _drive(self, address: tuple[str, int], job: _Job):
+        name = "%s:%d" % address
+        conn = None
+        try:
+            conn = self._connect(address, job)
+            while not job.done.is_set():
+                try:
+                    index = job.pending.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+
+                try:
+                    _send_frame(conn, FRAME_TASK, job.messages[index])
+                    kind, payload = _recv_frame(conn)
+                    if kind != FRAME_RESULT:
+                        raise ConnectionError("unexpected frame")
+
+                    _, status, value, output, error = deserialize_many(payload, built_in_funcs)
+                except (OSError, ValueError) as e:  # also timeouts, closed connections and garbled results
+                    with job.lock:
+                        job.attempts[index] += 1
+                        attempts = job.attempts[index]
+                        if attempts <= self.retries:
+                            job.retries += 1
+
+                    if attempts <= self.retries:
+                        job.pending.put(index)
+                    else:
+                        job.finish(index, TaskResult(None, "", f"worker {name} failed: {e}", name, attempts))
+
+                    conn.close()
+                    conn = self._connect(address, job)  # raises, and so drops the worker, if it is gone
+                    continue
+
+                with job.lock:
+                    job.attempts[index] += 1
+                    attempts = job.attempts[index]
+
+                if status.value == "ok":
+                    job.finish(index, TaskResult(value, output.value, None, name, attempts))
+                else:
+                    job.finish(index, TaskResult(None, output.value, error.value, name, attempts))
+
+        except OSError:
+            pass  # worker unreachable
+
+        finally:
+            if conn is not None:
+                conn.close()
+
+            with job.lock:
+                job.alive -= 1
+                last = job.alive == 0
+
+            if last:  # nobody is left to run what is still queued
+                while not job.done.is_set():
+                    try:
+                        index = job.pending.get_nowait()
+                    except queue.Empty:
+                        break
+
+                    job.finish(index, TaskResult(None, "", "no worker left to run the task", None, job.attempts[index]))
+
+    def _run(self, tasks: list[list[ASTNode]], image: bytes | None = None) -> list[TaskResult]:
+        messages = [serialize_many([AtomNode("INT", index)] + task) for index, task in enumerate(tasks)]
+        job = _Job(messages, image, len(self.workers))
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._drive, args=(address, job), daemon=True) for address in self.workers]
+        for thread in threads:
+            thread.start()
+
+        if not threads:
+            while not job.pending.empty():
+                job.finish(job.pending.get(), TaskResult(None, "", "no worker left to run the task", None, 0))
+
+        job.done.wait()
+        for thread in threads:
+            thread.join()
+
+        failed = sum(not result.ok for result in job.results)
+        self.last_report = ClusterReport(len(tasks), failed, job.retries, time.perf_counter() - start, job.per_worker)
+        return job.results
+
+    def run_scripts(self, programs: list[list[ASTNode]]) -> list[TaskResult]:
+        """
+        Run every program, a list of parsed forms, in a fresh global environment of a worker.
+
+        Returns: The result of each program, in order. The value is that of its last form.
+
+        Raises:
+            SerializationError: If a program contains a value with no binary encoding.
+        """
+        return self._run([[AtomNode("SYMBOL", "script")] + forms for forms in programs])
+
+    def map(self, func, elements: list[ASTNode], env: Environment | None = None,
+            chunk_size: int | None = None) -> list[ASTNode]:
+        """
+        Apply `func` to every element on the workers, like `pmap` across machines.
+
+        The bindings visible from `env` are available to `func` on the workers. What
+        the tasks print is written to `output`, in the order of the elements.
+
+        Returns: The results, in the order of `elements`.
+
+        Raises:
+            SerializationError: If `func` or an element has no binary encoding.
+            ClusterError: If applying `func` fails for some element, or no worker could run a chunk.
+        """
+        if chunk_size is None:
+            chunk_size = max(1, -(-len(elements) // (4 * max(1, len(self.workers)))))
+
+        image = dump_environment_image(env) if env is not None else None
+        chunks = [elements[i:i + chunk_size] for i in range(0, len(elements), chunk_size)]
+        results = self._run([[AtomNode("SYMBOL", "map"), func] + chunk for chunk in chunks], image)
+
+        stream = self.output if self.output is not None else sys.stdout
+        values = []
+        for result in results:
+            stream.write(result.output)
+            if not result.ok:
+                raise ClusterError(result.error)
+
+            values.extend(Evaluator.extract_list(result.value))
+
+        return values
+
+
+def start_local_workers(count: int, host: str = "127.0.0.1") -> list[tuple[subprocess.Popen, str]]:
+    """Start `count` worker processes on free ports of this machine, returning each process and its address."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    workers = []
+    for _ in range(count):
+        process = subprocess.Popen([sys.executable, "-m", "src.cluster", "worker", "--host", host, "--port", "0"],
+                                   cwd=root, stdout=subprocess.PIPE, text=True)
+        banner = process.stdout.readline()  # "OurScheme cluster worker listening on host:port"
+        workers.append((process, banner.rsplit(" ", 1)[1].strip()))
+
+    return workers
+
+
+def stop_local_workers(workers: list[tuple[subprocess.Popen, str]]):
+    for process, _ in workers:
+        process.terminate()
+
+    for process, _ in workers:
+        process.wait()
+
+
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description="OurScheme evaluation cluster")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    worker = commands.add_parser("worker", help="run tasks sent by a coordinator")
+    worker.add_argument("--host", default="127.0.0.1")
+    worker.add_argument("--port", type=int, default=7575, help="TCP port, 0 picks a free one")
+
+    run = commands.add_parser("run", help="run scripts on the workers and report throughput")
+    run.add_argument("scripts", nargs="+")
+    run.add_argument("--workers", default="", help="comma-separated host:port addresses")
+    run.add_argument("--local", type=int, default=0, help="also start this many workers on this machine")
+    run.add_argument("--retries", type=int, default=2)
+    run.add_argument("--timeout", type=float, default=None, help="seconds to wait for one task")
+    return arg_parser.parse_args()
+
+
+def _run_command(args):
+    from src.module_loader import load_forms
+    from src.pretty_print import pretty_print
+
+    local = start_local_workers(args.local)
+    try:
+        addresses = [address for address in args.workers.split(",") if address] + [address for _, address in local]
+        coordinator = Coordinator(addresses, retries=args.retries, task_timeout=args.timeout)
+        results = coordinator.run_scripts([load_forms(path) for path in args.scripts])
+
+        for path, result in zip(args.scripts, results):
+            print(f"== {path} ({result.worker})")
+            print(result.output, end="")
+            print(pretty_print(result.value) if result.ok else result.error)
+
+        print(coordinator.last_report)
+        return 0 if coordinator.last_report.failed == 0 else 1
+    finally:
+        stop_local_workers(local)
+
+
+__all__ = [
+    "ClusterWorker",
+    "Coordinator",
+    "TaskResult",
+    "ClusterReport",
+    "ClusterError",
+    "start_local_workers",
+    "stop_local_workers"
+]
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "worker":
+        cluster_worker = ClusterWorker()
+        address = cluster_worker.listen(args.host, args.port)
+        print(f"OurScheme cluster worker listening on {address}", flush=True)
+        try:
+            cluster_worker.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        sys.exit(_run_command(args))
@@ -0,0 +1,309 @@
+# Conformance runs: many input files are fed to the interpreter, each exactly like
+# `main.py` reads standard input, and every transcript is compared to the expected
+# transcript of the file.
+#
+# The files run in a pool of worker processes. A worker is warmed up once, by
+# importing the interpreter and running a short session, and then runs one file after
+# another. No state carries over from one file to the next: `repl()` builds a new
+# global environment, parser and `EvalContext` (with the default verbose flag and
+# print limits) for every file, and the builtins they share are read-only.
+#
+# An input file `<name><input suffix>` is expected to have its transcript in
+# `<name><expected suffix>`, next to it or at the same relative path below an
+# expected directory. Line endings and trailing newlines at the end of the files are
+# not compared.
+
+import argparse
+import difflib
+import gc
+import io
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.governor import Governor, add_limit_arguments, limits_from_args
+from src.repl import repl
+
+WORKERS = os.cpu_count() or 1
+
+# Run by every worker before its first file, so that no file pays for the warm-up
+_WARM_UP = "1\n(define (f x) (cons x '(1 2.5 \"s\")))\n(f 'a)\n(car 3)\n(exit)\n"
+
+# Limits of the files a worker runs, set when it starts (see `_start_worker`)
+_worker_limits = None
+
+
+def run_transcript(source: str, limits: dict | None = None) -> str:
+    """
+    Run an input file's text in a fresh session and return the transcript `main.py` would print.
+
+    The first line, the test number, is skipped like `main.py` does. If `limits` are
+    given, each top-level form is bounded by a `Governor` built from them.
+    """
+    lines = source.split("\n")
+    if lines[-1] == "":
+        lines.pop()  # the newline ending the last line
+
+    lines = iter(lines[1:])
+
+    def reader() -> str:
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError
+
+    transcript = io.StringIO()
+    repl(reader=reader, stream=transcript, governor=Governor(**limits) if limits is not None else None)
+    return transcript.getvalue()
+
+
+def _normalize(transcript: str) -> str:
+    return transcript.replace("\r\n", "\n").rstrip("\n")
+
+
+class CaseResult:
+    """The outcome of one input file of a conformance run."""
+
+    def __init__(self, path: str, expected_path: str, status: str, elapsed: float, diff: str = "",
+                 error: str | None = None):
+        self.path = path
+        self.expected_path = expected_path
+        self.status = status  # "pass", "fail", "missing" (no expected file) or "error"
+        self.elapsed = elapsed  # wall time of running the file, in seconds
+        self.diff = diff  # unified diff from the expected to the actual transcript, if it failed
+        self.error = error  # the Python error which ended the run, if any
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "pass"
+
+    def __repr__(self):
+        return f"CaseResult({self.path!r}, status={self.status}, elapsed={self.elapsed:.3f})"
+
+
+class ConformanceReport:
+    """Summary of a conformance run."""
+
+    def __init__(self, results: list[CaseResult], elapsed: float, workers: int):
+        self.results = results
+        self.elapsed = elapsed  # wall time of the whole run
+        self.workers = workers
+
+    @property
+    def passed(self) -> int:
+        return sum(result.ok for result in self.results)
+
+    @property
+    def failed(self) -> int:
+        return len(self.results) - self.passed
+
+    @property
+    def files_per_second(self) -> float:
+        return len(self.results) / self.elapsed if self.elapsed > 0 else float("inf")
+
+    def slowest(self, count: int = 10) -> list[CaseResult]:
+        return sorted(self.results, key=lambda result: result.elapsed, reverse=True)[:count]
+
+    def __str__(self):
+        busy = sum(result.elapsed for result in self.results)
+        return (f"{len(self.results)} files in {self.elapsed:.2f} s on {self.workers} workers, "
+                f"{self.files_per_second:.1f} files/s, {busy:.2f} s spent in files, "
+                f"{self.passed} passed, {self.failed} failed")
+
+
+def _start_worker(limits: dict | None):
+    global _worker_limits
+    _worker_limits = limits
+    run_transcript(_WARM_UP)
+
+    # What the worker holds now lives as long as it does, collections need not scan it again
+    gc.collect()
+    gc.freeze()
+
+
+def check_case(path: str, expected_path: str, context_lines: int = 3, limits: dict | None = None) -> CaseResult:
+    """
+    Run one input file and compare its transcript to the expected one.
+
+    Raises:
+        OSError: If the input file cannot be read.
+    """
+    with open(path, encoding="utf-8", errors="replace") as file:
+        source = file.read()
+
+    start = time.perf_counter()
+    try:
+        actual = run_transcript(source, limits)
+    except Exception as e:  # e.g. RecursionError, which the REPL does not report
+        return CaseResult(path, expected_path, "error", time.perf_counter() - start,
+                          error="".join(traceback.format_exception_only(e)).strip())
+    elapsed = time.perf_counter() - start
+
+    try:
+        with open(expected_path, encoding="utf-8", errors="replace") as file:
+            expected = file.read()
+    except FileNotFoundError:
+        return CaseResult(path, expected_path, "missing", elapsed)
+
+    actual, expected = _normalize(actual), _normalize(expected)
+    if actual == expected:
+        return CaseResult(path, expected_path, "pass", elapsed)
+
+    diff = difflib.unified_diff(expected.split("\n"), actual.split("\n"), fromfile=expected_path,
+                                tofile=f"{path} (actual)", n=context_lines, lineterm="")
+    return CaseResult(path, expected_path, "fail", elapsed, "\n".join(diff))
+
+
+def _check_in_worker(case: tuple[str, str], context_lines: int) -> CaseResult:
+    try:
+        return check_case(*case, context_lines, _worker_limits)
+    except OSError as e:
+        return CaseResult(case[0], case[1], "error", 0.0, error=str(e))
+
+
+def find_cases(paths: list[str], input_suffix: str = ".in", expected_suffix: str = ".out",
+               expected_dir: str | None = None) -> list[tuple[str, str]]:
+    """
+    Collect the input files below `paths`, paired with their expected transcripts.
+
+    A path which is a directory contributes every file ending in `input_suffix` below
+    it, a path which is a file contributes itself. Expected transcripts are looked for
+    next to the input files, or below `expected_dir` at the path of the input file
+    relative to the directory it was found in.
+
+    Returns: `(input path, expected path)` pairs, sorted within each directory.
+    """
+    cases = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            inputs = sorted(path.rglob(f"*{input_suffix}"))
+            root = path
+        else:
+            inputs = [path]
+            root = path.parent
+
+        for input_path in inputs:
+            name = input_path.name.removesuffix(input_suffix) + expected_suffix
+            if expected_dir is not None:
+                expected_path = Path(expected_dir, input_path.parent.relative_to(root), name)
+            else:
+                expected_path = input_path.with_name(name)
+
+            cases.append((str(input_path), str(expected_path)))
+
+    return cases
+
+
+class ConformanceRunner:
+    """
+    Runs input files in a pool of warmed-up worker processes and checks their transcripts.
+
+    Files are handed to the workers in small batches, to spread the cost of sending
+    work to a process over several files. Results come back in the order of the files.
+    """
+
+    def __init__(self, workers: int = WORKERS, limits: dict | None = None, context_lines: int = 3,
+                 batch_size: int | None = None):
+        """
+        Args:
+            workers: Number of worker processes.
+            limits: Budgets of a `Governor` bounding each top-level form of every file, none if `None`.
+            context_lines: Lines of context around each difference in the diffs.
+            batch_size: Files sent to a worker at once, chosen from the number of files if `None`.
+        """
+        self.workers = max(1, workers)
+        self.limits = limits
+        self.context_lines = context_lines
+        self.batch_size = batch_size
+
+    def run(self, cases: list[tuple[str, str]], on_result=None) -> ConformanceReport:
+        """
+        Run every `(input path, expected path)` pair.
+
+        Args:
+            on_result: Called with each `CaseResult` as soon as it and all before it are done.
+
+        Returns: The report of the run, with the results in the order of `cases`.
+        """
+        # Four batches per worker at least, so that workers finishing early still find work
+        batch_size = self.batch_size or max(1, min(32, len(cases) // (4 * self.workers)))
+
+        start = time.perf_counter()
+        results = []
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_start_worker,
+                                 initargs=(self.limits,)) as pool:
+            for result in pool.map(_check_in_worker, cases, [self.context_lines] * len(cases),
+                                   chunksize=batch_size):
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+
+        return ConformanceReport(results, time.perf_counter() - start, self.workers)
+
+
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description="OurScheme conformance runner")
+    arg_parser.add_argument("paths", nargs="+", help="input files, or directories searched for them")
+    arg_parser.add_argument("--jobs", "-j", type=int, default=WORKERS, help="worker processes")
+    arg_parser.add_argument("--input-suffix", default=".in")
+    arg_parser.add_argument("--expected-suffix", default=".out")
+    arg_parser.add_argument("--expected-dir", default=None,
+                            help="directory holding the expected transcripts, next to the inputs by default")
+    arg_parser.add_argument("--context", type=int, default=3, help="lines of context in diffs")
+    arg_parser.add_argument("--diff-lines", type=int, default=60, help="lines of each diff printed, 0 for all")
+    arg_parser.add_argument("--slowest", type=int, default=10, help="number of slowest files listed at the end")
+    arg_parser.add_argument("--failures-only", action="store_true", help="print no line for files which pass")
+    add_limit_arguments(arg_parser)
+    return arg_parser.parse_args()
+
+
+def _print_result(result: CaseResult, diff_lines: int, failures_only: bool):
+    if result.ok and failures_only:
+        return
+
+    print(f"{result.status.upper():<8}{result.elapsed * 1000:9.1f} ms  {result.path}")
+    if result.error is not None:
+        print(f"    {result.error}")
+    elif result.status == "missing":
+        print(f"    no expected transcript {result.expected_path}")
+    elif result.diff:
+        lines = result.diff.splitlines()
+        shown = lines[:diff_lines] if diff_lines > 0 else lines
+        print("\n".join(f"    {line}" for line in shown))
+        if len(shown) < len(lines):
+            print(f"    ... {len(lines) - len(shown)} more lines")
+
+
+def _run_command(args) -> int:
+    cases = find_cases(args.paths, args.input_suffix, args.expected_suffix, args.expected_dir)
+    if not cases:
+        print("no input files found")
+        return 1
+
+    runner = ConformanceRunner(args.jobs, limits_from_args(args), args.context)
+    report = runner.run(cases, lambda result: _print_result(result, args.diff_lines, args.failures_only))
+
+    print(report)
+    if args.slowest > 0:
+        print("slowest:")
+        for result in report.slowest(args.slowest):
+            print(f"  {result.elapsed * 1000:9.1f} ms  {result.path}")
+
+    return 0 if report.failed == 0 else 1
+
+
+__all__ = [
+    "ConformanceRunner",
+    "ConformanceReport",
+    "CaseResult",
+    "check_case",
+    "find_cases",
+    "run_transcript"
+]
+
+
+if __name__ == "__main__":
+    sys.exit(_run_command(parse_args()))
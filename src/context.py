@@ -0,0 +1,75 @@
+from src.environment import Environment
+from src.module_loader import default_module_path
+from src.output import OutputBuffer, SynchronizedOutput
+from src.parser import Parser
+
+
+class EvalContext:
+    """
+    The state of one evaluation session, everything evaluating code reads or changes
+    besides the environments.
+
+    An `Evaluator` keeps no state of its own apart from its context and the read-only
+    builtins. Sessions with contexts of their own therefore never interfere, even when
+    they run on different threads and share the builtins.
+    """
+
+    def __init__(self, global_env: Environment, parser: Parser = None, verbose: bool = True,
+                 output: OutputBuffer = None, reader=None):
+        """
+        Args:
+            global_env: The environment top-level definitions go into.
+            parser: Parser whose remaining input `(read)` consumes, a new one by default.
+            verbose: Whether `define` and `clean-environment` report what they did.
+            output: Where everything the session prints goes, standard output by default.
+            reader: Function returning the next line of console input, `input` by default.
+        """
+        self.global_env = global_env
+        self.parser = parser if parser is not None else Parser()
+        self.verbose = verbose
+        self.output = output if output is not None else OutputBuffer()
+        self.reader = reader if reader is not None else input  # reads one line of console input
+
+        # Limits used when printing results, `None` means unlimited
+        self.print_depth = None
+        self.print_length = None
+
+        # Budgets checked while evaluating, `None` means unlimited (see `src.governor`)
+        self.governor = None
+
+        # Runs the tasks of `spawn`, created by the first one (see `src.scheduler`)
+        self.scheduler = None
+
+        # Directories searched by `require`, and the modules it has loaded (name -> path)
+        self.module_path = default_module_path()
+        self.loaded_modules = {}
+
+    def child(self) -> "EvalContext":
+        """Make a context for code which runs in another thread, e.g. a future.
+
+        The child shares the global environment, the console reader and the loaded
+        modules with this context. It has a parser, a verbose flag and print limits of
+        its own, and a governor with the same budgets as this context's, already
+        running. Both write to the same output, which is made thread-safe here if it
+        is not yet.
+
+        Returns: The new context.
+        """
+        if not isinstance(self.output, SynchronizedOutput):
+            self.output = SynchronizedOutput(self.output)
+
+        child = EvalContext(self.global_env, Parser(), self.verbose, self.output, self.reader)
+        child.print_depth = self.print_depth
+        child.print_length = self.print_length
+        if self.governor is not None:
+            # The budgets count from now, the child's evaluation is submitted with it
+            child.governor = self.governor.copy()
+            child.governor.start()
+        child.module_path = self.module_path
+        child.loaded_modules = self.loaded_modules
+        return child
+
+
+__all__ = [
+    "EvalContext"
+]
@@ -0,0 +1,177 @@
+import array
+import mmap
+import os
+import re
+import struct
+
+from src.ast_nodes import ASTNode
+from src.lexer import Lexer
+from src.parser import Parser
+
+# Layout of `<file>.idx`: a header followed by (start, end) byte offsets of every top-level form
+_INDEX_SUFFIX = ".idx"
+_INDEX_MAGIC = b"OSIDX001"
+_INDEX_HEADER = struct.Struct("<8sQQQ")  # magic, source size, source mtime (ns), number of forms
+
+# Everything the pre-scan has to tell apart: strings, comments, parentheses, quotes and atoms
+_SCAN_TOKEN = re.compile(rb'"(?:[^"\\\n]|\\.)*"?|;[^\n]*|[()]|\'|[^\s()\'";]+')
+
+
+def _map_file(path: str) -> mmap.mmap | bytes:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""  # empty files cannot be memory-mapped
+
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def scan_forms(data) -> array.array:
+    """
+    Find the top-level S-expressions of a source text by balancing parentheses.
+
+    Only strings, comments, parentheses, quotes and atom boundaries are recognized,
+    nothing is parsed.
+
+    Args:
+        data: The source as bytes or a memory-mapped file.
+
+    Returns:
+        array.array: Flat array of byte offsets, start and end (exclusive) of each form.
+    """
+    offsets = array.array("Q")
+    depth = 0
+    start = None  # start of the current form, set while inside a form or after a leading quote
+
+    for match in _SCAN_TOKEN.finditer(data):
+        token = match.group()
+        first = token[0]
+
+        if first == 0x3B:  # ';' comment
+            continue
+
+        if start is None:
+            start = match.start()
+
+        if first == 0x28:  # '('
+            depth += 1
+
+        elif first == 0x29:  # ')'
+            if depth == 0:  # stray ')', left for the parser to report
+                offsets.extend((start, match.end()))
+                start = None
+                continue
+
+            depth -= 1
+
+        elif first == 0x27:  # '\'' quote belongs to the next datum
+            continue
+
+        if depth == 0:
+            offsets.extend((start, match.end()))
+            start = None
+
+    if start is not None:  # unbalanced form at end of file
+        offsets.extend((start, len(data)))
+
+    return offsets
+
+
+class DataFile:
+    """
+    Random access to the top-level S-expressions of a large data file.
+
+    The file is memory-mapped and pre-scanned once to find where each form starts
+    and ends. The offsets are cached in `<file>.idx` next to the file, and reused
+    as long as the size and modification time of the file are unchanged. A form is
+    only lexed and parsed when it is requested.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data = _map_file(path)
+        self._index_map = None
+        self._index = self._load_index()
+        if self._index is None:
+            self._index = self._build_index()
+
+        self._lexer = Lexer()
+        self._parser = Parser()
+
+    @property
+    def index_path(self) -> str:
+        return self.path + _INDEX_SUFFIX
+
+    def _source_stamp(self) -> tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load_index(self):
+        try:
+            index_map = _map_file(self.index_path)
+        except OSError:
+            return None
+
+        if len(index_map) < _INDEX_HEADER.size:
+            return None
+
+        magic, size, mtime, count = _INDEX_HEADER.unpack_from(index_map)
+        if (magic != _INDEX_MAGIC or (size, mtime) != self._source_stamp() or
+                len(index_map) != _INDEX_HEADER.size + count * 16):
+            index_map.close()
+            return None
+
+        self._index_map = index_map
+        return memoryview(index_map)[_INDEX_HEADER.size:].cast("Q")
+
+    def _build_index(self):
+        offsets = scan_forms(self._data)
+        size, mtime = self._source_stamp()
+
+        # Write to a temporary file first, so a reader never sees a half written index
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, size, mtime, len(offsets) // 2))
+                offsets.tofile(f)
+
+            os.replace(temp_path, self.index_path)
+        except OSError:
+            # Not cached (e.g. read-only directory), the index is still usable in memory
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+        return offsets
+
+    def __len__(self):
+        return len(self._index) // 2
+
+    def source(self, n: int) -> str:
+        """Return the source text of the n-th (0-based) form."""
+        start, end = self._index[2 * n], self._index[2 * n + 1]
+        return self._data[start:end].decode("utf-8")
+
+    def ref(self, n: int) -> ASTNode:
+        """
+        Parse the n-th (0-based) form.
+
+        Raises:
+            IndexError: If there is no such form.
+            UnexpectedTokenError, NoClosingQuoteError, NotFinishError: If the form is malformed.
+        """
+        if not 0 <= n < len(self):
+            raise IndexError(n)
+
+        self._lexer.reset(self.source(n))
+        self._parser.reset(self._lexer)
+        return self._parser.parse()
+
+    def __repr__(self):
+        return f'#<data-file "{self.path}">'
+
+
+__all__ = [
+    "DataFile",
+    "scan_forms"
+]
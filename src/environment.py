@@ -1,17 +1,40 @@
+import threading
+
 from src.errors import DefineFormatError, UnboundSymbolError
+from src.hamt import EMPTY
+
+_MISSING = object()
 
 
 class Environment:
     def __init__(self, builtins=None, outer=None):
-        self.builtins = builtins or {}
-        self.user_define = {}
+        self.builtins = builtins if builtins is not None else {}
+        # Persistent, so a fork shares the bindings and each side changes only its own version
+        self.user_define = EMPTY
         self.outer = outer
+        # Changing the bindings reads the map and replaces it, futures may do so at the same time
+        self._lock = threading.Lock()
 
     def define(self, symbol: str, value):
-        if self.builtins and symbol in self.builtins:
+        if symbol in self.builtins:
             raise DefineFormatError()
 
-        self.user_define[symbol] = value
+        with self._lock:
+            self.user_define = self.user_define.set(symbol, value)
+
+    def define_many(self, symbols: list[str], values: list):
+        """Define each symbol as the value at the same position, e.g. the parameters of a call."""
+        for symbol in symbols:
+            if symbol in self.builtins:
+                raise DefineFormatError()
+
+        with self._lock:
+            self.user_define = self.user_define.update(zip(symbols, values))
+
+    def assign(self, symbol: str, value):
+        """Bind `symbol` in this environment without the check against the builtins, used by `set!`."""
+        with self._lock:
+            self.user_define = self.user_define.set(symbol, value)
 
     def lookup(self, symbol: str):
         """Lookup the value of a symbol
@@ -22,10 +45,11 @@ class Environment:
         Returns: the corresponding value of `symbol`
 
         """
-        if symbol in self.user_define:
-            return self.user_define[symbol]
+        value = self.user_define.get(symbol, _MISSING)
+        if value is not _MISSING:
+            return value
 
-        elif self.builtins and symbol in self.builtins:
+        elif symbol in self.builtins:
             return self.builtins[symbol]
 
         elif self.outer:
@@ -49,5 +73,20 @@ class Environment:
 
         return None
 
+    def fork(self) -> "Environment":
+        """Make an independent copy of this environment and the environments around it.
+
+        The copy starts with the same bindings, but definitions and assignments in the
+        copy and in the original no longer affect each other. Takes O(1) per enclosing
+        environment, the bindings themselves are shared, not copied. The values bound
+        are shared too, e.g. a string builder changed in place is changed in both.
+
+        Returns: The copy.
+        """
+        forked = Environment(self.builtins, self.outer.fork() if self.outer is not None else None)
+        forked.user_define = self.user_define
+        return forked
+
     def clear(self):
-        self.user_define.clear()
+        with self._lock:
+            self.user_define = EMPTY
@@ -124,6 +124,11 @@ class LevelExitError(OurSchemeError):
         super().__init__(f"level of EXIT")
 
 
+class LevelForkError(OurSchemeError):
+    def __init__(self):
+        super().__init__(f"level of WITH-FORKED-ENVIRONMENT")
+
+
 class NoReturnValue(OurSchemeError):
     def __init__(self, ast):
         self.ast = ast
@@ -142,6 +147,54 @@ class UnboundConditionError(OurSchemeError):
         super().__init__(f"unbound condition")
 
 
+class FileOpenError(OurSchemeError):
+    def __init__(self, path_: str):
+        self.path = path_
+        super().__init__(f"cannot open file")
+
+
+class ClosedPortError(OurSchemeError):
+    def __init__(self, operator_: str):
+        self.operator = operator_
+        super().__init__(f"closed port")
+
+
+class NumberFormatError(OurSchemeError):
+    def __init__(self, path_: str):
+        self.path = path_
+        super().__init__(f"number format")
+
+
+class LoadFormatError(OurSchemeError):
+    def __init__(self, path_: str):
+        self.path = path_
+        super().__init__(f"LOAD format")
+
+
+class ImageFormatError(OurSchemeError):
+    def __init__(self, path_: str):
+        self.path = path_
+        super().__init__(f"image format")
+
+
+class UnknownModuleError(OurSchemeError):
+    def __init__(self, name_: str):
+        self.name = name_
+        super().__init__(f"unknown module")
+
+
+class ResourceLimitError(OurSchemeError):
+    def __init__(self, limit: str):
+        self.limit = limit  # "step", "time", "memory" or "depth"
+        super().__init__(f"{limit} limit exceeded")
+
+
+class DeadlockError(OurSchemeError):
+    def __init__(self, operator_: str):
+        self.operator = operator_
+        super().__init__(f"deadlock")
+
+
 __all__ = [
     "OurSchemeError",
     "NoClosingQuoteError",
@@ -163,7 +216,16 @@ __all__ = [
     "LevelDefineError",
     "LevelCleanEnvError",
     "LevelExitError",
+    "LevelForkError",
     "NoReturnValue",
     "UnboundParameterError",
-    "UnboundConditionError"
+    "UnboundConditionError",
+    "FileOpenError",
+    "ClosedPortError",
+    "NumberFormatError",
+    "LoadFormatError",
+    "ImageFormatError",
+    "UnknownModuleError",
+    "ResourceLimitError",
+    "DeadlockError"
 ]
@@ -1,20 +1,33 @@
+from collections.abc import Mapping
+
 from src.ast_nodes import *
 from src.builtins_registry import built_in_funcs
+from src.context import EvalContext
 from src.environment import Environment
 from src.errors import (NotCallableError, NonListError, LevelDefineError,
-                        LevelCleanEnvError, LevelExitError, NoReturnValue, LambdaFormatError, IncorrectArgumentNumber,
+                        LevelCleanEnvError, LevelExitError, LevelForkError, NoReturnValue, LambdaFormatError, IncorrectArgumentNumber,
                         UnboundParameterError)
 from src.function_object import SpecialForm, PrimitiveFunction, UserDefinedFunction
 from src.special_forms import eval_lambda
-from src.parser import Parser
 
 
 class Evaluator:
-    def __init__(self, global_env: Environment, parser: Parser, builtins: dict[str, object]=None, verbose: bool=True):
-        self.global_env = global_env
-        self.parser = parser
+    """
+    Evaluates S-expressions against the state held by an `EvalContext`.
+
+    Every piece of session state, the global environment, the verbose flag, the
+    output and so on, lives in `context`, and the builtins are read-only, so the
+    methods here are re-entrant. Evaluators with different contexts can run on
+    different threads at the same time.
+    """
+
+    def __init__(self, context: EvalContext, builtins: Mapping[str, object] = None):
+        self.context = context
         self.builtins = builtins if builtins is not None else built_in_funcs
-        self.verbose = verbose
+
+    def child(self) -> "Evaluator":
+        """Make an evaluator for code which runs in another thread, see `EvalContext.child`."""
+        return Evaluator(self.context.child(), self.builtins)
 
     def evaluate(self, ast: ASTNode, env: Environment, level: str):
         if isinstance(ast, AtomNode):
@@ -27,10 +40,19 @@ class Evaluator:
             return ast.value
 
         elif isinstance(ast, ConsNode):
+            governor = self.context.governor
+            if governor is not None:
+                governor.step()
+
             return self._process_cons(ast, env, level)
 
         raise NotImplementedError(f"Unhandled AST node: {ast}")
 
+    async def evaluate_async(self, ast: ASTNode, env: Environment, level: str = "toplevel"):
+        """Like `evaluate`, but gives the asyncio event loop a turn now and then, see `src.async_eval`."""
+        from src.async_eval import evaluate_async  # not at the top, src.async_eval imports this module
+        return await evaluate_async(self, ast, env, level)
+
     def _process_cons(self, ast, env, level):
         first = ast.car
 
@@ -69,6 +91,24 @@ class Evaluator:
 
         return eval_result
 
+    def apply_procedure(self, func, args: list[ASTNode], env: Environment):
+        """Apply an already evaluated procedure to already evaluated arguments.
+
+        Used by primitives which take a procedure as an argument.
+
+        Args:
+            func: The procedure to call.
+            args: The evaluated arguments.
+            env: The environment of the call site.
+
+        Returns: The result of the call.
+        """
+        if not isinstance(func, (PrimitiveFunction, UserDefinedFunction)):
+            raise NotCallableError(func)
+
+        func.check_arity(args)
+        return func(args, env, self)
+
     def _handle_level_error(self, func, level):
         if func is self.builtins["define"] and level != "toplevel":
             raise LevelDefineError()
@@ -76,6 +116,8 @@ class Evaluator:
             raise LevelCleanEnvError()
         elif func is self.builtins["exit"] and level != "toplevel":
             raise LevelExitError()
+        elif func is self.builtins["with-forked-environment"] and level != "toplevel":
+            raise LevelForkError()  # its body is evaluated at the top level
 
     def _handle_verbose(self, ast, env):
         first = ast.car
@@ -87,7 +129,7 @@ class Evaluator:
                 raise IncorrectArgumentNumber("verbose")
 
             value = self.evaluate(args[0], env, "inner")
-            self.verbose = True if value != AtomNode("BOOLEAN", "nil") else False
+            self.context.verbose = True if value != AtomNode("BOOLEAN", "nil") else False
             return AtomNode("BOOLEAN", "#t" if value != AtomNode("BOOLEAN", "nil") else "nil")
 
         if first == AtomNode("SYMBOL", "verbose?"):
@@ -95,7 +137,7 @@ class Evaluator:
             if len(args) != 0:
                 raise IncorrectArgumentNumber("verbose")
 
-            return AtomNode("BOOLEAN", "#t") if self.verbose else AtomNode("BOOLEAN", "nil")
+            return AtomNode("BOOLEAN", "#t") if self.context.verbose else AtomNode("BOOLEAN", "nil")
 
         return None
 
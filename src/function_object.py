@@ -106,15 +106,18 @@ class UserDefinedFunction(CallableEntity):
         if len(self.param_list) != len(args):
             raise IncorrectArgumentNumber(f"{self.name}")
 
-        call_env = Environment(builtins=call_site_env.builtins, outer=evaluator.global_env)
-        for param, value in zip(self.param_list, args):
-            call_env.define(param, value)
+        call_env = Environment(builtins=call_site_env.builtins, outer=evaluator.context.global_env)
+        call_env.define_many(self.param_list, args)
 
         for expr in self.body[:-1]:
             evaluator.evaluate(expr, call_env, "inner")
 
         return evaluator.evaluate(self.body[-1], call_env, "inner")
 
+    def __reduce__(self):
+        from src.serialize import reduce_node  # not at the top, src.serialize imports this module
+        return reduce_node(self)
+
     def __repr__(self):
         return f"#<procedure {self.name}>"
 
@@ -0,0 +1,99 @@
+# Futures run an expression on a bounded pool of threads while the caller goes on,
+# and `touch` waits for the value only when it is needed.
+#
+# Threads only overlap while one of them has released the GIL. Evaluating Scheme
+# code never does, so futures pay off for expressions which spend their time in:
+#   - file ports: opening, reading, writing and closing files
+#   - console input: `read` and `read-line` without a port
+#   - indexed data files and bulk number loading (file I/O and numpy parsing)
+#   - `pmap` and `pfor-each` while they wait for their worker processes
+#   - `require`, `load` and `save-image` while they read or write their files
+# Anything else in a future costs a thread switch and gains nothing.
+#
+# Each future is evaluated by a child evaluator of its own (see `EvalContext.child`),
+# which shares the global environment with its parent. Defines and assignments are
+# atomic (see `Environment`), but nothing orders a future's `set!` against the code
+# around it, so a future should not assign variables that other code reads.
+
+import os
+from contextlib import ExitStack
+
+# Threads evaluating futures, at most. More futures wait in a queue for a free thread.
+FUTURE_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        from concurrent.futures import ThreadPoolExecutor  # imported on first use to keep startup fast
+
+        _executor = ThreadPoolExecutor(max_workers=FUTURE_WORKERS, thread_name_prefix="scheme-future")
+
+    return _executor
+
+
+def _compute(thunk, evaluator: "Evaluator"):
+    with ExitStack() as stack:
+        governor = evaluator.context.governor
+        if governor is not None:
+            stack.push(governor)  # only stopped here, it was started when the future was created
+
+        return thunk(evaluator)
+
+
+class Future:
+    """
+    The value of `future`: a thunk computed on the future thread pool.
+
+    The thunk is called as `thunk(evaluator)` with a child evaluator of the evaluator
+    which created the future. Its governor, if any, has budgets of its own, counted
+    from the creation of the future. `touch` waits for the result, or raises the error
+    the thunk raised. A future which still waits for a free thread when it is touched
+    is taken off the queue and computed by the touching thread, so touching never
+    waits for a thread which is itself blocked in a `touch`.
+    """
+
+    def __init__(self, thunk, evaluator: "Evaluator"):
+        import threading
+        from concurrent.futures import Future as _Result
+
+        self._thunk = thunk
+        self._lock = threading.Lock()
+        self._inline = None  # the result when computed by a touching thread
+        self._new_result = _Result
+        self._child = evaluator.child()
+        self._pending = _get_executor().submit(_compute, thunk, self._child)
+
+    @property
+    def is_done(self) -> bool:
+        return (self._inline or self._pending).done()
+
+    def touch(self, evaluator: "Evaluator"):
+        with self._lock:
+            claimed = self._inline is None and self._pending.cancel()
+            if claimed:
+                self._inline = self._new_result()
+
+        if claimed:
+            if self._child.context.governor is not None:
+                self._child.context.governor.stop()  # never used, the touching evaluator's governs the thunk
+
+            try:
+                self._inline.set_result(self._thunk(evaluator))
+            except BaseException as e:
+                self._inline.set_exception(e)
+
+            self._thunk = None
+
+        return (self._inline or self._pending).result()
+
+    def __repr__(self):
+        return "#<future>"
+
+
+__all__ = [
+    "Future",
+    "FUTURE_WORKERS"
+]
@@ -0,0 +1,175 @@
+# Budgets for a single evaluation, enforced from inside the evaluator.
+#
+# The evaluator calls `Governor.step()` for every compound form it evaluates, and
+# only if its context has a governor. Every procedure call and every iteration of a
+# loop is a compound form, so no evaluation can run for long without stepping.
+# Without a governor, the whole cost is one `None` check per compound form.
+#
+# The step count is compared on every step. The clock and the memory are looked at
+# only every `CHECK_INTERVAL` steps, so a deadline may be overrun by that many
+# steps. Time spent inside a single primitive, e.g. reading a huge file, is only
+# noticed once the primitive returns.
+#
+# Recursion too deep for Python's stack raises RecursionError long before a
+# generous step budget runs out. Leaving a governed evaluation turns it into a
+# `ResourceLimitError` for the "depth" limit, so it is reported like the budgets.
+#
+# Memory is measured with tracemalloc, which slows down every allocation while it
+# runs, so it is only started by a governor with a memory budget. It counts the
+# memory allocated by the whole process since the evaluation began, so in a process
+# running several sessions at once the budget covers their sum.
+
+import time
+
+from src.errors import ResourceLimitError
+
+# Steps between two looks at the clock and the memory
+CHECK_INTERVAL = 1024
+
+_tracing_lock = None
+_tracing_users = 0  # governors with a memory budget which are running
+_started_tracing = False  # whether tracemalloc was started here rather than by someone else
+
+
+def _start_tracing():
+    global _tracing_lock, _tracing_users, _started_tracing
+    import threading
+    import tracemalloc  # imported on first use to keep startup fast
+
+    if _tracing_lock is None:
+        _tracing_lock = threading.Lock()
+
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _started_tracing
+    import tracemalloc
+
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+class Governor:
+    """
+    Step, time and memory budgets for one evaluation at a time.
+
+    `start()` begins an evaluation and `stop()` ends it, or use the governor as a
+    context manager. While an evaluation runs, `step()` raises `ResourceLimitError`
+    as soon as a budget is exceeded. Budgets which are `None` are not enforced.
+    A governor serves one thread, evaluations running at the same time need
+    governors of their own (see `copy`).
+    """
+
+    def __init__(self, max_steps: int | None = None, timeout: float | None = None, max_memory: int | None = None):
+        """
+        Args:
+            max_steps: Reduction steps allowed per evaluation.
+            timeout: Seconds of wall-clock time allowed per evaluation.
+            max_memory: Bytes which may be allocated on top of what was in use when the evaluation began.
+        """
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.max_memory = max_memory
+
+        self.steps = 0
+        self._next_check = float("inf")  # step count at which `_check` runs next
+        self._deadline = None
+        self._memory_base = 0
+        self._tracing = False
+
+    def start(self):
+        self.steps = 0
+        self._deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+
+        if self.max_memory is not None:
+            import tracemalloc
+
+            _start_tracing()
+            self._tracing = True
+            self._memory_base = tracemalloc.get_traced_memory()[0]
+
+        self._next_check = self._next_check_after(0)
+
+    def stop(self):
+        self._next_check = float("inf")
+        if self._tracing:
+            _stop_tracing()
+            self._tracing = False
+
+    def __enter__(self) -> "Governor":
+        self.start()
+        return self
+
+    def __exit__(self, _exc_type, exc, _traceback):
+        self.stop()
+        if isinstance(exc, RecursionError):
+            raise ResourceLimitError("depth") from exc
+
+    def copy(self) -> "Governor":
+        """A governor with the same budgets, not running yet."""
+        return Governor(self.max_steps, self.timeout, self.max_memory)
+
+    def _next_check_after(self, steps: int) -> float:
+        if self._deadline is not None or self._tracing:
+            interval = steps + CHECK_INTERVAL
+            return min(interval, self.max_steps + 1) if self.max_steps is not None else interval
+
+        return self.max_steps + 1 if self.max_steps is not None else float("inf")
+
+    def step(self):
+        self.steps += 1
+        if self.steps >= self._next_check:
+            self._check()
+
+    def _check(self):
+        if self.max_steps is not None and self.steps > self.max_steps:
+            self.stop()
+            raise ResourceLimitError("step")
+
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            self.stop()
+            raise ResourceLimitError("time")
+
+        if self._tracing:
+            import tracemalloc
+
+            if tracemalloc.get_traced_memory()[0] - self._memory_base > self.max_memory:
+                self.stop()
+                raise ResourceLimitError("memory")
+
+        self._next_check = self._next_check_after(self.steps)
+
+
+def add_limit_arguments(arg_parser):
+    """Add the command line options for the budgets of `limits_from_args` to an argparse parser."""
+    arg_parser.add_argument("--max-steps", type=int, default=None, help="reduction steps allowed per top-level form")
+    arg_parser.add_argument("--timeout", type=float, default=None, help="seconds allowed per top-level form")
+    arg_parser.add_argument("--max-memory", type=float, default=None,
+                            help="megabytes a top-level form may allocate (slows evaluation down)")
+
+
+def limits_from_args(args) -> dict | None:
+    """The `Governor` arguments given by the options of `add_limit_arguments`, `None` if no budget is set."""
+    limits = {
+        "max_steps": args.max_steps,
+        "timeout": args.timeout,
+        "max_memory": int(args.max_memory * 2 ** 20) if args.max_memory is not None else None
+    }
+    return limits if any(limit is not None for limit in limits.values()) else None
+
+
+__all__ = [
+    "Governor",
+    "CHECK_INTERVAL",
+    "add_limit_arguments",
+    "limits_from_args"
+]
@@ -0,0 +1,231 @@
+from collections.abc import Mapping
+from functools import partial
+
+# A hash array mapped trie: every level of the trie consumes 5 bits of the key's hash,
+# and a node only stores the children which exist, located through a 32-bit bitmap.
+# Setting a key copies the nodes on the path to it, at most 13 levels for 64-bit
+# hashes, and shares everything else with the previous version of the map.
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+
+# Maps this small are kept as a dict which is copied on every change, which is
+# cheaper than a trie for the few bindings of a procedure call
+_SMALL = 8
+
+_MISSING = object()
+
+
+class _BitmapNode:
+    # `entries` holds, in the order of their bits, a (key, value) pair or a child node
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: tuple):
+        self.bitmap = bitmap
+        self.entries = entries
+
+
+class _CollisionNode:
+    # Keys whose hashes are equal in all bits
+    __slots__ = ("hash", "entries")
+
+    def __init__(self, hash_: int, entries: tuple):
+        self.hash = hash_
+        self.entries = entries
+
+
+_EMPTY_NODE = _BitmapNode(0, ())
+
+
+def _pair_node(shift: int, hash1: int, entry1: tuple, hash2: int, entry2: tuple):
+    # The smallest subtrie holding two entries whose hashes agree below `shift`
+    if hash1 == hash2:
+        return _CollisionNode(hash1, (entry1, entry2))
+
+    index1 = (hash1 >> shift) & _MASK
+    index2 = (hash2 >> shift) & _MASK
+    if index1 == index2:
+        return _BitmapNode(1 << index1, (_pair_node(shift + _BITS, hash1, entry1, hash2, entry2),))
+
+    entries = (entry1, entry2) if index1 < index2 else (entry2, entry1)
+    return _BitmapNode((1 << index1) | (1 << index2), entries)
+
+
+def _assoc(node, shift: int, hash_: int, key, value) -> tuple[object, bool]:
+    # Returns the node with `key` set, and whether the key is new
+    if type(node) is _CollisionNode:
+        if hash_ == node.hash:
+            entries = node.entries
+            for i, (k, v) in enumerate(entries):
+                if k is key or k == key:
+                    if v is value:
+                        return node, False
+
+                    return _CollisionNode(hash_, entries[:i] + ((key, value),) + entries[i + 1:]), False
+
+            return _CollisionNode(hash_, entries + ((key, value),)), True
+
+        # Another hash ends up here, so the collision moves one level down
+        node = _BitmapNode(1 << ((node.hash >> shift) & _MASK), (node,))
+
+    bit = 1 << ((hash_ >> shift) & _MASK)
+    bitmap = node.bitmap
+    entries = node.entries
+    index = (bitmap & (bit - 1)).bit_count()
+
+    if not bitmap & bit:
+        return _BitmapNode(bitmap | bit, entries[:index] + ((key, value),) + entries[index:]), True
+
+    entry = entries[index]
+    if type(entry) is tuple:
+        k = entry[0]
+        if k is key or k == key:
+            if entry[1] is value:
+                return node, False
+
+            new_entry, added = (key, value), False
+        else:
+            new_entry, added = _pair_node(shift + _BITS, hash(k), entry, hash_, (key, value)), True
+    else:
+        new_entry, added = _assoc(entry, shift + _BITS, hash_, key, value)
+        if new_entry is entry:
+            return node, False
+
+    return _BitmapNode(bitmap, entries[:index] + (new_entry,) + entries[index + 1:]), added
+
+
+def _trie_get(root: _BitmapNode, key, default=None):
+    hash_ = hash(key)
+    node = root
+    shift = 0
+    while type(node) is _BitmapNode:
+        bit = 1 << ((hash_ >> shift) & _MASK)
+        bitmap = node.bitmap
+        if not bitmap & bit:
+            return default
+
+        entry = node.entries[(bitmap & (bit - 1)).bit_count()]
+        if type(entry) is tuple:
+            k = entry[0]
+            return entry[1] if k is key or k == key else default
+
+        node = entry
+        shift += _BITS
+
+    for k, v in node.entries:
+        if k is key or k == key:
+            return v
+
+    return default
+
+
+class PersistentMap(Mapping):
+    """
+    An immutable mapping whose `set` returns a new map in O(log n), sharing
+    everything but the changed path with the original.
+
+    Reading works like a read-only dict. Copying a map is never needed, a map can be
+    shared as it is and each holder builds its own versions from it.
+    """
+
+    # `get` is bound per map, to the dict's own method while the map is small, since
+    # it is called for every variable lookup
+    __slots__ = ("_root", "_size", "get")
+
+    def __init__(self, items=()):
+        """
+        Args:
+            items: A mapping or an iterable of (key, value) pairs to start with.
+        """
+        built = EMPTY.update(items) if items else None
+        self._root = built._root if built is not None else {}
+        self._size = len(self._root) if built is None else built._size
+        self.get = self._root.get if type(self._root) is dict else partial(_trie_get, self._root)
+
+    @staticmethod
+    def _make(root, size: int) -> "PersistentMap":
+        new = PersistentMap.__new__(PersistentMap)
+        new._root = root
+        new._size = size
+        new.get = root.get if type(root) is dict else partial(_trie_get, root)
+        return new
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        root = self._root
+        if type(root) is dict:
+            yield from root
+            return
+
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for entry in node.entries:
+                if type(entry) is tuple:
+                    yield entry[0]
+                else:
+                    stack.append(entry)
+
+    def set(self, key, value) -> "PersistentMap":
+        """Return a map with `key` bound to `value`, this map is left unchanged."""
+        root = self._root
+        if type(root) is dict:
+            if key in root or len(root) < _SMALL:
+                new_root = root.copy()
+                new_root[key] = value
+                return PersistentMap._make(new_root, len(new_root))
+
+            # Grown out of the dict representation
+            node = _EMPTY_NODE
+            for k, v in root.items():
+                node, _ = _assoc(node, 0, hash(k), k, v)
+
+            root = node
+
+        new_root, added = _assoc(root, 0, hash(key), key, value)
+        if new_root is self._root:
+            return self
+
+        return PersistentMap._make(new_root, self._size + added)
+
+    def update(self, items) -> "PersistentMap":
+        """Return a map with all the (key, value) pairs of `items` set, this map is left unchanged."""
+        if type(self._root) is dict:
+            # One copy for all the pairs while the result stays small
+            new_root = self._root.copy()
+            new_root.update(items)
+            if len(new_root) <= _SMALL:
+                return PersistentMap._make(new_root, len(new_root))
+
+            items, new = new_root.items(), PersistentMap._make({}, 0)
+        elif isinstance(items, Mapping):
+            items, new = items.items(), self
+        else:
+            new = self
+
+        for key, value in items:
+            new = new.set(key, value)
+
+        return new
+
+    def __repr__(self):
+        return f"PersistentMap({dict(self.items())!r})"
+
+
+EMPTY = PersistentMap._make({}, 0)  # maps are immutable, so every empty one can be this one
+
+__all__ = [
+    "PersistentMap",
+    "EMPTY"
+]
@@ -0,0 +1,118 @@
+from src.ast_nodes import *
+from src.environment import Environment
+from src.serialize import SerializationError, serialize, serialize_many, deserialize_many
+
+# An image is this header followed by the serialized list of loaded modules, as
+# (name . path) pairs, and the name and value of every global binding in turn
+IMAGE_MAGIC = b"OSIMAGE\x01"
+
+
+def dump_image(bindings: dict, loaded_modules: dict[str, str]) -> bytes:
+    """
+    Encode global bindings and the names of the loaded modules as an image.
+
+    Raises:
+        SerializationError: If a bound value has no binary encoding, e.g. a port.
+    """
+    modules = AtomNode("BOOLEAN", "nil")
+    for name, module_path in reversed(loaded_modules.items()):
+        modules = ConsNode(ConsNode(AtomNode("SYMBOL", name), AtomNode("STRING", module_path)), modules)
+
+    values = [modules]
+    for symbol, value in bindings.items():
+        values.append(AtomNode("SYMBOL", symbol))
+        values.append(value)
+
+    return IMAGE_MAGIC + serialize_many(values)
+
+
+def dump_environment_image(env: Environment) -> bytes:
+    """
+    Encode every binding visible from `env`, for restoring in another process.
+
+    Bindings of inner environments shadow those of outer ones. Values which have no
+    binary encoding, e.g. ports, are left out, functions shipped along cannot use them.
+    """
+    chain = []
+    while env is not None:
+        chain.append(env.user_define)
+        env = env.outer
+
+    bindings = {}
+    for user_define in reversed(chain):
+        bindings.update(user_define)
+
+    try:
+        return dump_image(bindings, {})
+    except SerializationError:
+        portable = {}
+        for symbol, value in bindings.items():
+            try:
+                serialize(value)
+            except SerializationError:
+                continue
+
+            portable[symbol] = value
+
+        return dump_image(portable, {})
+
+
+def restore_image(data, env: Environment, loaded_modules: dict[str, str]):
+    """
+    Restore an image made by `dump_image` into `env` and `loaded_modules`.
+
+    Builtin procedures bound to user symbols are resolved through `env.builtins`.
+
+    Raises:
+        SerializationError: If the data is not an image.
+    """
+    data = memoryview(data)
+    if data[:len(IMAGE_MAGIC)] != IMAGE_MAGIC:
+        raise SerializationError("not an image file")
+
+    modules, *bindings = deserialize_many(data[len(IMAGE_MAGIC):], env.builtins)
+    if len(bindings) % 2:
+        raise SerializationError("truncated or corrupted data")
+
+    while isinstance(modules, ConsNode):  # nil when no module was loaded
+        loaded_modules[modules.car.car.value] = modules.car.cdr.value
+        modules = modules.cdr
+
+    for symbol, value in zip(bindings[::2], bindings[1::2]):
+        env.assign(symbol.value, value)
+
+
+def save_image(path: str, env: Environment, loaded_modules: dict[str, str]):
+    """
+    Write the user-defined bindings of `env` and the names of the loaded modules to `path`.
+
+    Raises:
+        OSError: If the file cannot be written.
+        SerializationError: If a bound value has no binary encoding, e.g. a port.
+    """
+    data = dump_image(env.user_define, loaded_modules)  # before opening, so a failure leaves an existing image intact
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def load_image(path: str, env: Environment, loaded_modules: dict[str, str]):
+    """
+    Restore the bindings and loaded modules saved by `save_image` into `env` and `loaded_modules`.
+
+    Raises:
+        OSError: If the file cannot be read.
+        SerializationError: If the file is not an image.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    restore_image(data, env, loaded_modules)
+
+
+__all__ = [
+    "dump_image",
+    "dump_environment_image",
+    "restore_image",
+    "save_image",
+    "load_image"
+]
@@ -0,0 +1,196 @@
+from src.ast_nodes import *
+from src.builtins_registry import built_in_funcs
+from src.context import EvalContext
+from src.environment import Environment
+from src.errors import NoReturnValue
+from src.evaluator import Evaluator
+from src.governor import Governor
+from src.lexer import Lexer
+from src.output import OutputBuffer
+from src.parser import Parser, parse_program
+
+
+class Symbol(str):
+    """A Scheme symbol converted to Python, to tell it apart from a string."""
+
+    def __repr__(self):
+        return f"Symbol({str.__repr__(self)})"
+
+
+class Pair:
+    """A dotted pair converted to Python, for lists which do not end in nil."""
+
+    def __init__(self, car=None, cdr=None):
+        self.car = car
+        self.cdr = cdr
+
+    def __eq__(self, other):
+        return isinstance(other, Pair) and self.car == other.car and self.cdr == other.cdr
+
+    def __repr__(self):
+        return f"Pair({self.car!r}, {self.cdr!r})"
+
+
+def to_python(value):
+    """
+    Convert a Scheme value to plain Python data.
+
+    INT, FLOAT and STRING become int, float and str, symbols become `Symbol`,
+    #t becomes True, nil and void become None, proper lists become lists and
+    other pairs become `Pair`. A quoted value becomes `[Symbol("quote"), value]`.
+    Everything else (procedures, ports, vectors, ...) is returned as the underlying
+    Python object. The conversion does not recurse, so any depth works.
+    """
+    root = [None]
+    # (value, container, key): the converted value is stored as container[key],
+    # or as an attribute of a `Pair` container
+    stack = [(value, root, 0)]
+    while stack:
+        node, container, key = stack.pop()
+
+        if isinstance(node, ConsNode):
+            elements = Evaluator.extract_list(node)
+            if elements is None:
+                converted = Pair()
+                stack.append((node.cdr, converted, "cdr"))
+                stack.append((node.car, converted, "car"))
+            else:
+                converted = [None] * len(elements)
+                stack.extend((element, converted, i) for i, element in reversed(list(enumerate(elements))))
+
+        elif isinstance(node, QuoteNode):
+            converted = [Symbol("quote"), None]
+            stack.append((node.value, converted, 1))
+
+        elif isinstance(node, AtomNode):
+            if node.type == "SYMBOL":
+                converted = Symbol(node.value)
+            elif node.type == "BOOLEAN":
+                converted = True if node.value == "#t" else None
+            elif node.type == "VOID":
+                converted = None
+            else:
+                converted = node.value
+
+        else:
+            converted = node
+
+        if isinstance(container, Pair):
+            setattr(container, key, converted)
+        else:
+            container[key] = converted
+
+    return root[0]
+
+
+class Program:
+    """Parsed forms of a source text, which can be run again and again without parsing."""
+
+    def __init__(self, interpreter: "Interpreter", forms: list[ASTNode]):
+        self.interpreter = interpreter
+        self.forms = forms
+
+    def __len__(self):
+        return len(self.forms)
+
+    def run(self):
+        """Evaluate all forms, returning the Python value of the last one (None if there is none)."""
+        return self.interpreter.run(self)
+
+
+class Interpreter:
+    """
+    An OurScheme interpreter driven from Python instead of `repl()`.
+
+    Each instance has its own global environment, so definitions persist between
+    calls on the same instance but are not shared between instances. Errors are
+    raised as the usual `OurSchemeError` subclasses, syntax errors as
+    `UnexpectedTokenError`, `NoClosingQuoteError` or `NotFinishError`.
+    """
+
+    def __init__(self, output=None, output_threshold: int = 8192, governor: Governor | None = None):
+        """
+        Args:
+            output: Text stream receiving everything the program prints, `None` means `sys.stdout`.
+            output_threshold (int): Number of buffered characters which triggers a write to `output`.
+            governor: Budgets applied to the evaluation of each top-level form, `ResourceLimitError`
+                      is raised when one is exceeded.
+        """
+        self.lexer = Lexer()
+        self.parser = Parser()
+        self.global_env = Environment(built_in_funcs)
+        self.evaluator = Evaluator(EvalContext(self.global_env, self.parser,
+                                               output=OutputBuffer(output, threshold=output_threshold)))
+        self.evaluator.context.governor = governor
+
+    def _evaluate(self, forms: list[ASTNode]):
+        evaluate = self.evaluator.evaluate
+        env = self.global_env
+        governor = self.evaluator.context.governor
+
+        result = None
+        for form in forms:
+            if governor is None:
+                result = evaluate(form, env, "toplevel")
+            else:
+                with governor:
+                    result = evaluate(form, env, "toplevel")
+
+            if result is None:
+                raise NoReturnValue(form)
+
+        return result
+
+    def compile(self, source: str) -> Program:
+        """
+        Parse `source` once into a `Program`.
+
+        Raises:
+            NotFinishError, UnexpectedTokenError, NoClosingQuoteError: If the source is malformed.
+        """
+        return Program(self, parse_program(source, self.lexer, self.parser))
+
+    def run(self, program: Program):
+        """Evaluate a compiled program, returning the Python value of its last form."""
+        try:
+            return to_python(self._evaluate(program.forms))
+        finally:
+            self.evaluator.context.output.flush()
+
+    def eval_string(self, source: str):
+        """Parse and evaluate `source`, returning the Python value of its last form."""
+        try:
+            return to_python(self._evaluate(parse_program(source, self.lexer, self.parser)))
+        finally:
+            self.evaluator.context.output.flush()
+
+    def eval_many(self, sources) -> list:
+        """
+        Evaluate many sources or compiled programs in one call.
+
+        The output is flushed once at the end instead of once per source.
+
+        Returns:
+            list: The Python value of the last form of each source, in order.
+        """
+        lexer, parser = self.lexer, self.parser
+        evaluate = self._evaluate
+
+        results = []
+        try:
+            for source in sources:
+                forms = source.forms if isinstance(source, Program) else parse_program(source, lexer, parser)
+                results.append(to_python(evaluate(forms)))
+        finally:
+            self.evaluator.context.output.flush()
+
+        return results
+
+
+__all__ = [
+    "Interpreter",
+    "Program",
+    "Symbol",
+    "Pair",
+    "to_python"
+]
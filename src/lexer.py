@@ -1,5 +1,4 @@
 import sys
-import numpy as np
 
 
 class Token:
@@ -249,15 +248,13 @@ class Lexer:
             return Token("SYMBOL", number_str, self._line_number, start_pos, end_pos)
 
         try:
-            val = np.float64(number_str)
+            val = float(number_str)
             if '.' in number_str or 'e' in number_str.lower():
-                return Token("FLOAT", float(val), self._line_number, start_pos, end_pos)
-            elif np.isclose(val, int(val)):
-                return Token("INT", int(val), self._line_number, start_pos, end_pos)
+                return Token("FLOAT", val, self._line_number, start_pos, end_pos)
             else:
-                return Token("FLOAT", float(val), self._line_number, start_pos, end_pos)
+                return Token("INT", int(val), self._line_number, start_pos, end_pos)
 
-        except ValueError:
+        except (ValueError, OverflowError):  # not a number, or "nan"/"inf" which have no integer value
             return Token("SYMBOL", number_str, self._line_number, start_pos, end_pos)
 
     def _read_symbol(self) -> Token:
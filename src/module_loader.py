@@ -0,0 +1,106 @@
+import os
+
+from src import __version__
+from src.ast_nodes import ASTNode
+from src.parser import parse_program
+from src.serialize import serialize_many, deserialize_many
+
+# Parsed forms are cached in this directory next to the source file, like __pycache__
+CACHE_DIR = "__schemecache__"
+SOURCE_SUFFIX = ".scm"
+PATH_ENV_VAR = "OURSCHEME_PATH"
+
+
+def default_module_path() -> list[str]:
+    """The current directory followed by the directories listed in $OURSCHEME_PATH."""
+    extra = os.environ.get(PATH_ENV_VAR, "")
+    return [os.curdir] + [path for path in extra.split(os.pathsep) if path]
+
+
+def find_module(name: str, search_path: list[str]) -> str | None:
+    """
+    Find the source file of a module.
+
+    Args:
+        name (str): Module name, `lib` is looked up as `lib.scm`.
+        search_path (list[str]): Directories to search in order.
+
+    Returns:
+        str | None: Path of the first matching file, or None if there is none.
+    """
+    for directory in search_path:
+        path = os.path.join(directory, name + SOURCE_SUFFIX)
+        if os.path.isfile(path):
+            return path
+
+    return None
+
+
+def cache_path(source_path: str) -> str:
+    directory, filename = os.path.split(os.path.abspath(source_path))
+    return os.path.join(directory, CACHE_DIR, f"{filename}.{__version__}.ast")
+
+
+# A cache file is the SHA-256 digest of the source followed by the serialized forms
+def _read_cache(path: str, source_hash: bytes) -> list[ASTNode] | None:
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        if data[:len(source_hash)] != source_hash:
+            return None
+
+        return deserialize_many(memoryview(data)[len(source_hash):])
+    except Exception:  # missing, unreadable or stale cache files are simply ignored
+        return None
+
+
+def _write_cache(path: str, source_hash: bytes, forms: list[ASTNode]):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, "wb") as f:
+            f.write(source_hash)
+            f.write(serialize_many(forms))
+
+        os.replace(temp_path, path)
+    except Exception:  # caching is only an optimization
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def load_forms(source_path: str) -> list[ASTNode]:
+    """
+    Return the parsed forms of a source file, using the on-disk cache when possible.
+
+    The cache is keyed by the SHA-256 of the source and the interpreter version,
+    so it is invalidated as soon as either changes.
+
+    Raises:
+        OSError: If the source file cannot be read.
+        NotFinishError, UnexpectedTokenError, NoClosingQuoteError: If the source is malformed.
+    """
+    import hashlib  # imported on first use to keep startup fast
+
+    with open(source_path, "rb") as f:
+        raw = f.read()
+
+    source_hash = hashlib.sha256(raw).digest()
+    cached = cache_path(source_path)
+
+    forms = _read_cache(cached, source_hash)
+    if forms is None:
+        forms = parse_program(raw.decode("utf-8"))
+        _write_cache(cached, source_hash, forms)
+
+    return forms
+
+
+__all__ = [
+    "default_module_path",
+    "find_module",
+    "cache_path",
+    "load_forms"
+]
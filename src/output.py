@@ -0,0 +1,68 @@
+import sys
+
+
+class OutputBuffer:
+    """
+    Buffered writer for everything the interpreter prints.
+
+    Text is collected in memory and written to the underlying stream in one call
+    when `flush()` is called or when the buffered size reaches `threshold`.
+    """
+
+    def __init__(self, stream=None, threshold: int = 8192):
+        """
+        Args:
+            stream: The text stream to write to. `None` means the current `sys.stdout`.
+            threshold (int): Number of buffered characters which triggers a flush.
+                             0 makes the buffer write through on every call.
+        """
+        self.stream = stream
+        self.threshold = threshold
+        self._chunks = []
+        self._size = 0
+
+    def write(self, text: str):
+        self._chunks.append(text)
+        self._size += len(text)
+
+        if self._size >= self.threshold:
+            self.flush()
+
+    def flush(self):
+        stream = self.stream if self.stream is not None else sys.stdout
+
+        if self._chunks:
+            stream.write("".join(self._chunks))
+            self._chunks.clear()
+            self._size = 0
+
+        stream.flush()
+
+
+class SynchronizedOutput:
+    """
+    Serializes the writes and flushes of several threads to one `OutputBuffer`.
+
+    Every `write()` is appended as a whole, so the text written by one call is never
+    interleaved with the text of another thread.
+    """
+
+    def __init__(self, output: OutputBuffer):
+        import threading  # imported on first use to keep startup fast
+
+        self.output = output
+        self._lock = threading.Lock()
+
+    def write(self, text: str):
+        with self._lock:
+            self.output.write(text)
+
+    def flush(self):
+        with self._lock:
+            self.output.flush()
+
+
+__all__ = [
+    "OutputBuffer",
+    "SynchronizedOutput"
+]
@@ -0,0 +1,175 @@
+import hashlib
+import io
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from src.ast_nodes import *
+from src.context import EvalContext
+from src.environment import Environment
+from src.image import dump_environment_image, restore_image
+from src.output import OutputBuffer
+from src.serialize import SerializationError, serialize, serialize_many, deserialize, deserialize_many
+
+# A map whose serial run is estimated to take less than this is not worth shipping to other processes
+PARALLEL_THRESHOLD = 0.05  # seconds
+# Chunks are sized to take about this long, long enough to amortize the round trip to a worker
+TARGET_CHUNK_TIME = 0.05  # seconds
+# Never fewer chunks than this per worker, so uneven chunks still keep every worker busy
+MIN_CHUNKS_PER_WORKER = 2
+
+WORKERS = os.cpu_count() or 1
+
+_pool = None
+
+# State of a worker process: the image its global environment was restored from, and the evaluator using it
+_worker_image_digest = None
+_worker_evaluator = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Workers come from a fork server, forking this process could copy locks held
+        # by the threads of futures or server sessions
+        context = get_context("forkserver")
+        context.set_forkserver_preload(["src.parallel"])
+        _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=context)
+
+    return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    # A worker died, e.g. killed for running out of memory. The pool is unusable now,
+    # the next map starts a new one.
+    global _pool
+    if _pool is pool:
+        _pool = None
+
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _evaluator_for(digest: bytes, image: bytes):
+    global _worker_image_digest, _worker_evaluator
+    if digest != _worker_image_digest:
+        from src.builtins_registry import built_in_funcs
+        from src.evaluator import Evaluator
+
+        env = Environment(built_in_funcs)
+        restore_image(image, env, {})
+        _worker_evaluator = Evaluator(EvalContext(env))
+        _worker_image_digest = digest
+
+    return _worker_evaluator
+
+
+def _run_chunk(digest: bytes, image: bytes, func_data: bytes, chunk_data: bytes) -> tuple[bytes, str]:
+    """
+    Apply a function to a chunk of elements in a worker process.
+
+    Returns:
+        (results, output): The serialized results and what was printed while computing
+        them. If an element fails, only the results before it are returned, and the
+        caller applies the function to the remaining elements itself.
+    """
+    evaluator = _evaluator_for(digest, image)
+    env = evaluator.context.global_env
+    func = deserialize(func_data, env.builtins)
+    elements = deserialize_many(chunk_data, env.builtins)
+
+    text = io.StringIO()
+    evaluator.context.output = OutputBuffer(text)
+
+    results = []
+    done_output = 0  # length of the output of the elements which succeeded
+    for element in elements:
+        try:
+            results.append(evaluator.apply_procedure(func, [element], env))
+            evaluator.context.output.flush()
+        except Exception:
+            break
+
+        done_output = text.tell()
+
+    try:
+        return serialize_many(results), text.getvalue()[:done_output]
+    except SerializationError:  # e.g. a result holding a port
+        return serialize_many([]), ""
+
+
+def parallel_map(func, elements: list[ASTNode], env: Environment, evaluator: "Evaluator") -> list[ASTNode]:
+    """
+    Apply `func` to every element, in worker processes when it pays off.
+
+    The first element is always applied here, and its duration decides whether
+    the rest is worth distributing and how many elements go into one chunk.
+    Results come back in the order of `elements`, and what the workers print is
+    written to the evaluator's output in the same order. Elements for which a
+    worker fails are applied here again, so errors are raised just like in a
+    serial map. If a worker process dies, the elements not collected yet are
+    applied here too. `func` should be free of side effects other than printing.
+    """
+    if not elements:
+        return []
+
+    start = time.perf_counter()
+    results = [evaluator.apply_procedure(func, [elements[0]], env)]
+    per_element = time.perf_counter() - start
+
+    rest = elements[1:]
+    if WORKERS < 2 or per_element * len(rest) < PARALLEL_THRESHOLD:
+        results.extend(evaluator.apply_procedure(func, [element], env) for element in rest)
+        return results
+
+    try:
+        image = dump_environment_image(evaluator.context.global_env)
+        func_data = serialize(func)
+        chunk_size = max(1, min(int(TARGET_CHUNK_TIME / max(per_element, 1e-9)),
+                                math.ceil(len(rest) / (WORKERS * MIN_CHUNKS_PER_WORKER))))
+        chunks = [rest[i:i + chunk_size] for i in range(0, len(rest), chunk_size)]
+        chunk_data = [serialize_many(chunk) for chunk in chunks]
+    except SerializationError:
+        results.extend(evaluator.apply_procedure(func, [element], env) for element in rest)
+        return results
+
+    digest = hashlib.sha256(image).digest()
+    pool = _get_pool()
+    futures = []
+    try:
+        for data in chunk_data:
+            futures.append(pool.submit(_run_chunk, digest, image, func_data, data))
+
+        for index, (chunk, future) in enumerate(zip(chunks, futures)):
+            try:
+                data, output = future.result()
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                for chunk in chunks[index:]:  # this chunk and the rest are applied here
+                    results.extend(evaluator.apply_procedure(func, [element], env) for element in chunk)
+
+                break
+
+            if output:
+                evaluator.context.output.write(output)
+
+            done = deserialize_many(data, env.builtins)
+            results.extend(done)
+            results.extend(evaluator.apply_procedure(func, [element], env) for element in chunk[len(done):])
+
+    except BrokenProcessPool:  # raised by `submit` when the pool broke before
+        _discard_pool(pool)
+        results.extend(evaluator.apply_procedure(func, [element], env) for element in rest)
+
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return results
+
+
+__all__ = [
+    "parallel_map"
+]
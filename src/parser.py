@@ -21,6 +21,10 @@ class Parser:
         # and the next character after that is the beginning of the new token.
         self._last_token_end_pos = 0
 
+        # Start offset of every line of the lexer's source code, and the source they belong to
+        self._line_offsets = [0]
+        self._line_offsets_source = None
+
     @staticmethod
     def _is_token_type(token: Token, *types: str) -> bool:
         """
@@ -57,6 +61,39 @@ class Parser:
 
         return result
 
+    def _line_offset(self, line: int) -> int:
+        """
+        Calculate the number of characters (including '\\n') in the lines of the
+        source code before the given line.
+
+        The offsets of all lines are computed once per source code, so the cost
+        does not grow with the size of the source.
+
+        Args:
+            line (int): 1-based line number.
+
+        Returns:
+            int: Character index in the source code where the line starts.
+        """
+        source = self.lexer.source_code
+        if self._line_offsets_source is not source:
+            offsets = [0]
+            newline = source.find("\n")
+            while newline != -1:
+                offsets.append(newline + 1)
+                newline = source.find("\n", newline + 1)
+
+            self._line_offsets = offsets
+            self._line_offsets_source = source
+
+        # Same as the number of lines in `source.split("\\n")[:line - 1]`
+        line_count = len(self._line_offsets)
+        preceding = min(line - 1, line_count) if line >= 1 else max(line_count + line - 1, 0)
+        if preceding == line_count:
+            return len(source) + 1
+
+        return self._line_offsets[preceding]
+
     def _consume_token(self) -> Token:
         """Consume the current token and advance to the next one."""
         if Parser._is_token_type(self._current_token, "ERROR"):
@@ -65,10 +102,7 @@ class Parser:
         token = self._current_token
 
         self._last_token_end_pos = (
-                sum(map(len, self.lexer.source_code.split("\n")[
-                             :token.line - 1]))  # Total number of characters in all lines before the current one
-                + len(self.lexer.source_code.split("\n")[
-                      :token.line - 1])  # One '\n' for each previous line (newline compensation)
+                self._line_offset(token.line)  # All characters and '\n's of the lines before the current one
                 + (token.end_pos - 1)  # End column of the token in its line (1-based → subtract 1)
         )
 
@@ -111,8 +145,7 @@ class Parser:
                              both starting from 1.
         """
         # Calculate the token's absolute position (as character offset from the start of the entire source code)
-        global_char_pos = sum(
-            len(line) + 1 for line in self.lexer.source_code.split("\n")[:token.line - 1]) + token.start_pos - 1
+        global_char_pos = self._line_offset(token.line) + token.start_pos - 1
 
         # Slice the source code from the current S-expression start up to the token's absolute position
         relative_text = self.lexer.source_code[self._current_s_exp_start_pos:global_char_pos]
@@ -316,3 +349,35 @@ class Parser:
         self._current_s_exp_start_pos = self._last_token_end_pos + 1
 
         return ast
+
+
+def parse_program(source: str, lexer: Lexer = None, parser: Parser = None) -> list[ASTNode]:
+    """
+    Parse every S-expression of a complete source text, e.g. the content of a file.
+
+    Args:
+        source (str): The source code.
+        lexer (Lexer): Lexer to reuse, a new one if omitted.
+        parser (Parser): Parser to reuse, a new one if omitted.
+
+    Returns:
+        list[ASTNode]: The parsed S-expressions in source order.
+
+    Raises:
+        NotFinishError: If the source ends in the middle of an S-expression.
+        UnexpectedTokenError, NoClosingQuoteError: If the source is malformed.
+    """
+    lexer = lexer if lexer is not None else Lexer()
+    parser = parser if parser is not None else Parser()
+    lexer.reset(source)
+
+    try:
+        parser.reset(lexer)
+    except EmptyInputError:
+        return []
+
+    forms = []
+    while parser.current.type != "EOF":
+        forms.append(parser.parse())
+
+    return forms
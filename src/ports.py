@@ -0,0 +1,203 @@
+from src.ast_nodes import ASTNode
+from src.errors import NotFinishError, EmptyInputError, UnexpectedTokenError, NoClosingQuoteError
+from src.lexer import Lexer
+from src.parser import Parser
+
+
+class Port:
+    """Base class of file ports."""
+
+    def __init__(self, path: str, file):
+        self.path = path
+        self._file = file
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def close(self):
+        self._file.close()
+
+    def __repr__(self):
+        return f'#<port "{self.path}">'
+
+
+class InputPort(Port):
+    """
+    Text input port.
+
+    The file is read through Python's buffered reader one line at a time. Only the
+    lines of the S-expression being parsed are handed to the `Lexer`, so a file is
+    streamed form by form without ever being loaded into memory as a whole.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path, open(path, encoding="utf-8"))
+        self._pending = ""  # text already read from the file but not consumed yet
+        self._lexer = Lexer()
+        self._parser = Parser()
+
+    def read_line(self) -> str | None:
+        """
+        Read the rest of the current line.
+
+        Returns:
+            str | None: The line without its line break, or None at end of file.
+        """
+        if self._pending:
+            line, newline, self._pending = self._pending.partition("\n")
+            if newline:
+                return line
+
+            return line + self._file.readline().removesuffix("\n")
+
+        line = self._file.readline()
+        if line == "":
+            return None
+
+        return line.removesuffix("\n")
+
+    def read(self) -> ASTNode | None:
+        """
+        Parse the next S-expression.
+
+        Returns:
+            ASTNode | None: The parsed S-expression, or None at end of file.
+
+        Raises:
+            UnexpectedTokenError, NoClosingQuoteError: If the text is not a valid S-expression.
+                                                       The rest of the form, up to the line where
+                                                       its parentheses balance, is dropped.
+            NotFinishError: If the file ends in the middle of an S-expression.
+        """
+        lines = [self._pending]
+        depth = _open_parens(self._pending)
+        while True:
+            # Lines of an unfinished form are only collected, the form is lexed and parsed once it is complete
+            while depth > 0:
+                line = self._file.readline()
+                if line == "":
+                    break
+
+                lines.append(line)
+                depth = _open_parens(line, depth)
+
+            text = "".join(lines)
+            try:
+                self._lexer.reset(text)
+                self._parser.reset(self._lexer)
+                result = self._parser.parse()
+
+                self._pending = text[self._parser.last_s_exp_pos + 1:]
+                return result
+
+            except EmptyInputError:
+                # Only whitespace and comments so far, nothing worth keeping
+                line = self._file.readline()
+                if line == "":
+                    self._pending = ""
+                    return None
+
+                lines = [line]
+                depth = _open_parens(line)
+
+            except NotFinishError:
+                line = self._file.readline()
+                if line == "":
+                    self._pending = ""
+                    raise
+
+                lines = [text, line]
+                depth = _open_parens(line)
+
+            except (UnexpectedTokenError, NoClosingQuoteError):
+                self._pending = ""
+                raise
+
+
+def _open_parens(text: str, depth: int = 0) -> int:
+    """
+    Count the parentheses left open after `text`, when `depth` were open before it.
+
+    A cheap scan telling whether a form goes on in the next line, without lexing it.
+    Parentheses in strings and comments do not count. Once the parentheses balance,
+    or a string is not closed in its line (which the parser reports), 0 is returned.
+    """
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if char == "(":
+            depth += 1
+
+        elif char == ")":
+            depth -= 1
+            if depth <= 0:
+                return 0
+
+        elif char == ";":
+            position = text.find("\n", position)
+            if position == -1:
+                break
+
+        elif char == "\"":
+            position += 1
+            while position < len(text) and text[position] not in "\"\n":
+                position += 2 if text[position] == "\\" else 1
+
+            if position >= len(text) or text[position] == "\n":
+                return 0
+
+        position += 1
+
+    return depth
+
+
+class OutputPort(Port):
+    """Text output port, writing through Python's buffered writer."""
+
+    def __init__(self, path: str):
+        super().__init__(path, open(path, "w", encoding="utf-8"))
+
+    def write(self, text: str):
+        self._file.write(text)
+
+    def flush(self):
+        self._file.flush()
+
+
+class BinaryInputPort(Port):
+    """Binary input port, reading straight into bytevector buffers."""
+
+    def __init__(self, path: str):
+        super().__init__(path, open(path, "rb"))
+
+    def read_into(self, buffer) -> int:
+        """
+        Fill a writable buffer with bytes from the file without an intermediate copy.
+
+        Returns:
+            int: Number of bytes read, 0 at end of file.
+        """
+        return self._file.readinto(buffer)
+
+
+class BinaryOutputPort(Port):
+    """Binary output port, writing any buffer (bytearray, memoryview) without conversion."""
+
+    def __init__(self, path: str):
+        super().__init__(path, open(path, "wb"))
+
+    def write(self, buffer):
+        self._file.write(buffer)
+
+    def flush(self):
+        self._file.flush()
+
+
+__all__ = [
+    "Port",
+    "InputPort",
+    "OutputPort",
+    "BinaryInputPort",
+    "BinaryOutputPort"
+]
@@ -0,0 +1,228 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+
+from src.builtins_registry import built_in_funcs
+from src.context import EvalContext
+from src.environment import Environment
+from src.errors import OurSchemeError
+from src.evaluator import Evaluator
+from src.governor import Governor, add_limit_arguments, limits_from_args
+from src.module_loader import load_forms
+from src.repl import repl
+
+
+def preload_environment(path: str | None) -> Environment:
+    """
+    Evaluate a preload script into a fresh global environment.
+
+    Raises:
+        OSError: If the script cannot be read.
+        OurSchemeError: If evaluating the script fails.
+    """
+    env = Environment(built_in_funcs)
+    if path is not None:
+        evaluator = Evaluator(EvalContext(env, verbose=False))  # no "defined" messages for the preload
+        for form in load_forms(path):
+            evaluator.evaluate(form, env, "toplevel")
+
+        evaluator.context.output.flush()
+
+    return env
+
+
+class PreforkServer:
+    """
+    Serves scripts from worker processes forked off a preloaded parent (POSIX only).
+
+    The parent evaluates the preload script once, freezes the garbage collector so
+    that the preloaded objects are never touched again, and forks the workers.
+    The workers therefore share the builtins and preloaded definitions with the
+    parent through copy-on-write pages instead of building them per request.
+
+    All workers accept on the same listening socket, so a connection is always
+    taken by a worker which is idle. A connection sends a script and shuts down its
+    sending side, and receives the `repl()` transcript of the script. Each script
+    runs in a new environment whose outer environment is a fork of the preloaded
+    one, so neither definitions nor assignments leak from one request into the
+    next. Values changed in place, e.g. by `bytevector-u8-set!` or
+    `builder-append!`, are still shared. A worker exits after `max_requests`
+    scripts and the parent forks a fresh one in its place. If `limits` are given,
+    each top-level form of a script is bounded by a `Governor` built from them.
+    """
+
+    def __init__(self, preload: str | None = None, workers: int = 4, max_requests: int = 1000,
+                 output_threshold: int = 8192, limits: dict | None = None):
+        self.preload = preload
+        self.workers = workers
+        self.max_requests = max_requests
+        self.output_threshold = output_threshold
+        self.limits = limits
+        self.preload_env = None
+        self._listener = None
+        self._unix_path = None
+        self._children = set()
+        self._stopping = False
+
+    def listen(self, host: str = "127.0.0.1", port: int = 0, path: str | None = None) -> str:
+        """Open the listening socket, a Unix socket if `path` is given, and return its address."""
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+
+            self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._listener.bind(path)
+            self._unix_path = path
+            address = path
+        else:
+            self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._listener.bind((host, port))
+            address = "%s:%d" % self._listener.getsockname()[:2]
+
+        self._listener.listen(128)
+        return address
+
+    def _serve_connection(self, conn: socket.socket):
+        with conn, conn.makefile("r", encoding="utf-8", errors="replace", newline="\n") as rfile, \
+                conn.makefile("w", encoding="utf-8") as wfile:
+
+            def reader() -> str:
+                line = rfile.readline()
+                if not line:
+                    raise EOFError
+
+                return line.rstrip("\r\n")
+
+            # A fork, so a `set!` of a preloaded binding stays in this request
+            env = Environment(built_in_funcs, outer=self.preload_env.fork())
+            governor = Governor(**self.limits) if self.limits is not None else None
+            try:
+                repl(output_threshold=self.output_threshold, reader=reader, stream=wfile, global_env=env,
+                     governor=governor)
+            except ConnectionError:
+                pass  # client went away
+
+    def _worker(self):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        gc.enable()
+
+        for _ in range(self.max_requests):
+            conn, _ = self._listener.accept()
+            self._serve_connection(conn)
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._worker()
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)  # never run the parent's cleanup in a worker
+
+        self._children.add(pid)
+
+    def _stop(self, _signum, _frame):
+        self._stopping = True
+        for pid in self._children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def load(self):
+        """
+        Evaluate the preload script, done by `serve_forever` if not called before.
+
+        Raises:
+            OSError, OurSchemeError: If the preload script cannot be read or evaluated.
+        """
+        # Collections in the parent would touch, and so copy, every preloaded page
+        gc.disable()
+        self.preload_env = preload_environment(self.preload)
+        gc.freeze()
+
+    def serve_forever(self):
+        """Fork the workers and replace every worker which exits, until SIGTERM or SIGINT."""
+        if self.preload_env is None:
+            self.load()
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        try:
+            for _ in range(self.workers):
+                self._spawn()
+
+            while self._children:
+                try:
+                    pid, _ = os.wait()
+                except ChildProcessError:
+                    break
+                except InterruptedError:
+                    continue
+
+                self._children.discard(pid)
+                if not self._stopping:
+                    self._spawn()
+        finally:
+            self._listener.close()
+            if self._unix_path is not None and os.path.exists(self._unix_path):
+                os.remove(self._unix_path)
+
+
+def send_script(source: str, host: str = "127.0.0.1", port: int = 0, path: str | None = None) -> str:
+    """Run `source` on a prefork server and return the transcript."""
+    if path is not None:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(path)
+    else:
+        conn = socket.create_connection((host, port))
+
+    with conn:
+        conn.sendall(source.encode("utf-8"))
+        conn.shutdown(socket.SHUT_WR)
+
+        chunks = []
+        while chunk := conn.recv(65536):
+            chunks.append(chunk)
+
+    return b"".join(chunks).decode("utf-8")
+
+
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description="OurScheme prefork server")
+    arg_parser.add_argument("--preload", default=None, help="script evaluated once before forking")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    arg_parser.add_argument("--max-requests", type=int, default=1000, help="scripts served before a worker is replaced")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=7474, help="TCP port, 0 picks a free one")
+    arg_parser.add_argument("--unix", default=None, help="listen on this Unix socket path instead of TCP")
+    add_limit_arguments(arg_parser)
+    return arg_parser.parse_args()
+
+
+__all__ = [
+    "PreforkServer",
+    "preload_environment",
+    "send_script"
+]
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = PreforkServer(args.preload, args.workers, args.max_requests, limits=limits_from_args(args))
+    try:
+        server.load()
+    except (OSError, OurSchemeError) as e:
+        sys.exit(f"preload failed: {e}")
+
+    address = server.listen(args.host, args.port, args.unix)
+    print(f"OurScheme prefork server listening on {address}", flush=True)
+    server.serve_forever()
@@ -1,66 +1,148 @@
 from src.ast_nodes import *
 
+# Frame kinds used by the explicit stack of `iter_pretty_print`
+_NODE = 0  # an S-expression to print
+_TEXT = 1  # a literal fragment
+_REST = 2  # the remaining cons cells of a list whose first element has been printed
 
-def pretty_print(node, indent: int = 0):
+ELLIPSIS = "..."  # printed in place of elements or sub-lists cut off by the print limits
+
+
+def _is_nil(node) -> bool:
+    return isinstance(node, AtomNode) and node.type == "BOOLEAN" and node.value == "nil"
+
+
+def _format_atom(node: AtomNode, max_length: int | None = None) -> str:
+    # Handle basic types: number, boolean, symbol, string
+    if node.type in ("STRING", "ERROR"):
+        return f'"{node.value}"'
+    elif node.type == "FLOAT":
+        return f"{node.value:.3f}"
+    elif node.type == "STRING_BUILDER":
+        return "#<string-builder>"
+    elif node.type == "PROMISE":
+        return "#<promise>"
+    elif node.type == "VECTOR":
+        return f"#<vector {len(node.value)}>"
+    elif node.type == "BYTEVECTOR":
+        data = node.value
+        if max_length is not None and len(data) > max_length:
+            return f"#u8({' '.join(map(str, data[:max_length]))} {ELLIPSIS})"
+
+        return f"#u8({' '.join(map(str, data))})"
+    else:
+        return f"{node.value}"
+
+
+def iter_pretty_print(node, indent: int = 0, max_depth: int | None = None, max_length: int | None = None):
     """
-    Pretty-print the Scheme AST with strict indentation formatting.
+    Generate the pretty-printed form of a Scheme AST piece by piece.
+
+    The tree is walked with an explicit stack instead of recursion, so deeply nested
+    structures do not hit the recursion limit, and fragments are yielded as soon as
+    they are known, so the output never has to be built as one string.
+
+    Lists nested deeper than `max_depth` are printed as an ellipsis, and only the first
+    `max_length` elements of a list are printed, followed by an ellipsis. The parts cut
+    off are never visited.
 
     Args:
         node (ASTNode): The root node of the AST to be printed.
         indent (int): Current indentation level.
+        max_depth (int | None): Maximum nesting depth of lists to print, `None` for no limit.
+        max_length (int | None): Maximum number of elements printed per list, `None` for no limit.
 
-    Returns:
-        str: A formatted string representation of the AST node.
+    Yields:
+        str: Consecutive fragments of the formatted representation.
     """
-    indent_str = "  " * indent
-    next_indent_str = "  " * (indent + 1)
-
-    if isinstance(node, AtomNode):
-        # Handle basic types: number, boolean, symbol, string
-        if node.type in ("STRING", "ERROR"):
-            return f'"{node.value}"'
-        elif node.type == "FLOAT":
-            return f"{node.value:.3f}"
-        else:
-            return f"{node.value}"
+    indents = []
+
+    def indent_str(level: int) -> str:
+        while len(indents) <= level:
+            indents.append("  " * len(indents))
+
+        return indents[level]
 
-    elif isinstance(node, ConsNode):
-        elements = []
-        current = node
+    # A frame is (kind, item, level, count), `count` being the number of elements
+    # of the list already printed for `_REST` frames
+    stack = [(_NODE, node, indent, 0)]
+    while stack:
+        kind, item, level, count = stack.pop()
 
-        # Unroll nested cons cells into a list
-        while isinstance(current, ConsNode):
-            elements.append(current.car)
-            current = current.cdr
+        if kind == _TEXT:
+            yield item
 
-        # Handle proper list: (a b c)
-        if isinstance(current,
-                      AtomNode) and current.type == "BOOLEAN" and current.value == "nil":  # ( ssp . nil ) === ( sp1 sp2 sp3 ... spn )
-            result = f"( {pretty_print(elements[0], indent + 1)}"
+        elif kind == _REST:
+            # `level` is the indentation of the list itself, elements are one level deeper
+            if isinstance(item, ConsNode):
+                if max_length is not None and count >= max_length:
+                    yield f"\n{indent_str(level + 1)}{ELLIPSIS}\n{indent_str(level)})"
+                    continue
 
-            for elem in elements[1:]:
-                result += f"\n{next_indent_str}{pretty_print(elem, indent + 1)}"
+                yield f"\n{indent_str(level + 1)}"
+                stack.append((_REST, item.cdr, level, count + 1))
+                stack.append((_NODE, item.car, level + 1, 0))
 
-            result += f"\n{indent_str})"
-            return result
+            elif _is_nil(item):  # ( ssp . nil ) === ( sp1 sp2 sp3 ... spn )
+                yield f"\n{indent_str(level)})"
 
-        # Handle improper list: (a b . c)
-        result = f"( {pretty_print(elements[0], indent + 1)}"
-        for element in elements[1:]:
-            result += f"\n{next_indent_str}{pretty_print(element, indent + 1)}"
+            else:  # improper list: (a b . c)
+                yield f"\n{indent_str(level + 1)}.\n{indent_str(level + 1)}"
+                stack.append((_TEXT, f"\n{indent_str(level)})", level, 0))
+                stack.append((_NODE, item, level + 1, 0))
 
-        result += f"\n{next_indent_str}."
-        result += f"\n{next_indent_str}{pretty_print(current, indent + 1)}"
-        result += f"\n{indent_str})"
-        return result
+        elif isinstance(item, AtomNode):
+            yield _format_atom(item, max_length)
 
-    elif isinstance(node, QuoteNode):
-        # Handle quoted expressions: (quote ...)
-        result = f"( quote"
+        elif max_depth is not None and level - indent >= max_depth and isinstance(item, (ConsNode, QuoteNode)):
+            yield ELLIPSIS
 
-        result += f"\n{next_indent_str}{pretty_print(node.value, indent + 1)}"
+        elif isinstance(item, ConsNode):
+            if max_length == 0:
+                yield f"( {ELLIPSIS}\n{indent_str(level)})"
+                continue
+
+            yield "( "
+            stack.append((_REST, item.cdr, level, 1))
+            stack.append((_NODE, item.car, level + 1, 0))
+
+        elif isinstance(item, QuoteNode):
+            # Handle quoted expressions: (quote ...)
+            yield f"( quote\n{indent_str(level + 1)}"
+            stack.append((_TEXT, f"\n{indent_str(level)})", level, 0))
+            stack.append((_NODE, item.value, level + 1, 0))
+
+        else:
+            yield f"{item}"
 
-        result += f"\n{indent_str})"
-        return result
 
-    return f"{node}"
+def write_pretty(node, output, indent: int = 0, max_depth: int | None = None, max_length: int | None = None):
+    """
+    Stream the pretty-printed form of `node` to `output` without building it as one string.
+
+    Args:
+        node (ASTNode): The root node of the AST to be printed.
+        output: Any object with a `write(str)` method, e.g. an `OutputBuffer`.
+        indent (int): Current indentation level.
+        max_depth (int | None): Maximum nesting depth of lists to print, `None` for no limit.
+        max_length (int | None): Maximum number of elements printed per list, `None` for no limit.
+    """
+    write = output.write
+    for fragment in iter_pretty_print(node, indent, max_depth, max_length):
+        write(fragment)
+
+
+def pretty_print(node, indent: int = 0, max_depth: int | None = None, max_length: int | None = None):
+    """
+    Pretty-print the Scheme AST with strict indentation formatting.
+
+    Args:
+        node (ASTNode): The root node of the AST to be printed.
+        indent (int): Current indentation level.
+        max_depth (int | None): Maximum nesting depth of lists to print, `None` for no limit.
+        max_length (int | None): Maximum number of elements printed per list, `None` for no limit.
+
+    Returns:
+        str: A formatted string representation of the AST node.
+    """
+    return "".join(iter_pretty_print(node, indent, max_depth, max_length))
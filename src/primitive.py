@@ -1,9 +1,23 @@
+import io
+
 from src.ast_nodes import *
 from src.environment import Environment
 from src.errors import DivisionByZeroError, SchemeExitException, IncorrectArgumentType, NoClosingQuoteError, \
-    EmptyInputError, UnexpectedTokenError, NotFinishError
-from src.function_object import PrimitiveFunction
-from src.pretty_print import pretty_print
+    EmptyInputError, UnexpectedTokenError, NotFinishError, FileOpenError, ClosedPortError, NumberFormatError, \
+    LoadFormatError, UnknownModuleError, ImageFormatError
+from src.function_object import PrimitiveFunction, UserDefinedFunction
+from src.image import save_image
+from src.module_loader import find_module, load_forms
+from src.output import OutputBuffer
+from src.ports import Port, InputPort, OutputPort, BinaryInputPort, BinaryOutputPort
+from src.promise import Promise
+from src.pretty_print import write_pretty
+from src.scheduler import Channel, get_scheduler, receive
+from src.serialize import SerializationError, serialize, deserialize
+
+
+# Atom types whose value can be shared and mutated, so `eqv?` compares them by identity
+_MUTABLE_ATOM_TYPES = ("STRING", "STRING_BUILDER", "PROMISE", "FUTURE", "TASK", "CHANNEL", "BYTEVECTOR", "VECTOR")
 
 
 def primitive(name=None, min_args=None, max_args=None, arg_types=None):
@@ -264,12 +278,7 @@ def prim_equal(args: list[ASTNode], _env, _evaluator) -> ASTNode:
 
 @primitive(name="string-append", min_args=2, arg_types=("STRING",))
 def prim_string_append(args: list[ASTNode], _env, _evaluator) -> ASTNode:
-    new_string = ""
-
-    for arg in args:
-        new_string += arg.value
-
-    return AtomNode("STRING", new_string)
+    return AtomNode("STRING", "".join(arg.value for arg in args))
 
 
 @primitive(name="string>?", min_args=2, arg_types=("STRING",))
@@ -307,7 +316,8 @@ def prim_is_eqv(args: list[ASTNode], _env, _evaluator) -> ASTNode:
     if not (type(arg1) == type(arg2)):
         return AtomNode("BOOLEAN", "nil")
 
-    elif isinstance(arg1, AtomNode) and arg1.type != "STRING" and isinstance(arg2, AtomNode) and arg2.type != "STRING":
+    elif (isinstance(arg1, AtomNode) and arg1.type not in _MUTABLE_ATOM_TYPES and
+          isinstance(arg2, AtomNode) and arg2.type not in _MUTABLE_ATOM_TYPES):
         # If arguments are atom node and not string, then compare the value of node, not the address
         # Note: only immutable atomic types are compared by value in `eqv?`
         return AtomNode("BOOLEAN", "#t" if arg1 == arg2 else "nil")
@@ -316,18 +326,37 @@ def prim_is_eqv(args: list[ASTNode], _env, _evaluator) -> ASTNode:
         return AtomNode("BOOLEAN", "#t" if id(arg1) == id(arg2) else "nil")
 
 
+def _is_equal(arg1: ASTNode, arg2: ASTNode) -> bool:
+    # Structural equality, walking pairs with a stack instead of recursing
+    pending = [(arg1, arg2)]
+    while pending:
+        arg1, arg2 = pending.pop()
+        if isinstance(arg1, ConsNode) and isinstance(arg2, ConsNode):
+            pending.append((arg1.cdr, arg2.cdr))
+            pending.append((arg1.car, arg2.car))
+        elif isinstance(arg1, QuoteNode) and isinstance(arg2, QuoteNode):
+            pending.append((arg1.value, arg2.value))
+        elif (isinstance(arg1, AtomNode) and arg1.type == "VECTOR" and
+              isinstance(arg2, AtomNode) and arg2.type == "VECTOR"):
+            import numpy as np  # only vectors made by read-numbers get here, NumPy is loaded already
+            if not np.array_equal(arg1.value, arg2.value):
+                return False
+        elif arg1 != arg2:  # never two vectors, `==` on ndarrays is elementwise
+            return False
+
+    return True
+
+
 @primitive(name="equal?", min_args=2, max_args=2)
 def prim_is_equal(args: list[ASTNode], _env, _evaluator) -> ASTNode:
-    arg1 = args[0]
-    arg2 = args[1]
-    return AtomNode("BOOLEAN", "#t" if arg1 == arg2 else "nil")
+    return AtomNode("BOOLEAN", "#t" if _is_equal(args[0], args[1]) else "nil")
 
 
 @primitive(name="clean-environment", min_args=0, max_args=0)
 def prim_clean_env(_args, env: "Environment", evaluator: "Evaluator") -> ASTNode:
     env.clear()
-    if evaluator.verbose:
-        print("environment cleaned")
+    if evaluator.context.verbose:
+        evaluator.context.output.write("environment cleaned\n")
 
     return AtomNode("VOID", "")
 
@@ -348,18 +377,18 @@ def prim_is_error_obj(args: list[ASTNode], _env: Environment, _evaluator: "Evalu
 
 
 @primitive(name="display-string", min_args=1, max_args=1)
-def prim_display_string(args: list[ASTNode], _env: Environment, _evaluator: "Evaluator"):
+def prim_display_string(args: list[ASTNode], _env: Environment, evaluator: "Evaluator"):
     node = args[0]
     if not (isinstance(node, AtomNode) and node.type in ("STRING", "ERROR")):
         raise IncorrectArgumentType("display-string", node)
 
-    print(node.value, end="")
+    evaluator.context.output.write(node.value)
     return node
 
 
 @primitive(name="newline", min_args=0, max_args=0)
-def prim_newline(_args: list[ASTNode], _env: Environment, _evaluator: "Evaluator"):
-    print()
+def prim_newline(_args: list[ASTNode], _env: Environment, evaluator: "Evaluator"):
+    evaluator.context.output.write("\n")
     return AtomNode("BOOLEAN", "nil")
 
 
@@ -385,16 +414,31 @@ def prim_num_to_str(args: list[ASTNode], _env: Environment, _evaluator: "Evaluat
 
 
 @primitive(name="write", min_args=1, max_args=1)
-def prim_write(args: list[ASTNode], _env: Environment, _evaluator: "Evaluator"):
+def prim_write(args: list[ASTNode], _env: Environment, evaluator: "Evaluator"):
     obj = args[0]
-    print(pretty_print(obj), end="")
+    write_pretty(obj, evaluator.context.output, max_depth=evaluator.context.print_depth, max_length=evaluator.context.print_length)
     return obj
 
 
-@primitive(name="read", min_args=0, max_args=0)
-def prim_read(_args, _env, evaluator: "Evaluator"):
-    # do one parsing and return parsing result
-    parser = evaluator.parser
+def _syntax_error_object(e: UnexpectedTokenError | NoClosingQuoteError) -> AtomNode:
+    if isinstance(e, NoClosingQuoteError):
+        return AtomNode("ERROR", f"{e} : END-OF-LINE encountered at Line {e.line} Column {e.column}")
+
+    if e.type == 1:
+        return AtomNode("ERROR", f"{e} : atom or '(' expected when token at Line {e.line} Column {e.column} is >>{e.value}<<")
+    else:
+        return AtomNode("ERROR", f"{e} : ')' expected when token at Line {e.line} Column {e.column} is >>{e.value}<<")
+
+
+def parse_console_input(evaluator: "Evaluator"):
+    """
+    Parse the next S-expression of the console input, for `(read)`.
+
+    A generator, which yields whenever it needs another line of input and expects
+    the line to be sent in, so the line can come from a blocking or an async reader.
+    It returns the parsed S-expression, or an error object, through StopIteration.
+    """
+    parser = evaluator.context.parser
     lexer = parser.lexer
 
     partial_input = lexer.source_code[parser.last_s_exp_pos + 1:]  # only get those not used
@@ -403,7 +447,8 @@ def prim_read(_args, _env, evaluator: "Evaluator"):
         try:
             if parser.current.type == "EOF":
                 # No token left in lexer, so need to get new input for (read)
-                new_input = input()
+                evaluator.context.output.flush()
+                new_input = yield
                 partial_input += '\n' + new_input
 
                 lexer.reset(partial_input)
@@ -413,19 +458,7 @@ def prim_read(_args, _env, evaluator: "Evaluator"):
             result = parser.parse()
             return result
 
-        except UnexpectedTokenError as e:
-            try:
-                lexer.reset("")
-                parser.reset(lexer)
-            except EmptyInputError:
-                pass
-
-            if e.type == 1:
-                return AtomNode("ERROR", f"{e} : atom or '(' expected when token at Line {e.line} Column {e.column} is >>{e.value}<<")
-            else:
-                return AtomNode("ERROR", f"{e} : ')' expected when token at Line {e.line} Column {e.column} is >>{e.value}<<")
-
-        except NoClosingQuoteError as e:
+        except (UnexpectedTokenError, NoClosingQuoteError) as e:
             try:
                 lexer.reset("")
                 parser.reset(lexer)
@@ -433,15 +466,632 @@ def prim_read(_args, _env, evaluator: "Evaluator"):
                 # this error are used for telling repl not to clear partial input, so need to catch this error
                 pass
 
-            return AtomNode("ERROR", f"{e} : END-OF-LINE encountered at Line {e.line} Column {e.column}")
+            return _syntax_error_object(e)
 
         except (NotFinishError, EmptyInputError):
             continue
 
 
+def _read_console(evaluator: "Evaluator") -> ASTNode:
+    # do one parsing and return parsing result
+    parsing = parse_console_input(evaluator)
+    try:
+        next(parsing)
+        while True:
+            parsing.send(evaluator.context.reader())
+    except StopIteration as stop:
+        return stop.value
+
+
+def _port_arg(arg: ASTNode, port_type: type, name: str) -> Port:
+    if not (isinstance(arg, AtomNode) and arg.type == "PORT" and isinstance(arg.value, port_type)):
+        raise IncorrectArgumentType(name, arg)
+
+    if arg.value.closed:
+        raise ClosedPortError(name)
+
+    return arg.value
+
+
+@primitive(name="read", min_args=0, max_args=1)
+def prim_read(args: list[ASTNode], _env, evaluator: "Evaluator"):
+    if not args:
+        return _read_console(evaluator)
+
+    port = _port_arg(args[0], InputPort, "read")
+    try:
+        result = port.read()
+    except (UnexpectedTokenError, NoClosingQuoteError) as e:
+        return _syntax_error_object(e)
+    except NotFinishError:
+        return AtomNode("ERROR", "ERROR (no more input) : END-OF-FILE encountered")
+
+    return result if result is not None else AtomNode("EOF", "#<eof>")
+
+
+@primitive(name="read-line", min_args=0, max_args=1)
+def prim_read_line(args: list[ASTNode], _env, evaluator: "Evaluator"):
+    if not args:
+        evaluator.context.output.flush()
+        try:
+            return AtomNode("STRING", evaluator.context.reader())
+        except EOFError:
+            return AtomNode("EOF", "#<eof>")
+
+    line = _port_arg(args[0], InputPort, "read-line").read_line()
+    return AtomNode("STRING", line) if line is not None else AtomNode("EOF", "#<eof>")
+
+
+@primitive(name="write-string", min_args=1, max_args=2, arg_types=["STRING"])
+def prim_write_string(args: list[ASTNode], _env, evaluator: "Evaluator"):
+    node = args[0]
+    if len(args) == 1:
+        evaluator.context.output.write(node.value)
+    else:
+        _port_arg(args[1], OutputPort, "write-string").write(node.value)
+
+    return node
+
+
+@primitive(name="open-input-file", min_args=1, max_args=1, arg_types=["STRING"])
+def prim_open_input_file(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    try:
+        return AtomNode("PORT", InputPort(args[0].value))
+    except OSError:
+        raise FileOpenError(args[0].value)
+
+
+@primitive(name="open-output-file", min_args=1, max_args=1, arg_types=["STRING"])
+def prim_open_output_file(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    try:
+        return AtomNode("PORT", OutputPort(args[0].value))
+    except OSError:
+        raise FileOpenError(args[0].value)
+
+
+@primitive(name="close-port", min_args=1, max_args=1, arg_types=["PORT"])
+def prim_close_port(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    # Closing a port twice is harmless
+    args[0].value.close()
+    return AtomNode("VOID", "")
+
+
+@primitive(name="eof-object?", min_args=1, max_args=1)
+def prim_is_eof_object(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    arg = args[0]
+    return AtomNode("BOOLEAN", "#t" if isinstance(arg, AtomNode) and arg.type == "EOF" else "nil")
+
+
 @primitive(name="eval", min_args=1, max_args=1)
 def prim_eval(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
-    return evaluator.evaluate(args[0], evaluator.global_env, level="toplevel")
+    return evaluator.evaluate(args[0], evaluator.context.global_env, level="toplevel")
+
+
+@primitive(name="make-string-builder", min_args=0, max_args=0)
+def prim_make_string_builder(_args, _env, _evaluator) -> AtomNode:
+    # The value is a list of chunks, joined only once in `builder->string`
+    return AtomNode("STRING_BUILDER", [])
+
+
+@primitive(name="builder-append!", min_args=2, arg_types=["STRING_BUILDER"])
+def prim_builder_append(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    builder = args[0]
+    for arg in args[1:]:
+        if not (isinstance(arg, AtomNode) and arg.type == "STRING"):
+            raise IncorrectArgumentType("builder-append!", arg)
+
+        builder.value.append(arg.value)
+
+    return builder
+
+
+@primitive(name="builder->string", min_args=1, max_args=1, arg_types=["STRING_BUILDER"])
+def prim_builder_to_string(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    chunks = args[0].value
+    if len(chunks) > 1:
+        # Collapse the chunks so repeated conversions stay cheap
+        chunks[:] = ["".join(chunks)]
+
+    return AtomNode("STRING", chunks[0] if chunks else "")
+
+
+@primitive(name="with-output-to-string", min_args=1, max_args=1)
+def prim_with_output_to_string(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> AtomNode:
+    thunk = args[0]
+    if not isinstance(thunk, (PrimitiveFunction, UserDefinedFunction)):
+        raise IncorrectArgumentType("with-output-to-string", thunk)
+
+    # Temporarily swap the evaluator's output for one backed by a string buffer
+    buffer = io.StringIO()
+    saved_output = evaluator.context.output
+    evaluator.context.output = OutputBuffer(buffer)
+    try:
+        evaluator.apply_procedure(thunk, [], env)
+        evaluator.context.output.flush()
+    finally:
+        evaluator.context.output = saved_output
+
+    return AtomNode("STRING", buffer.getvalue())
+
+
+@primitive(name="set-print-limits!", min_args=2, max_args=2, arg_types=("INT", "BOOLEAN"))
+def prim_set_print_limits(args: list[ASTNode], _env, evaluator: "Evaluator") -> AtomNode:
+    # Each limit is a non-negative integer, or nil for no limit
+    limits = []
+    for arg in args:
+        if arg.type == "BOOLEAN":
+            if arg.value != "nil":
+                raise IncorrectArgumentType("set-print-limits!", arg)
+
+            limits.append(None)
+
+        elif arg.value < 0:
+            raise IncorrectArgumentType("set-print-limits!", arg)
+
+        else:
+            limits.append(arg.value)
+
+    evaluator.context.print_depth, evaluator.context.print_length = limits
+    return AtomNode("VOID", "")
+
+
+@primitive(name="force", min_args=1, max_args=1)
+def prim_force(args: list[ASTNode], _env, evaluator: "Evaluator") -> ASTNode:
+    arg = args[0]
+    if isinstance(arg, AtomNode) and arg.type == "PROMISE":
+        return arg.value.force(evaluator)
+
+    # Forcing a value which is not a promise just returns it
+    return arg
+
+
+@primitive(name="touch", min_args=1, max_args=1)
+def prim_touch(args: list[ASTNode], _env, evaluator: "Evaluator") -> ASTNode:
+    arg = args[0]
+    if isinstance(arg, AtomNode) and arg.type == "FUTURE":
+        return arg.value.touch(evaluator)
+
+    # Like `force`, touching a value which is not a future just returns it
+    return arg
+
+
+@primitive(name="future?", min_args=1, max_args=1)
+def prim_is_future(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    arg = args[0]
+    return AtomNode("BOOLEAN", "#t" if isinstance(arg, AtomNode) and arg.type == "FUTURE" else "nil")
+
+
+@primitive(name="spawn", min_args=1)
+def prim_spawn(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> AtomNode:
+    func, *func_args = args
+    _check_procedure(func, "spawn")
+    func.check_arity(func_args)  # a wrong call is reported here rather than by the task
+    return AtomNode("TASK", get_scheduler(evaluator.context).spawn(func, func_args, env, evaluator))
+
+
+@primitive(name="yield", min_args=0, max_args=0)
+def prim_yield(_args: list[ASTNode], _env, evaluator: "Evaluator") -> AtomNode:
+    # Only reached outside of a task, which lets every task run once instead (see `src.scheduler`)
+    get_scheduler(evaluator.context).run_round()
+    return AtomNode("BOOLEAN", "nil")
+
+
+@primitive(name="make-channel", min_args=0, max_args=0)
+def prim_make_channel(_args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    return AtomNode("CHANNEL", Channel())
+
+
+@primitive(name="channel-send!", min_args=2, max_args=2, arg_types=["CHANNEL", "any"])
+def prim_channel_send(args: list[ASTNode], _env, _evaluator) -> ASTNode:
+    channel, value = args
+    channel.value.send(value)
+    return value
+
+
+@primitive(name="channel-recv", min_args=1, max_args=1, arg_types=["CHANNEL"])
+def prim_channel_recv(args: list[ASTNode], _env, evaluator: "Evaluator") -> ASTNode:
+    # Only reached outside of a task, which runs the tasks until a value arrives instead
+    return receive(args[0].value, evaluator)
+
+
+def _stream_rest(stream: ConsNode, evaluator: "Evaluator", name: str) -> ASTNode:
+    tail = stream.cdr
+    if not (isinstance(tail, AtomNode) and tail.type == "PROMISE"):
+        raise IncorrectArgumentType(name, stream)
+
+    return tail.value.force(evaluator)
+
+
+def _check_stream(stream: ASTNode, name: str):
+    if not (isinstance(stream, ConsNode) or stream == AtomNode("BOOLEAN", "nil")):
+        raise IncorrectArgumentType(name, stream)
+
+
+def _check_procedure(func: ASTNode, name: str):
+    if not isinstance(func, (PrimitiveFunction, UserDefinedFunction)):
+        raise IncorrectArgumentType(name, func)
+
+
+def _stream_map(func, stream: ASTNode, env: Environment, evaluator: "Evaluator") -> ASTNode:
+    _check_stream(stream, "stream-map")
+    if not isinstance(stream, ConsNode):
+        return stream
+
+    head = evaluator.apply_procedure(func, [stream.car], env)
+
+    def thunk(ev: "Evaluator") -> ASTNode:
+        return _stream_map(func, _stream_rest(stream, ev, "stream-map"), env, ev)
+
+    return ConsNode(head, AtomNode("PROMISE", Promise(thunk)))
+
+
+def _stream_filter(pred, stream: ASTNode, env: Environment, evaluator: "Evaluator") -> ASTNode:
+    # Skip rejected elements in a loop, so long runs of them do not nest promises
+    while isinstance(stream, ConsNode):
+        if evaluator.apply_procedure(pred, [stream.car], env) != AtomNode("BOOLEAN", "nil"):
+            rest = stream
+
+            def thunk(ev: "Evaluator") -> ASTNode:
+                return _stream_filter(pred, _stream_rest(rest, ev, "stream-filter"), env, ev)
+
+            return ConsNode(stream.car, AtomNode("PROMISE", Promise(thunk)))
+
+        stream = _stream_rest(stream, evaluator, "stream-filter")
+
+    _check_stream(stream, "stream-filter")
+    return stream
+
+
+@primitive(name="stream-car", min_args=1, max_args=1, arg_types=["pair"])
+def prim_stream_car(args: list[ASTNode], _env, _evaluator) -> ASTNode:
+    return args[0].car
+
+
+@primitive(name="stream-cdr", min_args=1, max_args=1, arg_types=["pair"])
+def prim_stream_cdr(args: list[ASTNode], _env, evaluator: "Evaluator") -> ASTNode:
+    return _stream_rest(args[0], evaluator, "stream-cdr")
+
+
+@primitive(name="stream-map", min_args=2, max_args=2)
+def prim_stream_map(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> ASTNode:
+    func, stream = args
+    _check_procedure(func, "stream-map")
+    return _stream_map(func, stream, env, evaluator)
+
+
+@primitive(name="stream-filter", min_args=2, max_args=2)
+def prim_stream_filter(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> ASTNode:
+    pred, stream = args
+    _check_procedure(pred, "stream-filter")
+    return _stream_filter(pred, stream, env, evaluator)
+
+
+@primitive(name="stream-take", min_args=2, max_args=2, arg_types=["any", "INT"])
+def prim_stream_take(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> ASTNode:
+    """
+    Collects the first n elements of a stream into a list.
+
+    Only the promises leading to those elements are forced.
+    """
+    stream, count = args
+    _check_stream(stream, "stream-take")
+    if count.value < 0:
+        raise IncorrectArgumentType("stream-take", count)
+
+    elements = []
+    while isinstance(stream, ConsNode) and len(elements) < count.value:
+        elements.append(stream.car)
+        if len(elements) < count.value:
+            stream = _stream_rest(stream, evaluator, "stream-take")
+
+    return prim_list.func(elements, env, evaluator)
+
+
+def _list_arg(arg: ASTNode, name: str) -> list[ASTNode]:
+    elements = []
+    while isinstance(arg, ConsNode):
+        elements.append(arg.car)
+        arg = arg.cdr
+
+    if not (isinstance(arg, AtomNode) and arg.type == "BOOLEAN" and arg.value == "nil"):
+        raise IncorrectArgumentType(name, arg)
+
+    return elements
+
+
+@primitive(name="pmap", min_args=2, max_args=2)
+def prim_pmap(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> ASTNode:
+    from src.parallel import parallel_map  # imported on first use to keep startup fast
+
+    func, lst = args
+    _check_procedure(func, "pmap")
+    return prim_list.func(parallel_map(func, _list_arg(lst, "pmap"), env, evaluator), env, evaluator)
+
+
+@primitive(name="pfor-each", min_args=2, max_args=2)
+def prim_pfor_each(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> AtomNode:
+    from src.parallel import parallel_map  # imported on first use to keep startup fast
+
+    func, lst = args
+    _check_procedure(func, "pfor-each")
+    parallel_map(func, _list_arg(lst, "pfor-each"), env, evaluator)
+    return AtomNode("VOID", "")
+
+
+@primitive(name="open-data-file", min_args=1, max_args=1, arg_types=["STRING"])
+def prim_open_data_file(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    from src.data_file import DataFile  # imported on first use to keep startup fast
+
+    try:
+        return AtomNode("DATA_FILE", DataFile(args[0].value))
+    except OSError:
+        raise FileOpenError(args[0].value)
+
+
+@primitive(name="data-file-count", min_args=1, max_args=1, arg_types=["DATA_FILE"])
+def prim_data_file_count(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    return AtomNode("INT", len(args[0].value))
+
+
+@primitive(name="data-file-ref", min_args=2, max_args=2, arg_types=["DATA_FILE", "INT"])
+def prim_data_file_ref(args: list[ASTNode], _env, _evaluator) -> ASTNode:
+    data_file, n = args
+    try:
+        return data_file.value.ref(n.value)
+    except IndexError:
+        raise IncorrectArgumentType("data-file-ref", n)
+    except (UnexpectedTokenError, NoClosingQuoteError) as e:
+        return _syntax_error_object(e)
+    except NotFinishError:
+        return AtomNode("ERROR", "ERROR (no more input) : END-OF-FILE encountered")
+
+
+@primitive(name="read-numbers", min_args=1, max_args=1, arg_types=["STRING"])
+def prim_read_numbers(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    from src.bulk_loader import read_numbers  # imported on first use to keep startup fast
+
+    path = args[0].value
+    try:
+        return AtomNode("VECTOR", read_numbers(path))
+    except OSError:
+        raise FileOpenError(path)
+    except ValueError:
+        raise NumberFormatError(path)
+
+
+def _vector_element(vector, i: int) -> AtomNode:
+    value = vector[i].item()
+    return AtomNode("FLOAT", value) if isinstance(value, float) else AtomNode("INT", value)
+
+
+@primitive(name="vector?", min_args=1, max_args=1)
+def prim_is_vector(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    arg = args[0]
+    return AtomNode("BOOLEAN", "#t" if isinstance(arg, AtomNode) and arg.type == "VECTOR" else "nil")
+
+
+@primitive(name="vector-length", min_args=1, max_args=1, arg_types=["VECTOR"])
+def prim_vector_length(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    return AtomNode("INT", len(args[0].value))
+
+
+@primitive(name="vector-ref", min_args=2, max_args=2, arg_types=["VECTOR", "INT"])
+def prim_vector_ref(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    vector, index = args
+    if not 0 <= index.value < len(vector.value):
+        raise IncorrectArgumentType("vector-ref", index)
+
+    return _vector_element(vector.value, index.value)
+
+
+@primitive(name="vector->list", min_args=1, max_args=1, arg_types=["VECTOR"])
+def prim_vector_to_list(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> ASTNode:
+    vector = args[0].value
+    return prim_list.func([_vector_element(vector, i) for i in range(len(vector))], env, evaluator)
+
+
+def _byte_arg(arg: ASTNode, name: str) -> int:
+    if not (isinstance(arg, AtomNode) and arg.type == "INT" and 0 <= arg.value <= 255):
+        raise IncorrectArgumentType(name, arg)
+
+    return arg.value
+
+
+def _range_args(args: list[ASTNode], length: int, name: str) -> tuple[int, int]:
+    """Read the optional `start` and `end` arguments of a bytevector operation."""
+    for arg in args:
+        if not (isinstance(arg, AtomNode) and arg.type == "INT"):
+            raise IncorrectArgumentType(name, arg)
+
+    start, end = 0, length
+    if args:
+        start = args[0].value
+    if len(args) > 1:
+        end = args[1].value
+
+    if not 0 <= start <= end <= length:
+        raise IncorrectArgumentType(name, args[-1])
+
+    return start, end
+
+
+@primitive(name="make-bytevector", min_args=1, max_args=2, arg_types=["INT", "INT"])
+def prim_make_bytevector(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    size = args[0].value
+    if size < 0:
+        raise IncorrectArgumentType("make-bytevector", args[0])
+
+    fill = _byte_arg(args[1], "make-bytevector") if len(args) > 1 else 0
+    return AtomNode("BYTEVECTOR", bytearray([fill]) * size)
+
+
+@primitive(name="bytevector?", min_args=1, max_args=1)
+def prim_is_bytevector(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    arg = args[0]
+    return AtomNode("BOOLEAN", "#t" if isinstance(arg, AtomNode) and arg.type == "BYTEVECTOR" else "nil")
+
+
+@primitive(name="bytevector-length", min_args=1, max_args=1, arg_types=["BYTEVECTOR"])
+def prim_bytevector_length(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    return AtomNode("INT", len(args[0].value))
+
+
+@primitive(name="bytevector-u8-ref", min_args=2, max_args=2, arg_types=["BYTEVECTOR", "INT"])
+def prim_bytevector_u8_ref(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    bytevector, index = args
+    if not 0 <= index.value < len(bytevector.value):
+        raise IncorrectArgumentType("bytevector-u8-ref", index)
+
+    return AtomNode("INT", bytevector.value[index.value])
+
+
+@primitive(name="bytevector-u8-set!", min_args=3, max_args=3, arg_types=["BYTEVECTOR", "INT", "INT"])
+def prim_bytevector_u8_set(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    bytevector, index, byte = args
+    if not 0 <= index.value < len(bytevector.value):
+        raise IncorrectArgumentType("bytevector-u8-set!", index)
+
+    bytevector.value[index.value] = _byte_arg(byte, "bytevector-u8-set!")
+    return AtomNode("VOID", "")
+
+
+@primitive(name="bytevector-copy", min_args=1, max_args=3, arg_types=["BYTEVECTOR"])
+def prim_bytevector_copy(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    data = args[0].value
+    start, end = _range_args(args[1:], len(data), "bytevector-copy")
+    return AtomNode("BYTEVECTOR", bytearray(data[start:end]))
+
+
+@primitive(name="bytevector-slice", min_args=2, max_args=3, arg_types=["BYTEVECTOR"])
+def prim_bytevector_slice(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    """
+    Returns a bytevector sharing memory with the original one, so no byte is copied
+    and changes through either bytevector are visible in both.
+    """
+    data = args[0].value
+    start, end = _range_args(args[1:], len(data), "bytevector-slice")
+    return AtomNode("BYTEVECTOR", memoryview(data)[start:end])
+
+
+@primitive(name="open-binary-input-file", min_args=1, max_args=1, arg_types=["STRING"])
+def prim_open_binary_input_file(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    try:
+        return AtomNode("PORT", BinaryInputPort(args[0].value))
+    except OSError:
+        raise FileOpenError(args[0].value)
+
+
+@primitive(name="open-binary-output-file", min_args=1, max_args=1, arg_types=["STRING"])
+def prim_open_binary_output_file(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    try:
+        return AtomNode("PORT", BinaryOutputPort(args[0].value))
+    except OSError:
+        raise FileOpenError(args[0].value)
+
+
+@primitive(name="read-bytevector", min_args=2, max_args=2, arg_types=["INT"])
+def prim_read_bytevector(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    size, port = args
+    if size.value < 0:
+        raise IncorrectArgumentType("read-bytevector", size)
+
+    buffer = bytearray(size.value)
+    count = _port_arg(port, BinaryInputPort, "read-bytevector").read_into(buffer)
+    if count == 0 and size.value > 0:
+        return AtomNode("EOF", "#<eof>")
+
+    del buffer[count:]
+    return AtomNode("BYTEVECTOR", buffer)
+
+
+@primitive(name="read-bytevector!", min_args=2, max_args=4, arg_types=["BYTEVECTOR"])
+def prim_read_bytevector_into(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    bytevector, port, *bounds = args
+    start, end = _range_args(bounds, len(bytevector.value), "read-bytevector!")
+
+    # The file is read directly into the bytevector's memory
+    count = _port_arg(port, BinaryInputPort, "read-bytevector!").read_into(memoryview(bytevector.value)[start:end])
+    if count == 0 and end > start:
+        return AtomNode("EOF", "#<eof>")
+
+    return AtomNode("INT", count)
+
+
+@primitive(name="write-bytevector", min_args=2, max_args=4, arg_types=["BYTEVECTOR"])
+def prim_write_bytevector(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    bytevector, port, *bounds = args
+    start, end = _range_args(bounds, len(bytevector.value), "write-bytevector")
+
+    _port_arg(port, BinaryOutputPort, "write-bytevector").write(memoryview(bytevector.value)[start:end])
+    return bytevector
+
+
+@primitive(name="serialize", min_args=1, max_args=1)
+def prim_serialize(args: list[ASTNode], _env, _evaluator) -> AtomNode:
+    try:
+        return AtomNode("BYTEVECTOR", bytearray(serialize(args[0])))
+    except SerializationError:
+        raise IncorrectArgumentType("serialize", args[0])
+
+
+@primitive(name="deserialize", min_args=1, max_args=1, arg_types=["BYTEVECTOR"])
+def prim_deserialize(args: list[ASTNode], _env, evaluator: "Evaluator") -> ASTNode:
+    try:
+        return deserialize(args[0].value, evaluator.context.global_env.builtins)
+    except SerializationError:
+        raise IncorrectArgumentType("deserialize", args[0])
+
+
+def _load_file(path: str, evaluator: "Evaluator"):
+    try:
+        forms = load_forms(path)
+    except OSError:
+        raise FileOpenError(path)
+    except (NotFinishError, UnexpectedTokenError, NoClosingQuoteError):
+        raise LoadFormatError(path)
+
+    for form in forms:
+        evaluator.evaluate(form, evaluator.context.global_env, "toplevel")
+
+
+@primitive(name="load", min_args=1, max_args=1, arg_types=["STRING"])
+def prim_load(args: list[ASTNode], _env, evaluator: "Evaluator") -> AtomNode:
+    _load_file(args[0].value, evaluator)
+    return AtomNode("VOID", "")
+
+
+@primitive(name="require", min_args=1, max_args=1, arg_types=["SYMBOL"])
+def prim_require(args: list[ASTNode], _env, evaluator: "Evaluator") -> AtomNode:
+    name = args[0].value
+    if name in evaluator.context.loaded_modules:
+        return AtomNode("VOID", "")
+
+    path = find_module(name, evaluator.context.module_path)
+    if path is None:
+        raise UnknownModuleError(name)
+
+    # Registered first, so a module requiring itself does not recurse forever
+    evaluator.context.loaded_modules[name] = path
+    try:
+        _load_file(path, evaluator)
+    except Exception:
+        del evaluator.context.loaded_modules[name]
+        raise
+
+    return AtomNode("VOID", "")
+
+
+@primitive(name="save-image", min_args=1, max_args=1, arg_types=["STRING"])
+def prim_save_image(args: list[ASTNode], _env, evaluator: "Evaluator") -> AtomNode:
+    path = args[0].value
+    try:
+        save_image(path, evaluator.context.global_env, evaluator.context.loaded_modules)
+    except OSError:
+        raise FileOpenError(path)
+    except SerializationError:
+        raise ImageFormatError(path)
+
+    return AtomNode("VOID", "")
 
 
 @primitive(name="exit", min_args=0, max_args=0)
@@ -489,6 +1139,58 @@ __all__ = [
     "prim_num_to_str",
     "prim_write",
     "prim_read",
+    "prim_read_line",
+    "prim_write_string",
+    "prim_open_input_file",
+    "prim_open_output_file",
+    "prim_close_port",
+    "prim_is_eof_object",
+    "prim_pmap",
+    "prim_pfor_each",
+    "prim_open_data_file",
+    "prim_data_file_count",
+    "prim_data_file_ref",
+    "prim_read_numbers",
+    "prim_is_vector",
+    "prim_vector_length",
+    "prim_vector_ref",
+    "prim_vector_to_list",
+    "prim_make_bytevector",
+    "prim_is_bytevector",
+    "prim_bytevector_length",
+    "prim_bytevector_u8_ref",
+    "prim_bytevector_u8_set",
+    "prim_bytevector_copy",
+    "prim_bytevector_slice",
+    "prim_open_binary_input_file",
+    "prim_open_binary_output_file",
+    "prim_read_bytevector",
+    "prim_read_bytevector_into",
+    "prim_write_bytevector",
+    "prim_serialize",
+    "prim_deserialize",
+    "prim_load",
+    "prim_require",
+    "prim_save_image",
     "prim_eval",
+    "prim_make_string_builder",
+    "prim_builder_append",
+    "prim_builder_to_string",
+    "prim_with_output_to_string",
+    "prim_set_print_limits",
+    "prim_force",
+    "prim_touch",
+    "prim_is_future",
+    "parse_console_input",
+    "prim_spawn",
+    "prim_yield",
+    "prim_make_channel",
+    "prim_channel_send",
+    "prim_channel_recv",
+    "prim_stream_car",
+    "prim_stream_cdr",
+    "prim_stream_map",
+    "prim_stream_filter",
+    "prim_stream_take",
     "prim_exit",
 ]
@@ -0,0 +1,36 @@
+class Promise:
+    """
+    A memoizing promise, the value of `delay` and of the tail of a stream.
+
+    The value is computed by calling `thunk(evaluator)` the first time the promise is
+    forced. Afterwards the result is kept and the thunk, together with everything it
+    references, is dropped.
+    """
+
+    def __init__(self, thunk):
+        self._thunk = thunk
+        self._value = None
+
+    @property
+    def is_forced(self) -> bool:
+        return self._thunk is None
+
+    def force(self, evaluator: "Evaluator"):
+        if self._thunk is not None:
+            value = self._thunk(evaluator)
+
+            # Forcing the promise again inside the thunk may already have stored a value,
+            # in which case the first result wins
+            if self._thunk is not None:
+                self._value = value
+                self._thunk = None
+
+        return self._value
+
+    def __repr__(self):
+        return "#<promise>"
+
+
+__all__ = [
+    "Promise"
+]
@@ -1,128 +1,195 @@
 from src.ast_nodes import *
 from src.errors import *
 from src.errors import SchemeExitException
+from src.context import EvalContext
 from src.evaluator import Evaluator
+from src.governor import Governor
 from src.lexer import Lexer
 from src.parser import Parser
-from src.pretty_print import pretty_print
+from src.pretty_print import pretty_print as _pretty_print, write_pretty
 from src.builtins_registry import built_in_funcs
 from src.environment import Environment
-
-
-def repl():
+from src.output import OutputBuffer
+from src.image import load_image
+from src.serialize import SerializationError
+
+
+def _restore_image(path: str, evaluator: Evaluator):
+    try:
+        load_image(path, evaluator.context.global_env, evaluator.context.loaded_modules)
+    except OSError:
+        raise FileOpenError(path)
+    except SerializationError:
+        raise ImageFormatError(path)
+
+
+def repl(output_threshold: int = 8192, print_depth: int | None = None, print_length: int | None = None,
+         image: str | None = None, reader=None, stream=None, global_env: Environment | None = None,
+         governor: Governor | None = None):
+    """
+    Run an interactive session until `(exit)` or the end of input.
+
+    Args:
+        reader: Function returning the next input line, raising EOFError at the end. `input` by default.
+        stream: Text stream for the transcript, `None` means `sys.stdout`.
+        global_env: Environment the session defines into, a new empty one by default.
+        governor: Budgets applied to the evaluation of each top-level form, none by default.
+    """
+    reader = reader if reader is not None else input
     lexer = Lexer()
     parser = Parser()
-    global_env = Environment(built_in_funcs)
-    evaluator = Evaluator(global_env, parser)
+    global_env = global_env if global_env is not None else Environment(built_in_funcs)
+    context = EvalContext(global_env, parser, output=OutputBuffer(stream, threshold=output_threshold), reader=reader)
+    context.print_depth = print_depth
+    context.print_length = print_length
+    context.governor = governor
+    evaluator = Evaluator(context)
+
+    def write(text: str):
+        # Looked up on every call, a future makes the output thread-safe by replacing it
+        context.output.write(text)
+
+    def pretty_print(node):
+        # Printed with the limits in effect now, they can be changed by `set-print-limits!`
+        return _pretty_print(node, max_depth=context.print_depth, max_length=context.print_length)
 
-    print("Welcome to OurScheme!")
+    write("Welcome to OurScheme!\n")
+
+    if image is not None:
+        try:
+            _restore_image(image, evaluator)
+        except (FileOpenError, ImageFormatError) as e:
+            write(f'{e} : "{e.path}"\n')
 
     empty_line_encountered = False
     partial_input = ""  # for multiline input
     new_s_exp_start = 0
 
-    while True:
-        try:
-            if not empty_line_encountered:
-                print("\n>", end=" ")
+    try:
+        while True:
+            try:
+                if not empty_line_encountered:
+                    write("\n> ")
 
-            new_input = input()  # read new input
-            partial_input += new_input + "\n"  # add new line input
+                context.output.flush()
+                new_input = reader()  # read new input
+                partial_input += new_input + "\n"  # add new line input
 
-            lexer.reset(partial_input.rstrip("\n"))
-            lexer.set_position(new_s_exp_start)
-            parser.reset(lexer)
+                lexer.reset(partial_input.rstrip("\n"))
+                lexer.set_position(new_s_exp_start)
+                parser.reset(lexer)
 
-            # Parsing
-            first = True
-            try:
-                while parser.current.type != "EOF":  # Parse until lexer reached the end
-                    if not first:
-                        print("\n>", end=" ")
+                # Parsing
+                first = True
+                try:
+                    while parser.current.type != "EOF":  # Parse until lexer reached the end
+                        if not first:
+                            write("\n> ")
 
-                    result = parser.parse()
+                        result = parser.parse()
 
-                    first = False
+                        first = False
 
-                    new_s_exp_start = parser.last_s_exp_pos + 1
+                        new_s_exp_start = parser.last_s_exp_pos + 1
 
-                    # Eval
-                    try:
-                        eval_result = evaluator.evaluate(result, global_env, "toplevel")
+                        # Eval
+                        try:
+                            if governor is not None:
+                                with governor:
+                                    eval_result = evaluator.evaluate(result, global_env, "toplevel")
+                            else:
+                                eval_result = evaluator.evaluate(result, global_env, "toplevel")
 
-                        if eval_result is None:
-                            raise NoReturnValue(result)
+                            if eval_result is None:
+                                raise NoReturnValue(result)
 
-                        if isinstance(eval_result, AtomNode) and eval_result.type == "VOID":    # for verbose
-                            continue
-                        else:
-                            print(f"{pretty_print(eval_result).lstrip('\n')}")
+                            if isinstance(eval_result, AtomNode) and eval_result.type == "VOID":    # for verbose
+                                continue
+                            else:
+                                write_pretty(eval_result, context.output,
+                                             max_depth=context.print_depth, max_length=context.print_length)
+                                write("\n")
 
-                    except (DefineFormatError, CondFormatError, LambdaFormatError) as e:
-                        print(f"{e} : {pretty_print(result)}")
+                        except (DefineFormatError, CondFormatError, LambdaFormatError) as e:
+                            write(f"{e} : {pretty_print(result)}\n")
 
-                    except (LetFormatError, SetFormatError) as e:
-                        print(f"{e} : {pretty_print(e.ast)}")
+                        except (LetFormatError, SetFormatError) as e:
+                            write(f"{e} : {pretty_print(e.ast)}\n")
 
-                    except UnboundSymbolError as e:
-                        print(f"{e} : {e.symbol}")
+                        except UnboundSymbolError as e:
+                            write(f"{e} : {e.symbol}\n")
 
-                    except IncorrectArgumentType as e:
-                        print(f"{e} : {pretty_print(e.arg)}")
+                        except IncorrectArgumentType as e:
+                            write(f"{e} : {pretty_print(e.arg)}\n")
 
-                    except NotCallableError as e:
-                        print(f"{e} : {pretty_print(e.operator)}")
+                        except NotCallableError as e:
+                            write(f"{e} : {pretty_print(e.operator)}\n")
 
-                    except NonListError as e:
-                        print(f"{e} : {pretty_print(e.ast)}")
+                        except NonListError as e:
+                            write(f"{e} : {pretty_print(e.ast)}\n")
 
-                    except NoReturnValue as e:
-                        print(f"{e} : {pretty_print(e.ast)}")
+                        except NoReturnValue as e:
+                            write(f"{e} : {pretty_print(e.ast)}\n")
 
-                    except DivisionByZeroError as e:
-                        print(f"{e} : /")
+                        except DivisionByZeroError as e:
+                            write(f"{e} : /\n")
 
-                    except IncorrectArgumentNumber as e:
-                        print(f"{e} : {e.operator}")
+                        except IncorrectArgumentNumber as e:
+                            write(f"{e} : {e.operator}\n")
 
-                    except (LevelDefineError, LevelCleanEnvError, LevelExitError) as e:
-                        print(f"{e}")
+                        except (LevelDefineError, LevelCleanEnvError, LevelExitError, LevelForkError) as e:
+                            write(f"{e}\n")
 
-                    except (UnboundParameterError, UnboundConditionError) as e:
-                        print(f"{e} : {pretty_print(e.ast)}")
+                        except (UnboundParameterError, UnboundConditionError) as e:
+                            write(f"{e} : {pretty_print(e.ast)}\n")
 
-                partial_input = ""  # after parsing, clear input
-                new_s_exp_start = 0
+                        except (FileOpenError, NumberFormatError, LoadFormatError, ImageFormatError) as e:
+                            write(f'{e} : "{e.path}"\n')
 
-            except NotFinishError:
-                empty_line_encountered = True  # wait for user input, so do nothing
-                continue
+                        except UnknownModuleError as e:
+                            write(f"{e} : {e.name}\n")
+
+                        except (ClosedPortError, DeadlockError) as e:
+                            write(f"{e} : {e.operator}\n")
+
+                        except ResourceLimitError as e:
+                            write(f"{e}\n")
 
-            except NoClosingQuoteError as e:
-                print(f"{e} : END-OF-LINE encountered at Line {e.line} Column {e.column}")
-                partial_input = ""
-                new_s_exp_start = 0
+                    partial_input = ""  # after parsing, clear input
+                    new_s_exp_start = 0
 
-            except UnexpectedTokenError as e:
-                if e.type == 1:
-                    print(f"{e} : atom or '(' expected when token at Line {e.line} Column {e.column} is >>{e.value}<<")
-                else:
-                    print(f"{e} : ')' expected when token at Line {e.line} Column {e.column} is >>{e.value}<<")
+                except NotFinishError:
+                    empty_line_encountered = True  # wait for user input, so do nothing
+                    continue
 
-                partial_input = ""
-                new_s_exp_start = 0
+                except NoClosingQuoteError as e:
+                    write(f"{e} : END-OF-LINE encountered at Line {e.line} Column {e.column}\n")
+                    partial_input = ""
+                    new_s_exp_start = 0
 
-        except SchemeExitException:
-            break
+                except UnexpectedTokenError as e:
+                    if e.type == 1:
+                        write(f"{e} : atom or '(' expected when token at Line {e.line} Column {e.column} is >>{e.value}<<\n")
+                    else:
+                        write(f"{e} : ')' expected when token at Line {e.line} Column {e.column} is >>{e.value}<<\n")
+
+                    partial_input = ""
+                    new_s_exp_start = 0
+
+            except SchemeExitException:
+                break
+
+            except EmptyInputError:
+                empty_line_encountered = True
+                continue
 
-        except EmptyInputError:
-            empty_line_encountered = True
-            continue
+            except EOFError:
+                write("ERROR (no more input) : END-OF-FILE encountered")
+                break
 
-        except EOFError:
-            print("ERROR (no more input) : END-OF-FILE encountered", end="")
-            break
+            empty_line_encountered = False
 
-        empty_line_encountered = False
+        write("\nThanks for using OurScheme!")
 
-    print("\nThanks for using OurScheme!", end="")
+    finally:
+        context.output.flush()
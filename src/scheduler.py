@@ -0,0 +1,427 @@
+# Cooperative tasks: `spawn` starts a task, `yield` lets the other tasks run, and
+# channels pass values between tasks. The tasks of a session all run on the
+# session's own thread, one at a time, switched by the round-robin `Scheduler` of
+# its context. No Python threads are involved.
+#
+# A task is evaluated by `evaluate_steps`, a generator version of the evaluator
+# which can stop in the middle of an expression and go on later. Every nested
+# evaluation is a generator delegated to with `yield from`, so a request yielded
+# deep inside a task travels out to the scheduler, and the value sent back travels
+# in. A task is suspended when it calls `yield`, when it receives from an empty
+# channel, and after every `QUANTUM` reductions, so a task which never yields
+# cannot starve the others.
+#
+# `evaluate_steps` handles procedure calls and the special forms `if`, `cond`,
+# `and`, `or`, `begin`, `let`, `set!` and `define`. Other special forms, and
+# primitives which call procedures, run through the ordinary evaluator, which
+# cannot suspend. Code which does not run in a task, e.g. the top level of the
+# REPL, cannot suspend either. When such code yields or receives from an empty
+# channel, it runs the tasks itself until it can go on, and raises DeadlockError
+# if they all block first.
+#
+# An error in a task ends the task and is raised to whoever was running the
+# scheduler at the time.
+
+from collections import deque
+
+from src.ast_nodes import *
+from src.environment import Environment
+from src.errors import NoReturnValue, NonListError, NotCallableError, UnboundParameterError, UnboundConditionError, \
+    DeadlockError
+from src.function_object import PrimitiveFunction, SpecialForm, UserDefinedFunction
+from src.special_forms import parse_cond_clauses, parse_let_bindings, parse_set_target, special_define
+
+# Reductions a task runs before the next task gets its turn
+QUANTUM = 100
+
+# Requests a task's evaluation yields to the scheduler: `YIELD` to go to the back of
+# the queue, or a `Channel` to wait for a value from
+YIELD = object()
+
+# Forms `evaluate_steps` leaves to the evaluator, since they never evaluate a procedure call
+_EVALUATOR_FORMS = ("lambda", "verbose", "verbose?")
+
+
+class Channel:
+    """
+    An unbounded queue of values sent from one task to another.
+
+    Sending never blocks. Receiving from an empty channel suspends the receiving
+    task until a value is sent, and values go to waiting tasks in the order they
+    started to wait.
+    """
+
+    __slots__ = ("items", "receivers")
+
+    def __init__(self):
+        self.items = deque()
+        # Callbacks of the tasks suspended in `channel-recv`, each returns whether it took the value
+        self.receivers = deque()
+
+    def send(self, value: ASTNode):
+        while self.receivers:
+            if self.receivers.popleft()(value):
+                return
+
+        self.items.append(value)
+
+    def __repr__(self):
+        return "#<channel>"
+
+
+class Task:
+    """A procedure call spawned as a task, with the state of its suspended evaluation."""
+
+    __slots__ = ("steps", "inbox", "scheduler", "done", "error")
+
+    def __init__(self, steps, scheduler: "Scheduler"):
+        self.steps = steps  # the generator evaluating the call
+        self.inbox = None  # sent into `steps` when the task is resumed
+        self.scheduler = scheduler
+        self.done = False
+        self.error = None  # the error which ended the task, if its scheduler keeps it rather than raising it
+
+    def wake(self, value: ASTNode) -> bool:
+        """Resume the task with `value`, which it receives from the channel it waits for."""
+        self.inbox = value
+        self.scheduler.ready.append(self)
+        return True
+
+    def __repr__(self):
+        return "#<task>"
+
+
+def _yield_steps(_args: list[ASTNode], _env, _evaluator):
+    yield YIELD
+    return AtomNode("BOOLEAN", "nil")
+
+
+def _receive_steps(args: list[ASTNode], _env, _evaluator):
+    channel = args[0].value
+    if channel.items:
+        return channel.items.popleft()
+
+    return (yield channel)
+
+
+# In a task these suspend it, outside of one they run the other tasks instead
+_SUSPENDING = {
+    "yield": _yield_steps,
+    "channel-recv": _receive_steps
+}
+
+
+class Scheduler:
+    """
+    The tasks of one session, run round-robin.
+
+    Tasks which can go on wait in `ready`, each runs until it suspends and then
+    goes to the back. Tasks waiting for a channel are kept by the channel, which
+    puts them back into `ready` when a value arrives.
+    """
+
+    # Primitives which suspend the task calling them, name -> generator taking the
+    # arguments, environment and evaluator of the call
+    suspending = _SUSPENDING
+
+    def __init__(self):
+        self.ready = deque()
+        self.quantum = QUANTUM
+        self.budget = QUANTUM  # reductions left to the running task
+
+    def spawn(self, func, args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> Task:
+        task = Task(apply_steps(evaluator, func, args, env), self)
+        self.ready.append(task)
+        return task
+
+    def _run_slice(self, task: Task):
+        self.budget = self.quantum
+        inbox, task.inbox = task.inbox, None
+        try:
+            request = task.steps.send(inbox)
+        except StopIteration:
+            task.done = True
+            task.steps = None
+            return
+        except BaseException:
+            task.done = True
+            task.steps = None
+            raise
+
+        if request is YIELD:
+            self.ready.append(task)
+        else:
+            request.receivers.append(task.wake)
+
+    def run_round(self):
+        """Let each task which is ready run once."""
+        for _ in range(len(self.ready)):
+            self._run_slice(self.ready.popleft())
+
+    def run_until(self, condition, operator: str):
+        """Run tasks until `condition()` holds.
+
+        Args:
+            condition: Function telling whether the caller can go on.
+            operator: Name of the primitive waiting, for the error message.
+
+        Raises:
+            DeadlockError: If no task is ready before the condition holds.
+        """
+        while not condition():
+            if not self.ready:
+                raise DeadlockError(operator)
+
+            self._run_slice(self.ready.popleft())
+
+
+def get_scheduler(context: "EvalContext") -> Scheduler:
+    """The scheduler of a session, created on first use."""
+    if context.scheduler is None:
+        context.scheduler = Scheduler()
+
+    return context.scheduler
+
+
+def receive(channel: Channel, evaluator: "Evaluator") -> ASTNode:
+    """Take the next value from `channel` outside of a task, running the tasks until one is there."""
+    if not channel.items:
+        get_scheduler(evaluator.context).run_until(lambda: channel.items, "channel-recv")
+
+    return channel.items.popleft()
+
+
+# Only compound forms can suspend, so everything else is evaluated without a generator.
+# The hot paths below make that test inline, saving a generator per nesting level.
+def _evaluate_arg(evaluator: "Evaluator", ast: ASTNode, env: Environment):
+    if isinstance(ast, ConsNode):
+        return (yield from evaluate_steps(evaluator, ast, env, "inner"))
+
+    return evaluator.evaluate(ast, env, "inner")
+
+
+def _body_steps(evaluator: "Evaluator", body: list[ASTNode], env: Environment):
+    for expr in body[:-1]:
+        yield from _evaluate_arg(evaluator, expr, env)
+
+    return (yield from _evaluate_arg(evaluator, body[-1], env))
+
+
+def apply_steps(evaluator: "Evaluator", func, args: list[ASTNode], env: Environment):
+    """Generator version of `Evaluator.apply_procedure`."""
+    if not isinstance(func, UserDefinedFunction):
+        return evaluator.apply_procedure(func, args, env)
+
+    func.check_arity(args)
+    call_env = Environment(builtins=env.builtins, outer=evaluator.context.global_env)
+    call_env.define_many(func.param_list, args)
+
+    body = func.body
+    for expr in body[:-1]:
+        yield from _evaluate_arg(evaluator, expr, call_env)
+
+    last = body[-1]
+    if isinstance(last, ConsNode):
+        return (yield from evaluate_steps(evaluator, last, call_env, "inner"))
+
+    return evaluator.evaluate(last, call_env, "inner")
+
+
+def _if_steps(args, env, evaluator):
+    test_expr, then_expr, *rest = args
+
+    if isinstance(test_expr, ConsNode):
+        test = yield from evaluate_steps(evaluator, test_expr, env, "inner")
+    else:
+        test = evaluator.evaluate(test_expr, env, "inner")
+
+    if test != AtomNode("BOOLEAN", "nil"):
+        branch = then_expr
+    elif rest:
+        branch = rest[0]
+    else:
+        return None
+
+    if isinstance(branch, ConsNode):
+        return (yield from evaluate_steps(evaluator, branch, env, "inner"))
+
+    return evaluator.evaluate(branch, env, "inner")
+
+
+def _cond_steps(args, env, evaluator):
+    clauses = parse_cond_clauses(args)
+
+    for i, (test, exprs) in enumerate(clauses):
+        if i == len(clauses) - 1 and test == AtomNode("SYMBOL", "else"):
+            return (yield from _body_steps(evaluator, exprs, env))
+
+        if (yield from _evaluate_arg(evaluator, test, env)) != AtomNode("BOOLEAN", "nil"):
+            return (yield from _body_steps(evaluator, exprs, env))
+
+    return None
+
+
+def _and_steps(args, env, evaluator):
+    eval_result = None
+    for arg in args:
+        eval_result = yield from _evaluate_arg(evaluator, arg, env)
+        if eval_result is None:
+            raise UnboundConditionError(arg)
+
+        if eval_result == AtomNode("BOOLEAN", "nil"):
+            return AtomNode("BOOLEAN", "nil")
+
+    return eval_result
+
+
+def _or_steps(args, env, evaluator):
+    for arg in args:
+        eval_result = yield from _evaluate_arg(evaluator, arg, env)
+        if eval_result is None:
+            raise UnboundConditionError(arg)
+
+        if eval_result != AtomNode("BOOLEAN", "nil"):
+            return eval_result
+
+    return AtomNode("BOOLEAN", "nil")
+
+
+def _begin_steps(args, env, evaluator):
+    return (yield from _body_steps(evaluator, args, env))
+
+
+def _let_steps(args, env, evaluator):
+    binding_list = parse_let_bindings(args)
+    let_env = Environment(outer=env)
+
+    for symbol, expr in binding_list:
+        value = yield from _evaluate_arg(evaluator, expr, env)
+        if value is None:
+            raise NoReturnValue(expr)
+
+        let_env.define(symbol, value)
+
+    return (yield from _body_steps(evaluator, args[1:], let_env))
+
+
+def _set_steps(args, env, evaluator):
+    symbol = parse_set_target(args)
+    value = yield from _evaluate_arg(evaluator, args[1], env)
+
+    ref_env = env.find(symbol)
+    if ref_env is None:
+        ref_env = evaluator.context.global_env
+
+    ref_env.assign(symbol, value)
+    return value
+
+
+def _define_steps(args, env, evaluator):
+    # Only `(define symbol expr)` evaluates anything, its value is computed here and
+    # handed to `define` ready-made
+    symbol = args[0]
+    if len(args) == 2 and isinstance(symbol, AtomNode) and symbol.type == "SYMBOL" and isinstance(args[1], ConsNode):
+        value = yield from evaluate_steps(evaluator, args[1], env, "inner")
+        if value is None:
+            raise NoReturnValue(args[1])
+
+        args = [symbol, QuoteNode(value)]
+
+    return special_define(args, env, evaluator)
+
+
+# Special forms whose subexpressions may suspend, the others run without suspending
+_SPECIAL_STEPS = {
+    "if": _if_steps,
+    "cond": _cond_steps,
+    "and": _and_steps,
+    "or": _or_steps,
+    "begin": _begin_steps,
+    "let": _let_steps,
+    "set!": _set_steps,
+    "define": _define_steps
+}
+
+
+def evaluate_steps(evaluator: "Evaluator", ast: ASTNode, env: Environment, level: str):
+    """
+    Generator version of `Evaluator.evaluate`, used to evaluate tasks.
+
+    It yields the requests of the task to its scheduler, and returns the value of
+    `ast` through `StopIteration`, so it is called with `yield from`.
+    """
+    if not isinstance(ast, ConsNode):
+        return evaluator.evaluate(ast, env, level)
+
+    first = ast.car
+    if isinstance(first, AtomNode) and first.type == "SYMBOL" and first.value in _EVALUATOR_FORMS:
+        return evaluator.evaluate(ast, env, level)
+
+    context = evaluator.context
+    if context.governor is not None:
+        context.governor.step()
+
+    scheduler = context.scheduler
+    scheduler.budget -= 1
+    if scheduler.budget <= 0:
+        yield YIELD
+
+    if isinstance(first, ConsNode):
+        func = yield from evaluate_steps(evaluator, first, env, "inner")
+    else:
+        func = evaluator.evaluate(first, env, "inner")
+
+    if func is None:
+        raise NoReturnValue(first)
+
+    args = evaluator.extract_list(ast.cdr)
+    if args is None:
+        raise NonListError(ast)
+
+    if not isinstance(func, (PrimitiveFunction, SpecialForm, UserDefinedFunction)):
+        raise NotCallableError(func)
+
+    evaluator._handle_level_error(func, level)
+    func.check_arity(args)
+
+    if isinstance(func, SpecialForm):
+        special_steps = _SPECIAL_STEPS.get(func.name)
+        if special_steps is None:
+            return func(args, env, evaluator)
+
+        return (yield from special_steps(args, env, evaluator))
+
+    values = []
+    for arg in args:
+        if isinstance(arg, ConsNode):
+            value = yield from evaluate_steps(evaluator, arg, env, "inner")
+        else:
+            value = evaluator.evaluate(arg, env, "inner")
+
+        if value is None:
+            raise UnboundParameterError(arg)
+
+        values.append(value)
+
+    if isinstance(func, UserDefinedFunction):
+        return (yield from apply_steps(evaluator, func, values, env))
+
+    suspending = scheduler.suspending.get(func.name)
+    if suspending is not None:
+        func.check_arg_types(values)
+        return (yield from suspending(values, env, evaluator))
+
+    return func(values, env, evaluator)
+
+
+__all__ = [
+    "YIELD",
+    "Channel",
+    "Task",
+    "Scheduler",
+    "QUANTUM",
+    "get_scheduler",
+    "receive",
+    "evaluate_steps",
+    "apply_steps"
+]
@@ -0,0 +1,488 @@
+import gc
+import struct
+import threading
+
+from src.ast_nodes import *
+from src.function_object import PrimitiveFunction, SpecialForm, UserDefinedFunction, DummySymbolReference
+
+# Compact binary encoding of S-expressions.
+#
+# The encoding is a post-order stream of operations for a stack machine: atoms push
+# a node, LIST n pops n elements and a tail and pushes the chain of pairs ending in
+# the tail, QUOTE wraps the top of the stack. Nodes reachable more than once are
+# followed by SHARE, which enters them in a node table, and every later occurrence
+# is written as a REF to their number, so shared structure stays shared after
+# decoding. Symbol and string texts are written once and then referred to by their
+# index in a string table. Integers are zigzag varints, floats are 8 byte doubles.
+# User-defined functions are written as their name, parameters and body, builtins
+# only by name, to be looked up again when decoding.
+#
+# Both directions use an explicit stack, so there is no recursion limit.
+
+MAGIC = b"OSB\x01"
+
+_OP_NIL = 0
+_OP_TRUE = 1
+_OP_INT = 2
+_OP_FLOAT = 3
+_OP_SYMBOL = 4
+_OP_STRING = 5
+_OP_ERROR = 6
+_OP_VOID = 7
+_OP_LIST = 8
+_OP_QUOTE = 9
+_OP_SHARE = 10
+_OP_REF = 11
+_OP_BYTEVECTOR = 12
+_OP_FUNCTION = 13
+_OP_BUILTIN = 14
+
+_TEXT_OPS = {"SYMBOL": _OP_SYMBOL, "STRING": _OP_STRING, "ERROR": _OP_ERROR}
+
+# Atoms whose identity is observable (`eqv?`, mutation), so sharing them has to be preserved
+_IDENTITY_ATOM_TYPES = ("STRING", "BYTEVECTOR")
+
+_DOUBLE = struct.Struct("<d")
+
+# Frame kinds used by the explicit stack of `_Encoder.encode`
+_VISIT = 0  # a node to encode
+_LIST = 1  # the elements and tail of a list have been encoded
+_QUOTE = 2  # the quoted value has been encoded
+_FUNCTION = 3  # the body of a user-defined function has been encoded
+
+
+class SerializationError(ValueError):
+    """Raised for values which have no binary encoding, and for malformed input."""
+
+
+def _count_references(roots: list) -> dict[int, int]:
+    """Count how often each pair, quote, function and identity-bearing atom is reached."""
+    counts = {}
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, AtomNode):
+            if node.type not in _IDENTITY_ATOM_TYPES:
+                continue
+        elif not isinstance(node, (ConsNode, QuoteNode, UserDefinedFunction)):
+            continue
+
+        key = id(node)
+        if key in counts:  # already counted, and so are its children
+            counts[key] += 1
+            continue
+
+        counts[key] = 1
+        if isinstance(node, ConsNode):
+            stack.append(node.cdr)
+            stack.append(node.car)
+        elif isinstance(node, QuoteNode):
+            stack.append(node.value)
+        elif isinstance(node, UserDefinedFunction):
+            stack.extend(node.body)
+
+    return counts
+
+
+class _Encoder:
+    def __init__(self, roots: list):
+        self.out = bytearray(MAGIC)
+        self._roots = roots
+        self._shared = {key for key, count in _count_references(roots).items() if count > 1}
+        self._nodes = {}  # id(node) -> node number, for shared nodes already written
+        self._strings = {}  # text -> string number
+
+    def _varint(self, n: int):
+        out = self.out
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+
+        out.append(n)
+
+    def _text(self, text: str):
+        # 0 introduces a new text, k refers to the (k - 1)-th text already written
+        index = self._strings.get(text)
+        if index is not None:
+            self._varint(index + 1)
+            return
+
+        self._strings[text] = len(self._strings)
+        data = text.encode("utf-8")
+        self._varint(0)
+        self._varint(len(data))
+        self.out += data
+
+    def _atom(self, node: AtomNode):
+        type_, value = node.type, node.value
+        out = self.out
+
+        if type_ == "BOOLEAN":
+            out.append(_OP_NIL if value == "nil" else _OP_TRUE)
+        elif type_ == "INT":
+            out.append(_OP_INT)
+            self._varint(value << 1 if value >= 0 else ((-value) << 1) - 1)
+        elif type_ == "FLOAT":
+            out.append(_OP_FLOAT)
+            out += _DOUBLE.pack(value)
+        elif type_ in _TEXT_OPS:
+            out.append(_TEXT_OPS[type_])
+            self._text(value)
+        elif type_ == "VOID":
+            out.append(_OP_VOID)
+        elif type_ == "BYTEVECTOR":
+            out.append(_OP_BYTEVECTOR)
+            self._varint(len(value))
+            out += value
+        else:
+            raise SerializationError(f"cannot serialize {type_} values")
+
+    def _written(self, node):
+        # Called once `node` is on top of the decoder's stack
+        key = id(node)
+        if key in self._shared:
+            self.out.append(_OP_SHARE)
+            self._nodes[key] = len(self._nodes)
+
+    def encode(self) -> bytes:
+        shared = self._shared
+        nodes = self._nodes
+        out = self.out
+        in_progress = set()  # shared nodes whose children are being written, to detect cycles
+
+        # A frame is (kind, node, count), `count` being the number of elements of a `_LIST` frame
+        stack = [(_VISIT, root, 0) for root in reversed(self._roots)]
+        while stack:
+            kind, node, count = stack.pop()
+
+            if kind == _LIST:
+                out.append(_OP_LIST)
+                self._varint(count)
+                in_progress.discard(id(node))
+                self._written(node)
+                continue
+
+            if kind == _QUOTE:
+                out.append(_OP_QUOTE)
+                in_progress.discard(id(node))
+                self._written(node)
+                continue
+
+            if kind == _FUNCTION:
+                out.append(_OP_FUNCTION)
+                self._text(node.name)
+                self._varint(len(node.param_list))
+                for param in node.param_list:
+                    self._text(param)
+
+                self._varint(len(node.body))
+                self._written(node)
+                continue
+
+            key = id(node)
+            if key in nodes:
+                out.append(_OP_REF)
+                self._varint(nodes[key])
+                continue
+
+            if key in in_progress:
+                raise SerializationError("cannot serialize circular structure")
+
+            if isinstance(node, ConsNode):
+                # Collect the pairs of the list up to the first shared one, which becomes the tail
+                elements = [node.car]
+                tail = node.cdr
+                while isinstance(tail, ConsNode) and id(tail) not in shared:
+                    elements.append(tail.car)
+                    tail = tail.cdr
+
+                if key in shared:
+                    in_progress.add(key)
+
+                stack.append((_LIST, node, len(elements)))
+                stack.append((_VISIT, tail, 0))
+                stack.extend((_VISIT, element, 0) for element in reversed(elements))
+
+            elif isinstance(node, QuoteNode):
+                if key in shared:
+                    in_progress.add(key)
+
+                stack.append((_QUOTE, node, 0))
+                stack.append((_VISIT, node.value, 0))
+
+            elif isinstance(node, AtomNode):
+                self._atom(node)
+                self._written(node)
+
+            elif isinstance(node, UserDefinedFunction):
+                stack.append((_FUNCTION, node, 0))
+                stack.extend((_VISIT, expr, 0) for expr in reversed(node.body))
+
+            elif isinstance(node, (PrimitiveFunction, SpecialForm, DummySymbolReference)):
+                out.append(_OP_BUILTIN)
+                self._text(node.name)
+
+            else:
+                raise SerializationError(f"cannot serialize {node!r}")
+
+        return bytes(out)
+
+
+def _read_varint(data: bytes, pos: int, first: int) -> tuple[int, int]:
+    # Rest of a varint whose first byte `first` has the continuation bit set
+    result = first & 0x7F
+    shift = 7
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+
+        shift += 7
+
+
+def _read_uvarint(data: bytes, pos: int) -> tuple[int, int]:
+    first = data[pos]
+    if first < 0x80:
+        return first, pos + 1
+
+    return _read_varint(data, pos + 1, first)
+
+
+def _read_text(data: bytes, pos: int, strings: list[str]) -> tuple[str, int]:
+    index, pos = _read_uvarint(data, pos)
+    if index == 0:
+        length, pos = _read_uvarint(data, pos)
+        strings.append(data[pos:pos + length].decode("utf-8"))
+        pos += length
+        index = len(strings)
+
+    return strings[index - 1], pos
+
+
+# Decodes running on any thread, the first turns the garbage collector off and the last
+# turns it back on, if it was on before
+_gc_lock = threading.Lock()
+_gc_decodes = 0
+_gc_was_enabled = False
+
+
+def _decode(data, builtins) -> list:
+    # Decoding only allocates acyclic nodes, which the cyclic garbage collector would
+    # otherwise traverse over and over as they pile up
+    global _gc_decodes, _gc_was_enabled
+    with _gc_lock:
+        if _gc_decodes == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+
+        _gc_decodes += 1
+
+    try:
+        return _decode_nodes(data, builtins)
+    finally:
+        with _gc_lock:
+            _gc_decodes -= 1
+            if _gc_decodes == 0 and _gc_was_enabled:
+                gc.enable()
+
+
+def _decode_nodes(data, builtins) -> list:
+    data = bytes(data)
+    if data[:len(MAGIC)] != MAGIC:
+        raise SerializationError("not a serialized S-expression")
+
+    stack = []
+    nodes = []
+    strings = []
+    pos = len(MAGIC)
+    end = len(data)
+    unpack_double = _DOUBLE.unpack_from
+
+    # Varints are read inline for the common single byte case
+    try:
+        while pos < end:
+            op = data[pos]
+            pos += 1
+
+            if op == _OP_SYMBOL or op == _OP_STRING or op == _OP_ERROR:
+                index = data[pos]
+                pos += 1
+                if index >= 0x80:
+                    index, pos = _read_varint(data, pos, index)
+
+                if index == 0:
+                    length = data[pos]
+                    pos += 1
+                    if length >= 0x80:
+                        length, pos = _read_varint(data, pos, length)
+
+                    strings.append(data[pos:pos + length].decode("utf-8"))
+                    pos += length
+                    index = len(strings)
+
+                type_ = "SYMBOL" if op == _OP_SYMBOL else "STRING" if op == _OP_STRING else "ERROR"
+                stack.append(AtomNode(type_, strings[index - 1]))
+
+            elif op == _OP_LIST:
+                count = data[pos]
+                pos += 1
+                if count >= 0x80:
+                    count, pos = _read_varint(data, pos, count)
+
+                if not 0 < count < len(stack):
+                    raise SerializationError("truncated or corrupted data")
+
+                node = stack.pop()
+                for car in reversed(stack[-count:]):
+                    node = ConsNode(car, node)
+
+                del stack[-count:]
+                stack.append(node)
+
+            elif op == _OP_NIL:
+                stack.append(AtomNode("BOOLEAN", "nil"))
+
+            elif op == _OP_INT:
+                n = data[pos]
+                pos += 1
+                if n >= 0x80:
+                    n, pos = _read_varint(data, pos, n)
+
+                stack.append(AtomNode("INT", -((n + 1) >> 1) if n & 1 else n >> 1))
+
+            elif op == _OP_FLOAT:
+                stack.append(AtomNode("FLOAT", unpack_double(data, pos)[0]))
+                pos += 8
+
+            elif op == _OP_TRUE:
+                stack.append(AtomNode("BOOLEAN", "#t"))
+
+            elif op == _OP_QUOTE:
+                stack.append(QuoteNode(stack.pop()))
+
+            elif op == _OP_SHARE:
+                nodes.append(stack[-1])
+
+            elif op == _OP_REF:
+                index = data[pos]
+                pos += 1
+                if index >= 0x80:
+                    index, pos = _read_varint(data, pos, index)
+
+                stack.append(nodes[index])
+
+            elif op == _OP_VOID:
+                stack.append(AtomNode("VOID", ""))
+
+            elif op == _OP_BYTEVECTOR:
+                length = data[pos]
+                pos += 1
+                if length >= 0x80:
+                    length, pos = _read_varint(data, pos, length)
+
+                if pos + length > end:
+                    raise SerializationError("truncated or corrupted data")
+
+                stack.append(AtomNode("BYTEVECTOR", bytearray(data[pos:pos + length])))
+                pos += length
+
+            elif op == _OP_FUNCTION:
+                name, pos = _read_text(data, pos, strings)
+                count, pos = _read_uvarint(data, pos)
+                params = []
+                for _ in range(count):
+                    param, pos = _read_text(data, pos, strings)
+                    params.append(param)
+
+                count, pos = _read_uvarint(data, pos)
+                if not 0 < count <= len(stack):
+                    raise SerializationError("truncated or corrupted data")
+
+                body = stack[-count:]
+                del stack[-count:]
+                stack.append(UserDefinedFunction(name=name, param_list=params, body=body))
+
+            elif op == _OP_BUILTIN:
+                name, pos = _read_text(data, pos, strings)
+                if builtins is None or name not in builtins:
+                    raise SerializationError(f"unknown builtin {name}")
+
+                stack.append(builtins[name])
+
+            else:
+                raise SerializationError(f"unknown operation {op}")
+
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise SerializationError("truncated or corrupted data") from e
+
+    if pos != end:
+        raise SerializationError("truncated or corrupted data")
+
+    return stack
+
+
+def serialize(node) -> bytes:
+    """
+    Encode an S-expression or runtime value into the compact binary format.
+
+    Raises:
+        SerializationError: If the value is circular or contains something without
+                            an encoding, e.g. procedures or ports.
+    """
+    return _Encoder([node]).encode()
+
+
+def serialize_many(nodes: list) -> bytes:
+    """Encode several values into one buffer, sharing the string and node tables."""
+    return _Encoder(nodes).encode()
+
+
+def deserialize(data, builtins: dict | None = None):
+    """
+    Decode a value written by `serialize`.
+
+    Args:
+        data: bytes, bytearray or memoryview.
+        builtins: Mapping used to resolve builtin procedures by name.
+
+    Raises:
+        SerializationError: If the data is not exactly one encoded value.
+    """
+    values = _decode(data, builtins)
+    if len(values) != 1:
+        raise SerializationError(f"expected 1 value, found {len(values)}")
+
+    return values[0]
+
+
+def deserialize_many(data, builtins: dict | None = None) -> list:
+    """Decode all values written by `serialize_many`."""
+    return _decode(data, builtins)
+
+
+def reduce_node(node) -> tuple:
+    """
+    `__reduce__` of pairs, quotes and user-defined functions.
+
+    They are pickled in the binary format, which is more compact than pickling
+    the objects one by one and has no recursion limit on long or deep lists.
+    """
+    return unpickle_node, (serialize(node),)
+
+
+def unpickle_node(data):
+    from src.builtins_registry import built_in_funcs  # not at the top, the builtins import this module
+    return deserialize(data, built_in_funcs)
+
+
+__all__ = [
+    "SerializationError",
+    "serialize",
+    "serialize_many",
+    "deserialize",
+    "deserialize_many",
+    "reduce_node",
+    "unpickle_node"
+]
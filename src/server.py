@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.governor import Governor, add_limit_arguments, limits_from_args
+from src.repl import repl
+
+
+class _SessionIO:
+    """
+    Blocking line reader and text stream over the asyncio streams of one connection.
+
+    The session itself runs `repl()` in a worker thread, these methods hand the actual
+    socket I/O over to the event loop and wait for it.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._loop = loop
+        self._reader = reader
+        self._writer = writer
+
+    def readline(self) -> str:
+        line = asyncio.run_coroutine_threadsafe(self._reader.readline(), self._loop).result()
+        if not line:
+            raise EOFError
+
+        return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    def write(self, text: str):
+        self._loop.call_soon_threadsafe(self._writer.write, text.encode("utf-8"))
+
+    def flush(self):
+        # Scheduled after the pending writes, and waits until the transport has room again
+        asyncio.run_coroutine_threadsafe(self._writer.drain(), self._loop).result()
+
+
+class SchemeServer:
+    """
+    Hosts many OurScheme sessions in one process.
+
+    Every connection gets a session of its own, with its own global `Environment`
+    and `Evaluator` as created by `repl()`, and the same transcript as `repl()` on
+    a console. Only the read-only `built_in_funcs` are shared. Every session holds a
+    thread of a pool for as long as it is connected, so at most `max_sessions` are
+    served at once. A connection beyond that is told "ERROR (too many sessions)" and
+    closed, rather than left waiting for a thread which may never be free. If
+    `limits` are given, every session gets a `Governor` built from them, which bounds
+    each of its top-level forms. A memory budget cannot be among them: it would count
+    what all sessions allocate, not what the session's form does (see `src.governor`).
+    """
+
+    def __init__(self, max_sessions: int = 256, output_threshold: int = 8192, limits: dict | None = None):
+        """
+        Raises:
+            ValueError: If `limits` has a memory budget.
+        """
+        if limits is not None and limits.get("max_memory") is not None:
+            raise ValueError("memory budgets are not supported by the server, memory is measured per process")
+
+        self.max_sessions = max_sessions
+        self.output_threshold = output_threshold
+        self.limits = limits
+        self.active_sessions = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix="scheme-session")
+
+    def _run_session(self, session_io: _SessionIO):
+        try:
+            governor = Governor(**self.limits) if self.limits is not None else None
+            repl(output_threshold=self.output_threshold, reader=session_io.readline, stream=session_io,
+                 governor=governor)
+        except ConnectionError:
+            pass  # client went away
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self.active_sessions >= self.max_sessions:
+            writer.write(b"ERROR (too many sessions)\n")
+            await self._close(writer)
+            return
+
+        loop = asyncio.get_running_loop()
+        self.active_sessions += 1
+        try:
+            await loop.run_in_executor(self._executor, self._run_session, _SessionIO(loop, reader, writer))
+        finally:
+            self.active_sessions -= 1
+            await self._close(writer)
+
+    @staticmethod
+    async def _close(writer: asyncio.StreamWriter):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def start(self, host: str | None = None, port: int | None = None, path: str | None = None) -> asyncio.Server:
+        """Listen on a TCP `host`/`port`, or on the Unix socket `path` if given."""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path=path)
+
+        return await asyncio.start_server(self.handle_connection, host=host, port=port)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(host: str | None = None, port: int | None = None, path: str | None = None, max_sessions: int = 256,
+                limits: dict | None = None):
+    server = SchemeServer(max_sessions=max_sessions, limits=limits)
+    listener = await server.start(host, port, path)
+
+    address = path if path is not None else "%s:%d" % listener.sockets[0].getsockname()[:2]
+    print(f"OurScheme server listening on {address}", flush=True)
+
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.shutdown()
+
+
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description="OurScheme multi-session server")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=7373, help="TCP port, 0 picks a free one")
+    arg_parser.add_argument("--unix", default=None, help="listen on this Unix socket path instead of TCP")
+    arg_parser.add_argument("--max-sessions", type=int, default=256,
+                            help="sessions connected at the same time, each holds a thread; "
+                                 "further connections are refused with an error")
+    add_limit_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    if args.max_memory is not None:
+        # tracemalloc measures the whole process, every session's budget would count the others' allocations
+        arg_parser.error("--max-memory is not supported, memory is measured for all sessions together")
+
+    return args
+
+
+__all__ = [
+    "SchemeServer",
+    "serve"
+]
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.max_sessions, limits_from_args(args)))
+    except KeyboardInterrupt:
+        pass
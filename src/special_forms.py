@@ -3,6 +3,8 @@ from src.environment import Environment
 from src.errors import DefineFormatError, CondFormatError, LambdaFormatError, LetFormatError, UnboundConditionError, \
     NoReturnValue, IncorrectArgumentType, UnboundSymbolError, SetFormatError
 from src.function_object import SpecialForm, UserDefinedFunction
+from src.future import Future
+from src.promise import Promise
 
 
 def special(name, min_args=None, max_args=None):
@@ -47,8 +49,8 @@ def special_define(args: list[ASTNode], env: Environment, evaluator: "Evaluator"
 
         env.define(symbol_name, evaled_value)
 
-        if evaluator.verbose:
-           print(f"{symbol_name} defined")
+        if evaluator.context.verbose:
+            evaluator.context.output.write(f"{symbol_name} defined\n")
 
     else:  # syntactic sugar for lambda, e.g. (define (f x y) (+ x y)) === (define f (lambda (x y) (+ x y)))
         # Function name and parameters
@@ -73,8 +75,8 @@ def special_define(args: list[ASTNode], env: Environment, evaluator: "Evaluator"
 
         env.define(func_name, UserDefinedFunction(name=func_name, param_list=params, body=body))
 
-        if evaluator.verbose:
-            print(f"{func_name} defined")
+        if evaluator.context.verbose:
+            evaluator.context.output.write(f"{func_name} defined\n")
 
     return AtomNode("VOID", "")
 
@@ -127,8 +129,8 @@ def special_if(args: list[ASTNode], env: Environment, evaluator: "Evaluator") ->
     return None
 
 
-@special(name="cond")
-def special_cond(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> ASTNode | None:
+def parse_cond_clauses(args: list[ASTNode]) -> list[tuple[ASTNode, list[ASTNode]]]:
+    """Split the arguments of `cond` into (test, body) pairs, raising CondFormatError if malformed."""
     def extract_clause(cons: ASTNode) -> tuple[ASTNode, list[ASTNode]]:
         branch = []
         while isinstance(cons, ConsNode):
@@ -153,6 +155,13 @@ def special_cond(args: list[ASTNode], env: Environment, evaluator: "Evaluator")
 
         clauses.append(extract_clause(arg))
 
+    return clauses
+
+
+@special(name="cond")
+def special_cond(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> ASTNode | None:
+    clauses = parse_cond_clauses(args)
+
     for test, exprs in clauses[:-1]:
         if evaluator.evaluate(test, env, "inner") != AtomNode("BOOLEAN", "nil"):
             for expr in exprs[:-1]:
@@ -171,8 +180,8 @@ def special_cond(args: list[ASTNode], env: Environment, evaluator: "Evaluator")
     return None
 
 
-@special(name="let")
-def special_let(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+def parse_let_bindings(args: list[ASTNode]) -> list[tuple[str, ASTNode]]:
+    """The (symbol, expression) pairs bound by `let`, raising LetFormatError if the form is malformed."""
     def args_to_cons(args: list[ASTNode]) -> ASTNode:
         result = AtomNode("BOOLEAN", "nil")
         for node in reversed(args):  # 從最後一個開始包
@@ -184,8 +193,7 @@ def special_let(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
     if len(args) < 2:
         raise LetFormatError(full_let_expr)
 
-    let_env = Environment(outer=env)
-    bindings, *body = args
+    bindings = args[0]
 
     if isinstance(bindings, AtomNode):
         if not (bindings.type == "BOOLEAN" and bindings.value == "nil"):
@@ -214,6 +222,15 @@ def special_let(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
         if curr != AtomNode("BOOLEAN", "nil"):
             raise LetFormatError(full_let_expr)
 
+    return binding_list
+
+
+@special(name="let")
+def special_let(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+    binding_list = parse_let_bindings(args)
+    let_env = Environment(outer=env)
+    body = args[1:]
+
     for symbol, expr in binding_list:
         value = evaluator.evaluate(expr, env, "inner")
         if value is None:
@@ -227,8 +244,8 @@ def special_let(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
     return evaluator.evaluate(body[-1], let_env, "inner")
 
 
-@special(name="set!", min_args=2, max_args=2)
-def special_set(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+def parse_set_target(args: list[ASTNode]) -> str:
+    """The symbol assigned by `set!`, raising SetFormatError if it is not a symbol."""
     def args_to_cons(args: list[ASTNode]) -> ASTNode:
         result = AtomNode("BOOLEAN", "nil")
         for node in reversed(args):  # 從最後一個開始包
@@ -236,19 +253,102 @@ def special_set(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
         return result
 
     target = args[0]
-    value_expr = args[1]
-
     if not isinstance(target, AtomNode) or target.type != "SYMBOL":
         full_ast = ConsNode(AtomNode("SYMBOL", "set!"), args_to_cons(args))
         raise SetFormatError(full_ast)
 
-    value = evaluator.evaluate(value_expr, env, "inner")
+    return target.value
+
+
+@special(name="set!", min_args=2, max_args=2)
+def special_set(args: list[ASTNode], env: Environment, evaluator: "Evaluator"):
+    symbol = parse_set_target(args)
+    value = evaluator.evaluate(args[1], env, "inner")
 
-    ref_env = env.find(target.value)
+    ref_env = env.find(symbol)
     if ref_env is None:
-        ref_env = evaluator.global_env
+        ref_env = evaluator.context.global_env
+
+    ref_env.assign(symbol, value)
+    return value
+
+
+def make_promise(expr: ASTNode, env: Environment) -> AtomNode:
+    """
+    Wrap an unevaluated expression into a promise atom.
+
+    Args:
+        expr: The expression to evaluate when the promise is forced.
+        env: The environment to evaluate the expression in.
+
+    Returns:
+        An atom node of type PROMISE.
+    """
+    def thunk(evaluator: "Evaluator") -> ASTNode:
+        value = evaluator.evaluate(expr, env, "inner")
+        if value is None:
+            raise NoReturnValue(expr)
+
+        return value
+
+    return AtomNode("PROMISE", Promise(thunk))
+
+
+@special(name="delay", min_args=1, max_args=1)
+def special_delay(args: list[ASTNode], env: Environment, _evaluator: "Evaluator") -> AtomNode:
+    return make_promise(args[0], env)
+
+
+@special(name="cons-stream", min_args=2, max_args=2)
+def special_cons_stream(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> ConsNode:
+    head = evaluator.evaluate(args[0], env, "inner")
+    if head is None:
+        raise NoReturnValue(args[0])
+
+    return ConsNode(head, make_promise(args[1], env))
+
+
+@special(name="future", min_args=1, max_args=1)
+def special_future(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> AtomNode:
+    expr = args[0]
+
+    def thunk(future_evaluator: "Evaluator") -> ASTNode:
+        value = future_evaluator.evaluate(expr, env, "inner")
+        if value is None:
+            raise NoReturnValue(expr)
+
+        return value
+
+    return AtomNode("FUTURE", Future(thunk, evaluator))
+
+
+@special(name="with-forked-environment", min_args=1)
+def special_with_forked_environment(args: list[ASTNode], env: Environment, evaluator: "Evaluator") -> ASTNode:
+    # Only allowed at the top level (see `Evaluator._handle_level_error`). The expressions
+    # may define and assign as at the top level, but only in a fork of the environments,
+    # which is dropped afterwards
+    context = evaluator.context
+    forked = env.fork()
+
+    # The fork of the session's global environment, which need not be the outermost one
+    original, forked_global = env, forked
+    while original is not None and original is not context.global_env:
+        original, forked_global = original.outer, forked_global.outer
+
+    saved_global = context.global_env
+    if forked_global is not None:
+        context.global_env = forked_global  # procedures called from here see the forked definitions
+    try:
+        for expr in args[:-1]:
+            evaluator.evaluate(expr, forked, "toplevel")
+
+        value = evaluator.evaluate(args[-1], forked, "toplevel")
+    finally:
+        context.global_env = saved_global
+
+    if value is None:
+        raise NoReturnValue(args[-1])
 
-    ref_env.user_define[target.value] = value
     return value
 
 
@@ -299,5 +399,13 @@ __all__ = [
     "special_cond",
     "special_let",
     "special_set",
-    "eval_lambda"
+    "special_delay",
+    "special_cons_stream",
+    "special_future",
+    "special_with_forked_environment",
+    "make_promise",
+    "eval_lambda",
+    "parse_cond_clauses",
+    "parse_let_bindings",
+    "parse_set_target"
 ]